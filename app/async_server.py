@@ -0,0 +1,280 @@
+# app/async_server.py
+
+import asyncio
+import io
+import sys
+import time
+from urllib.parse import unquote, parse_qs
+
+from werkzeug.http import parse_etags
+
+from app.streaming import TIERS, SNAPSHOT_TIER, SNAPSHOT_WAIT, TierNegotiator, snapshot_etag
+from app.telemetry import to_json
+
+BOUNDARY = b'frame'
+
+
+class AsyncStreamServer:
+    """
+    Serves an App from a single asyncio event loop, rather than a thread per connection,
+    so dozens of people watching cost next to nothing.
+
+    /video_feed and /telemetry are streamed from the loop, woken by the FrameStore each new frame,
+    and /snapshot.jpg long-polls wait there too, rather than holding a thread each.
+    Encoding runs in the loop's thread pool, once per frame and tier as ever.
+    Every other route - the page, clips, metrics and the rest - is passed to the Flask app,
+    on a pool thread, so there's only one set of routes.  One request per connection.
+
+    Frame processing carries on in its own thread, exactly as it does under Flask.
+    """
+
+    def __init__(self, app, host='0.0.0.0', port=3000):
+        self.app = app
+        self.host = host
+        self.port = port
+        self._loop = None
+        self._server = None
+        self._frame_event = None
+
+    async def start(self):
+        """Start listening.  port is the one really used, if asked for 0."""
+        self._loop = asyncio.get_running_loop()
+        self._frame_event = asyncio.Event()
+        self.app.frame_store.add_listener(self._frame_arrived)
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._log(f"Serving on http://{self.host}:{self.port}")
+
+    async def serve(self):
+        await self.start()
+        try:
+            async with self._server:
+                await self._server.serve_forever()
+        finally:
+            self.app.frame_store.remove_listener(self._frame_arrived)
+
+    async def close(self):
+        self._server.close()
+        await self._server.wait_closed()
+        self.app.frame_store.remove_listener(self._frame_arrived)
+
+    def _frame_arrived(self):
+        """On the frame processing thread, just pass it on to the loop."""
+        self._loop.call_soon_threadsafe(self._wake_streams)
+
+    def _wake_streams(self):
+        event, self._frame_event = self._frame_event, asyncio.Event()
+        event.set()
+
+    async def _handle(self, reader, writer):
+        try:
+            request = await self._read_request(reader)
+            if request is None:
+                return
+            method, path, query, headers, body = request
+
+            if path == '/video_feed' and method == 'GET':
+                await self._stream(writer, parse_qs(query).get('tier', ['auto'])[0])
+            elif path == '/telemetry' and method == 'GET':
+                await self._stream_telemetry(writer)
+            elif path == '/snapshot.jpg' and method == 'GET':
+                await self._snapshot(writer, parse_qs(query).get('after', [None])[0], headers.get('if-none-match'))
+            else:
+                await self._call_flask(writer, method, path, query, headers, body)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass # they went away
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader):
+        head = await reader.readuntil(b'\r\n\r\n')
+        lines = head.decode('latin-1').split('\r\n')
+        try:
+            method, target, _ = lines[0].split(' ', 2)
+        except ValueError:
+            return None
+
+        headers = {}
+        for line in lines[1:]:
+            if ':' in line:
+                name, value = line.split(':', 1)
+                headers[name.strip().lower()] = value.strip()
+        length = int(headers.get('content-length') or 0)
+        body = await reader.readexactly(length) if length else b''
+
+        path, _, query = target.partition('?')
+        return method, unquote(path), query, headers, body
+
+    async def _stream(self, writer, tier):
+        if tier != 'auto' and tier not in TIERS:
+            await self._respond(writer, '400 Bad Request', [('Content-Type', 'text/plain')],
+                                f'Unknown tier {tier}, try auto, {", ".join(TIERS)}\n'.encode())
+            return
+
+        writer.write(self._head('200 OK', [
+            ('Content-Type', f'multipart/x-mixed-replace; boundary={BOUNDARY.decode()}'),
+            ('Cache-Control', 'no-cache, no-store, must-revalidate'),
+            ('Pragma', 'no-cache'),
+            ('Expires', '0'),
+        ]))
+
+        frame_store = self.app.frame_store
+        negotiator = TierNegotiator() if tier == 'auto' else None
+        last_timestamp = 0
+        last_sent = 0
+        frame_store.add_consumer()
+        try:
+            while True:
+                await self._throttle()
+
+                stream_tier = negotiator.tier if negotiator else TIERS[tier]
+                if stream_tier.max_fps:
+                    pause = last_sent + 1 / stream_tier.max_fps - time.monotonic()
+                    if pause > 0:
+                        await asyncio.sleep(pause)
+
+                # wait for a frame newer than the last one sent
+                event = self._frame_event
+                frame, timestamp = frame_store.peek()
+                if timestamp <= last_timestamp:
+                    if not frame_store.is_running:
+                        break
+                    await event.wait()
+                    continue
+
+                jpeg = await self._loop.run_in_executor(None, frame_store.jpeg, frame, timestamp, stream_tier)
+                if jpeg is not None:
+                    last_sent = time.monotonic()
+                    writer.write(b'--' + BOUNDARY + b'\r\nContent-Type: image/jpeg\r\n\r\n' + jpeg + b'\r\n')
+                    await writer.drain() # waits while the client's socket is backed up, frames meanwhile are skipped
+                    if negotiator:
+                        negotiator.delivered(time.monotonic() - last_sent)
+                last_timestamp = timestamp
+        finally:
+            frame_store.remove_consumer()
+
+    async def _stream_telemetry(self, writer):
+        writer.write(self._head('200 OK', [('Content-Type', 'text/event-stream'), ('Cache-Control', 'no-cache')]))
+
+        frame_store = self.app.frame_store
+        last_timestamp = 0
+        frame_store.add_telemetry_client()
+        try:
+            while True:
+                event = self._frame_event
+                telemetry, timestamp = frame_store.peek_telemetry()
+                if timestamp <= last_timestamp:
+                    if not frame_store.is_running:
+                        break
+                    await event.wait()
+                    continue
+
+                if telemetry is not None:
+                    writer.write(f'data: {to_json(telemetry)}\n\n'.encode())
+                    await writer.drain()
+                last_timestamp = timestamp
+        finally:
+            frame_store.remove_telemetry_client()
+
+    async def _snapshot(self, writer, after, if_none_match):
+        """The same as the Flask /snapshot.jpg."""
+        frame_store = self.app.frame_store
+        try:
+            after = None if after is None else float(after)
+        except ValueError:
+            after = None # as Flask ignores a bad ?after=
+
+        if after is not None:
+            deadline = time.monotonic() + SNAPSHOT_WAIT
+            while True:
+                event = self._frame_event
+                _, timestamp = frame_store.peek()
+                remaining = deadline - time.monotonic()
+                if timestamp > after or not frame_store.is_running or remaining <= 0:
+                    break
+                try:
+                    await asyncio.wait_for(event.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+
+        frame, timestamp = frame_store.peek()
+        if frame is None:
+            await self._respond(writer, '503 Service Unavailable', [('Content-Type', 'text/plain'), ('Retry-After', '1')],
+                                b'No frame yet\n')
+            return
+
+        etag = snapshot_etag(timestamp)
+        headers = [('ETag', f'"{etag}"'), ('Cache-Control', 'no-cache')]
+        if etag in parse_etags(if_none_match):
+            await self._respond(writer, '304 Not Modified', headers, b'')
+            return
+
+        jpeg = await self._loop.run_in_executor(None, frame_store.jpeg, frame, timestamp, SNAPSHOT_TIER)
+        if jpeg is None:
+            await self._respond(writer, '500 Internal Server Error', [('Content-Type', 'text/plain')], b'Frame would not encode\n')
+            return
+        await self._respond(writer, '200 OK', [('Content-Type', 'image/jpeg')] + headers, jpeg)
+
+    async def _throttle(self):
+        """TemperatureMonitor.throttle, without blocking the loop."""
+        temp_monitor = self.app.temp_monitor
+        while temp_monitor.overheat_event.is_set():
+            await asyncio.sleep(1)
+        if temp_monitor.throttle_time is not None:
+            await asyncio.sleep(temp_monitor.throttle_time)
+
+    async def _call_flask(self, writer, method, path, query, headers, body):
+        """Run the request through the Flask app on a pool thread, passing the response on as it comes."""
+        environ = {
+            'REQUEST_METHOD': method,
+            'SCRIPT_NAME': '',
+            'PATH_INFO': path,
+            'QUERY_STRING': query,
+            'SERVER_NAME': self.host,
+            'SERVER_PORT': str(self.port),
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'CONTENT_TYPE': headers.get('content-type', ''),
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': 'http',
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        for name, value in headers.items():
+            if name not in ('content-type', 'content-length'):
+                environ['HTTP_' + name.upper().replace('-', '_')] = value
+
+        started = {}
+
+        def start_response(status, response_headers, exc_info=None):
+            started['status'], started['headers'] = status, response_headers
+
+        def next_chunk(chunks):
+            return next(chunks, None)
+
+        result = await self._loop.run_in_executor(None, self.app.app.wsgi_app, environ, start_response)
+        try:
+            chunks = iter(result)
+            chunk = await self._loop.run_in_executor(None, next_chunk, chunks) # headers are set by the first chunk
+            writer.write(self._head(started['status'], started['headers']))
+            while chunk is not None:
+                writer.write(chunk)
+                await writer.drain()
+                chunk = await self._loop.run_in_executor(None, next_chunk, chunks)
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+
+    async def _respond(self, writer, status, headers, body):
+        writer.write(self._head(status, headers + [('Content-Length', str(len(body)))]) + body)
+        await writer.drain()
+
+    def _head(self, status, headers):
+        lines = [f'HTTP/1.1 {status}'] + [f'{name}: {value}' for name, value in headers if name.lower() != 'connection']
+        return ('\r\n'.join(lines + ['Connection: close', '', ''])).encode('latin-1')
+
+    def _log(self, message):
+        print(f"[AsyncStreamServer] {message}")
@@ -0,0 +1,114 @@
+# app/box_propagator.py
+
+import cv2
+import numpy as np
+
+class BoxPropagator:
+    """
+    Carries a target's box from frame to frame with sparse optical flow, so the tracker
+    and servos get a fresh position on frames the detector doesn't run on.
+    Confidence decays every frame, and with every feature point lost, so it's a cue for when
+    to run the detector again.
+    """
+
+    def __init__(self, max_points=40, min_points=6, confidence_decay=0.95):
+        self._max_points = max_points
+        self._min_points = min_points
+        self._confidence_decay = confidence_decay
+        self._max_round_trip_error = 1.0 # px
+        self._lk_params = dict(
+            winSize=(15, 15),
+            maxLevel=2,
+            criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03)
+        )
+        self._last_gray = None
+        self._points = None
+
+        # public vars
+        self.detection = None
+
+    @property
+    def active(self):
+        return self.detection is not None
+
+    def start(self, frame, detection):
+        """Pick feature points inside the detection's box to follow."""
+        gray = self._gray(frame)
+        x1, y1, x2, y2 = self._box(detection, gray.shape)
+
+        mask = np.zeros_like(gray)
+        mask[y1:y2, x1:x2] = 255
+        points = cv2.goodFeaturesToTrack(gray, maxCorners=self._max_points, qualityLevel=0.01, minDistance=3, mask=mask)
+
+        if points is None or len(points) < self._min_points:
+            self.stop()
+            return False
+
+        self._last_gray = gray
+        self._points = points
+        self.detection = detection
+        return True
+
+    def stop(self):
+        self._last_gray = None
+        self._points = None
+        self.detection = None
+
+    def propagate(self, frame):
+        """
+        Move the box to where its points went. Returns the moved detection, or None if
+        too many points were lost to trust it.
+        """
+        if not self.active:
+            return None
+
+        gray = self._gray(frame)
+        points, status, _ = cv2.calcOpticalFlowPyrLK(self._last_gray, gray, self._points, None, **self._lk_params)
+
+        # only trust points that flow back to where they started
+        back, back_status, _ = cv2.calcOpticalFlowPyrLK(gray, self._last_gray, points, None, **self._lk_params)
+        round_trip_error = np.linalg.norm((self._points - back).reshape(-1, 2), axis=1)
+        tracked = (status.flatten() == 1) & (back_status.flatten() == 1) & (round_trip_error < self._max_round_trip_error)
+        if tracked.sum() < self._min_points:
+            self.stop()
+            return None
+
+        old = self._points[tracked].reshape(-1, 2)
+        new = points[tracked].reshape(-1, 2)
+        shift_x, shift_y = np.median(new - old, axis=0)
+        scale = self._scale_change(old, new)
+
+        box = self.detection['box']
+        centre_x = (box['x1'] + box['x2']) / 2 + shift_x
+        centre_y = (box['y1'] + box['y2']) / 2 + shift_y
+        half_width = (box['x2'] - box['x1']) * scale / 2
+        half_height = (box['y2'] - box['y1']) * scale / 2
+
+        confidence = self.detection['confidence'] * self._confidence_decay * tracked.mean()
+        self.detection = dict(self.detection, confidence=float(confidence), box={
+            'x1': float(centre_x - half_width),
+            'y1': float(centre_y - half_height),
+            'x2': float(centre_x + half_width),
+            'y2': float(centre_y + half_height),
+        })
+        self._last_gray = gray
+        self._points = new.reshape(-1, 1, 2)
+        return self.detection
+
+    def _scale_change(self, old, new):
+        """How much bigger the points' spread got, i.e. the target coming closer."""
+        old_spread = np.linalg.norm(old - old.mean(axis=0), axis=1).mean()
+        new_spread = np.linalg.norm(new - new.mean(axis=0), axis=1).mean()
+        if old_spread < 1:
+            return 1.0
+        return float(np.clip(new_spread / old_spread, 0.8, 1.25))
+
+    def _gray(self, frame):
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+
+    def _box(self, detection, shape):
+        height, width = shape
+        box = detection['box']
+        x1, x2 = np.clip([box['x1'], box['x2']], 0, width).astype(int)
+        y1, y2 = np.clip([box['y1'], box['y2']], 0, height).astype(int)
+        return x1, y1, x2, y2
@@ -0,0 +1,135 @@
+# app/clock.py
+
+import threading
+import time
+
+
+class Clock:
+    """
+    The time, for everything that waits for cooldowns, scan intervals, save delays and
+    throttling.  This one is the real thing; pass a VirtualClock instead to fast-forward.
+    """
+
+    def time(self):
+        return time.time()
+
+    def monotonic(self):
+        return time.monotonic()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+    def wait(self, event, timeout):
+        """Sleep for timeout seconds, or until event is set.  True if it was set."""
+        return event.wait(timeout)
+
+
+# The real clock, the default wherever a clock can be passed in
+wall_clock = Clock()
+
+
+class _Sleeper:
+
+    def __init__(self, thread, until):
+        self.thread = thread
+        self.until = until
+        self.woken = False
+
+
+class VirtualClock(Clock):
+    """
+    A clock that only moves when it's told to, so a day of patrols, fire events, cooldowns
+    and throttling can be run in seconds.
+
+    The thread that made it drives it: advance() moves time on, and its own sleeps just
+    advance the clock.  Other threads' sleeps block until time is advanced past them.
+    advance() wakes them one at a time, in order, each at the moment it asked for, and
+    waits for it to go back to sleep (or finish) before moving on, so runs are repeatable.
+    """
+
+    def __init__(self, start=None, settle_timeout=1.0):
+        self._now = time.time() if start is None else start # from now, unless told otherwise
+        self._settle_timeout = settle_timeout # real seconds to wait for a woken thread to sleep again
+        self._sleepers = []
+        self._condition = threading.Condition()
+        self._driver = threading.current_thread()
+
+    def time(self):
+        with self._condition:
+            return self._now
+
+    def monotonic(self):
+        return self.time()
+
+    @property
+    def sleepers(self):
+        """How many threads are waiting for the clock."""
+        with self._condition:
+            return len(self._sleepers)
+
+    def sleep(self, seconds):
+        if threading.current_thread() is self._driver:
+            self.advance(seconds)
+        else:
+            self._sleep_until(self.time() + seconds)
+
+    def wait(self, event, timeout):
+        if event.is_set():
+            return True
+        if threading.current_thread() is self._driver:
+            self.advance(timeout)
+        else:
+            self._sleep_until(self.time() + timeout, event)
+        return event.is_set()
+
+    def advance(self, seconds):
+        """Move time on by seconds, waking every thread that was sleeping till then."""
+        with self._condition:
+            end = self._now + seconds
+            while True:
+                due = [sleeper for sleeper in self._sleepers if sleeper.until <= end]
+                if not due:
+                    break
+
+                sleeper = min(due, key=lambda sleeper: sleeper.until)
+                self._sleepers.remove(sleeper)
+                self._now = max(self._now, sleeper.until)
+                sleeper.woken = True
+                self._condition.notify_all()
+                self._settle(sleeper.thread)
+
+            self._now = max(self._now, end)
+
+    def wait_for_sleepers(self, count=1, timeout=1.0):
+        """Wait, in real time, for count threads to be sleeping, e.g. once a thread's been started."""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while len(self._sleepers) < count:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+            return True
+
+    def _sleep_until(self, until, event=None):
+        with self._condition:
+            sleeper = _Sleeper(threading.current_thread(), until)
+            self._sleepers.append(sleeper)
+            self._condition.notify_all()
+
+            while not sleeper.woken:
+                if event is None:
+                    self._condition.wait()
+                elif event.is_set():
+                    self._sleepers.remove(sleeper)
+                    self._condition.notify_all()
+                    break
+                else:
+                    self._condition.wait(0.005) # events can't wake us, so keep an eye on it
+
+    def _settle(self, thread):
+        """Wait, in real time, for thread to sleep again, finish, or take too long about it."""
+        deadline = time.monotonic() + self._settle_timeout
+        while (thread.is_alive() and time.monotonic() < deadline
+               and not any(sleeper.thread is thread for sleeper in self._sleepers)):
+            self._condition.wait(0.001)
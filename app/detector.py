@@ -1,59 +1,254 @@
 #!/usr/bin/env python3
 
 from app.hailo_inference import HailoInference
-import json
+import numpy as np
+import os
+import shutil
 
 class BaseDetector:
     """
     Base class for object detection.
+
+    Set tile_size to detect in overlapping tile_size x tile_size tiles as well as the whole
+    frame, so small distant chickens aren't lost when the frame is shrunk to the model's input.
+    All tiles go through the model as one batch and boxes are merged across seams with NMS.
     """
 
-    def __init__(self, threshold=0.5, target_classes=['bird'], avoid_classes=['person']):
+    def __init__(self, threshold=0.5, target_classes=['bird'], avoid_classes=['person'], tile_size=None, tile_overlap=0.25, nms_threshold=0.5):
         self._threshold = threshold
         self._target_classes = target_classes
         self._avoid_classes = avoid_classes
-        self.annotated_frame = None
+        self._tile_size = tile_size
+        self._tile_overlap = tile_overlap
+        self._nms_threshold = nms_threshold
+        self._containment_threshold = 0.8
+        self.frame = None
         self.detections = []
         self.targets = []
         self.aversions = []
 
-    def detect_objects(self, frame, classes):
+    @property
+    def tiled(self):
+        return self._tile_size is not None
+
+    def detect_objects(self, frame, regions=None):
+        """
+        Detect objects in the frame, updating detections, targets and aversions.
+        Returns the frame untouched - drawing is left to the OverlayCompositor.
+
+        When tiling, regions is an optional list of (x1, y1, x2, y2) boxes, e.g. where there
+        was motion or a target last frame.  Only tiles touching them are run.  An empty list
+        means just the whole frame.
+        """
+        if self.tiled:
+            detections = self._detect_tiled(frame, regions)
+        else:
+            detections = self._detect_batch([frame])[0]
+
+        self._set_detections(frame, detections)
+        return frame
+
+    def _detect_batch(self, images):
+        """Run the model over a batch of images, returning a list of detections for each."""
         raise NotImplementedError("This method should be overridden by subclasses.")
 
+    def release(self):
+        """Free any model resources. Nothing to do by default."""
+        pass
+
+    def _set_detections(self, frame, detections):
+        self.frame = frame
+        self.detections = detections
+        self.aversions = [item for item in self.detections if item['name'] in self._avoid_classes]
+        self.targets = [item for item in self.detections if item['name'] in self._target_classes]
+
+    def _detect_tiled(self, frame, regions=None):
+        height, width = frame.shape[:2]
+        tiles = [(0, 0, width, height)] + self._tiles(width, height, regions)
+        images = [frame[y1:y2, x1:x2] for x1, y1, x2, y2 in tiles]
+
+        detections = []
+        for (tile_x, tile_y, _, _), tile_detections in zip(tiles, self._detect_batch(images)):
+            for det in tile_detections:
+                box = det['box']
+                detections.append(dict(det, box={
+                    'x1': box['x1'] + tile_x,
+                    'y1': box['y1'] + tile_y,
+                    'x2': box['x2'] + tile_x,
+                    'y2': box['y2'] + tile_y,
+                }))
+
+        return self._merge_detections(detections)
+
+    def _tiles(self, width, height, regions=None):
+        """Overlapping tiles covering the frame, or just those touching regions."""
+        size = self._tile_size
+        stride = max(1, int(size * (1 - self._tile_overlap)))
+
+        def starts(length):
+            if length <= size:
+                return [0]
+            return sorted(set(list(range(0, length - size, stride)) + [length - size]))
+
+        tiles = [
+            (x, y, min(x + size, width), min(y + size, height))
+            for y in starts(height)
+            for x in starts(width)
+        ]
+
+        if regions is not None:
+            tiles = [
+                tile for tile in tiles
+                if any(tile[0] < r[2] and r[0] < tile[2] and tile[1] < r[3] and r[1] < tile[3] for r in regions)
+            ]
+
+        return tiles
+
+    def _merge_detections(self, detections):
+        """
+        Class aware NMS, so the same chicken found in several tiles is only reported once.
+        Boxes mostly inside a kept box are dropped too - they're the chicken cut in half by a tile seam.
+        """
+        if not detections:
+            return []
+
+        boxes = np.array([[d['box']['x1'], d['box']['y1'], d['box']['x2'], d['box']['y2']] for d in detections], dtype=np.float32)
+        scores = np.array([d['confidence'] for d in detections], dtype=np.float32)
+        classes = np.array([d['class'] for d in detections])
+        areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+
+        # best first, and whole chickens before halves
+        order = list(np.lexsort((-areas, -scores)))
+        keep = []
+        while order:
+            best = order.pop(0)
+            keep.append(best)
+            if not order:
+                break
+
+            rest = np.array(order)
+            x1 = np.maximum(boxes[best, 0], boxes[rest, 0])
+            y1 = np.maximum(boxes[best, 1], boxes[rest, 1])
+            x2 = np.minimum(boxes[best, 2], boxes[rest, 2])
+            y2 = np.minimum(boxes[best, 3], boxes[rest, 3])
+            intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+            iou = intersection / (areas[best] + areas[rest] - intersection)
+            inside = intersection / np.maximum(areas[rest], 1)
+
+            duplicate = (classes[rest] == classes[best]) & ((iou > self._nms_threshold) | (inside > self._containment_threshold))
+            order = list(rest[~duplicate])
+
+        return [detections[i] for i in keep]
+
 
 class CPUDetector(BaseDetector):
     """
     Handles object detection using a YOLO model on CPU.
+
+    backend is 'torch' to run the PyTorch model as is, or 'onnx' / 'openvino' to run an
+    exported model through ONNX Runtime / OpenVINO, optionally int8 quantized. Exports
+    are slow, so they're cached in cache_dir by model name, input size and backend.
+    Tiled detectors export with a dynamic batch size, so all the tiles run in one call.
     """
-    def __init__(self, model_name='yolov10n.pt', **kwargs):
+    BACKENDS = ['torch', 'onnx', 'openvino']
+
+    def __init__(self, model_name='yolov10n.pt', backend='torch', int8=False, imgsz=640, cache_dir='compiled_models', **kwargs):
         super().__init__(**kwargs)
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown CPU backend '{backend}', expected one of {self.BACKENDS}")
+
+        self._backend = backend
+        self._int8 = int8
+        self._imgsz = imgsz
+        self._cache_dir = cache_dir
         try:
             from ultralytics import YOLO
-            self.model = YOLO(model_name)
+            self.model = self._load_model(YOLO, model_name)
 
         except ImportError:
             raise ImportError("ultralytics package is required for CPU-based detection. Install with: pip install ultralytics")
 
-    def detect_objects(self, frame):
-        results = self.model(frame, verbose=False)
-        detections = json.loads(results[0].to_json())
-        self.annotated_frame = results[0].plot()
-        self.detections = detections
-        self.aversions = [item for item in self.detections if item['name'] in self._avoid_classes]
-        self.targets = [item for item in self.detections if item['name'] in self._target_classes]
+        # Only ask the model for classes we care about, so everything else is dropped before NMS
+        classes_of_interest = self._target_classes + self._avoid_classes
+        self._class_ids = [class_id for class_id, name in self.model.names.items() if name in classes_of_interest]
+
+    def _load_model(self, YOLO, model_name):
+        if self._backend == 'torch':
+            return YOLO(model_name)
+
+        compiled_path = self._compiled_model_path(model_name)
+        if not os.path.exists(compiled_path):
+            self._compile_model(YOLO, model_name, compiled_path)
+
+        return YOLO(compiled_path, task='detect')
+
+    def _compiled_model_path(self, model_name):
+        """
+        Where the compiled model is cached. Ultralytics picks the runtime from the
+        name, so onnx models end in .onnx and openvino models in _openvino_model.
+        """
+        stem = os.path.splitext(os.path.basename(model_name))[0]
+        key = f"{stem}_{self._imgsz}" + ('_int8' if self._int8 else '') + ('_dynamic' if self.tiled else '')
+        if self._backend == 'onnx':
+            return os.path.join(self._cache_dir, f"{key}.onnx")
+        return os.path.join(self._cache_dir, f"{key}_openvino_model")
+
+    def _compile_model(self, YOLO, model_name, compiled_path):
+        print(f"Compiling {model_name} for {self._backend}{' int8' if self._int8 else ''}, this only happens once...")
+        os.makedirs(self._cache_dir, exist_ok=True)
+
+        if self._backend == 'onnx':
+            exported = YOLO(model_name).export(format='onnx', imgsz=self._imgsz, dynamic=self.tiled)
+            if self._int8:
+                # ultralytics doesn't quantize onnx exports, so let onnxruntime do it
+                try:
+                    from onnxruntime.quantization import quantize_dynamic, QuantType
+                except ImportError:
+                    raise ImportError("onnxruntime package is required for int8 ONNX models. Install with: pip install onnxruntime")
+                quantize_dynamic(exported, compiled_path, weight_type=QuantType.QUInt8)
+                os.remove(exported)
+                return
+        else:
+            exported = YOLO(model_name).export(format='openvino', imgsz=self._imgsz, int8=self._int8, dynamic=self.tiled)
 
-        return self.annotated_frame
+        shutil.move(exported, compiled_path)
+
+    def _detect_batch(self, images):
+        results = self.model(images, verbose=False, classes=self._class_ids, imgsz=self._imgsz)
+        return [self._to_detections(result) for result in results]
+
+    def _to_detections(self, result):
+        """Read boxes, classes and confidences straight off the result tensors, in ultralytics json format."""
+        boxes = result.boxes.cpu().numpy()
+        return [
+            {
+                'name': result.names[class_id],
+                'class': class_id,
+                'confidence': confidence,
+                'box': {'x1': x1, 'y1': y1, 'x2': x2, 'y2': y2},
+            }
+            for (x1, y1, x2, y2), class_id, confidence in zip(
+                boxes.xyxy.tolist(), boxes.cls.astype(int).tolist(), boxes.conf.tolist()
+            )
+        ]
 
 
 class HailoDetector(BaseDetector):
     """
     Handles object detection using the Hailo AI hat.
     """
-    def __init__(self, hef_path, threshold=0.5, **kwargs):
+    def __init__(self, hef_path, threshold=0.5, max_in_flight=4, **kwargs):
         super().__init__(**kwargs)
 
         self.hef_path = hef_path
-        self.model = HailoInference(hef_path, threshold=threshold)
+        self.model = HailoInference(
+            hef_path,
+            threshold=threshold,
+            max_in_flight=max_in_flight,
+            classes=self._target_classes + self._avoid_classes,
+            structured_output=True
+        )
+        self.detection_array = None
 
     @classmethod
     def is_ai_hat_installed(cls):
@@ -64,15 +259,45 @@ class HailoDetector(BaseDetector):
         except ImportError:
             return False
     
-    def detect_objects(self, frame):
-        
-        annotated_frame, detections = self.model.infer(frame)
+    def detect_objects(self, frame, regions=None):
+        if self.tiled:
+            # detection_array only describes whole frame detections
+            self.detection_array = None
+            return super().detect_objects(frame, regions)
 
-        self.detections = detections
-        self.annotated_frame = annotated_frame
-        self.aversions = [item for item in self.detections if item['name'] in self._avoid_classes]
-        self.targets = [item for item in self.detections if item['name'] in self._target_classes]
+        frame, detection_array = self.model.infer(frame)
+        self._update_detections(frame, detection_array)
+
+        return frame
+
+    def _detect_batch(self, images):
+        # every tile is in flight on the device at once
+        futures = [self.model.infer_async(image) for image in images]
+        return [self.model.detections_to_dicts(future.result(timeout=10)[1]) for future in futures]
+
+    def detect_objects_async(self, frame, callback=None):
+        """
+        Queue a frame for inference without waiting on the device.
+        Several frames can be in flight; results land in frame order, updating
+        targets and aversions before callback(frame) is called.
+        Returns a Future of (frame, detection_array).
+
+        Nothing in the app calls this yet - FrameProcessor waits on detect_objects(), so
+        whole frames go to the device one at a time.  Only tiled detection has more than
+        one job in flight, every tile at once.
+        """
+        def on_result(future):
+            if future.exception() is None:
+                self._update_detections(*future.result())
+                if callback:
+                    callback(self.frame)
+
+        return self.model.infer_async(frame, callback=on_result)
+
+    def release(self):
+        self.model.release()
 
-        # Process each detection
-        return annotated_frame
+    def _update_detections(self, frame, detection_array):
+        self.detection_array = detection_array
+        self._set_detections(frame, self.model.detections_to_dicts(detection_array))
 
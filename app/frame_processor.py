@@ -2,82 +2,271 @@
 
 import cv2
 import numpy as np
-import time
+from collections import namedtuple
+
+from app.overlay import OverlayCompositor
+from app.telemetry import detections_telemetry, tracker_telemetry
+from app.latency import FrameTrace
+from app.tracing import tracer
+from app.clock import wall_clock
+
+# What the detector, or optical flow, saw in a frame.  detected is False when the
+# targets were followed from the last detection rather than freshly detected.
+Observation = namedtuple('Observation', ['frame', 'interesting', 'detected', 'targets', 'aversions', 'trace'], defaults=[None])
 
 class FrameProcessor:
     """
     Processes frames to detect targets, calculate angles, and annotate frames.
+
+    process_frame does it all at once.  To run detection and aiming in different threads,
+    call observe(frame) in one and act(observation) with the result in the other.
+    Pass a FrameTrace to time each stage.
     """
 
-    def __init__(self, detector, target_tracker, hardware_controller):
+    def __init__(self, detector, target_tracker, hardware_controller, compositor=None, roi_tiling=False, motion_gate=None, keep_alive=30,
+                 box_propagator=None, detect_every=1, min_propagated_confidence=0.3, sleep_interval=0.5, clock=None):
         # config
+        self._clock = clock or wall_clock
         self._detector = detector
         self._target_tracker = target_tracker
         self._hardware_controller = hardware_controller
+        self._compositor = compositor or OverlayCompositor()
         self._brightness_threshold = 12
         self._uniformity_threshold = 25
+        self._thumbnail_width = 64 # px - plenty to tell if it's dark or covered
+        self._sleep_interval = sleep_interval # seconds - how often to look again while asleep
+        self._next_look = 0
+        self.asleep = False
+        self._roi_tiling = roi_tiling # only tile around things worth a closer look
+        self._roi_margin = 1.0 # grow regions by this many box widths/heights
+        self._motion_gate = motion_gate # skip detection on static frames
+        self._keep_alive = keep_alive # seconds - detect at least this often, motion or not
+        self._last_detection = 0
+        self._box_propagator = box_propagator # follows the target between detections
+        self._detect_every = detect_every # frames - run the detector at least this often while following
+        self._min_propagated_confidence = min_propagated_confidence # or sooner, if we're losing it
+        self._frames_since_detection = 0
+        self._follow_request = None # (frame, target) to start following, target None to stop
         self._frame = None
+        self._detections = []
+        self._tracking = False
+        self._annotated_frame = None
+
+    @property
+    def target_tracker(self):
+        return self._target_tracker
 
-        # public vars
-        self.annotated_frame = None
+    @property
+    def frame(self):
+        """The last frame processed, untouched."""
+        return self._frame
+
+    @property
+    def annotated_frame(self):
+        """
+        The last frame with detections and targeting drawn on, for anyone wanting them burned
+        in.  The stream goes out clean, with telemetry(), so nothing in the frame loop asks;
+        it's drawn on first use.
+        """
+        if self._annotated_frame is None and self._frame is not None:
+            tracker = self._target_tracker if self._tracking else None
+            self._annotated_frame = self._compositor.compose(self._frame, self._detections, tracker)
+        return self._annotated_frame
+
+    def telemetry(self):
+        """What the overlays show for the last frame, as plain values for JSON.  None before the first."""
+        if self._frame is None:
+            return None
+
+        height, width = self._frame.shape[:2]
+        return {
+            'width': width,
+            'height': height,
+            'asleep': self.asleep,
+            'detections': detections_telemetry(self._detections),
+            'target': tracker_telemetry(self._target_tracker) if self._tracking else None,
+        }
    
-    def process_frame(self, frame):
+    def process_frame(self, frame, trace=None):
         """
         Process a single frame.  This does all the work.  Spot a chicken and spray it.
         """
+        self.act(self.observe(frame, trace))
+
+    def observe(self, frame, trace=None):
+        """
+        Find targets and aversions in a frame, by detection or by following the last target.
+        Doesn't touch the tracker or hardware, so it can run while act() handles the last frame.
+        """
+        trace = trace or FrameTrace()
+        was_tracking = self._tracking
+        self._update_follow(frame)
+
+        if not self._awake(frame):
+            trace.mark('preprocess')
+            return Observation(frame, False, False, [], [], trace)
+
+        if was_tracking:
+            trace.mark('preprocess')
+            with tracer.span('follow_target', 'detector'):
+                target = self._follow_target(frame)
+            if target is not None:
+                trace.mark('inference')
+                return Observation(frame, True, False, [target], [], trace)
+
+        if self._should_detect(frame, was_tracking):
+            regions = self._regions_of_interest(was_tracking)
+            trace.mark('preprocess')
+            observation = self._detect(frame, regions, trace)
+            trace.mark('inference')
+            return observation
+
+        trace.mark('preprocess')
+        return Observation(frame, True, False, [], [], trace)
+
+    def act(self, observation):
+        """Aim, and maybe fire, at what observe() saw."""
+        trace = observation.trace or FrameTrace()
+        frame = observation.frame
         self._frame = frame
-        if self.is_interesting():
-            height, width = self._frame.shape[:2]
-            self.annotated_frame = self._detector.detect_objects(self._frame)
-            detections = self._detector.targets
-            aversions = self._detector.aversions
-
-            self._target_tracker.process_aversions(aversions)
-            if detections != []:
-                self._target_tracker.process_detections(detections, width, height)
-                self._hardware_controller.process_signals(self._target_tracker)
-                self.update_frame()
-            else:
-                self._target_tracker.nothing_detected() # deactivates fire event
-                self._hardware_controller.patrol()
-            
+        self._annotated_frame = None
+        self._detections = observation.targets + observation.aversions
+        self._tracking = False
+        if not observation.interesting:
+            self._target_tracker.nothing_detected()
+            self._hardware_controller.deactivate_solenoid() # don't leave the water on while asleep
+            trace.finish()
+            return
+
+        if observation.detected:
+            self._target_tracker.process_aversions(observation.aversions)
+
+        if observation.targets:
+            height, width = frame.shape[:2]
+            self._target_tracker.process_detections(observation.targets, width, height)
+            trace.mark('tracking')
+
+            relay_opened_at = self._hardware_controller.relay_opened_at if trace.recording else None
+            self._hardware_controller.process_signals(self._target_tracker)
+            trace.mark('servo')
+            if trace.recording and self._hardware_controller.relay_opened_at != relay_opened_at:
+                trace.since_capture('relay', self._hardware_controller.relay_opened_at)
+
+            self._tracking = True
+            if observation.detected and self._box_propagator is not None:
+                self._follow_request = (frame, self._target_tracker.target)
         else:
-            print('sleeping...')
-            time.sleep(10)
-            return frame
+            self._nothing_detected()
+            trace.mark('servo')
+
+        trace.finish()
             
     def fire(self):
         return self._target_tracker.fire
-             
-    def is_interesting(self):
-        
-        gray = cv2.cvtColor(self._frame, cv2.COLOR_BGR2GRAY)
-        average_brightness = np.mean(gray)
-        std_dev = np.std(gray)
-        
-        if average_brightness < self._brightness_threshold or std_dev < self._uniformity_threshold:
-            return False
+
+    def _detect(self, frame, regions, trace):
+        with tracer.span('detect_objects', 'detector'):
+            self._detector.detect_objects(frame, regions=regions)
+        self._last_detection = self._clock.time()
+        self._frames_since_detection = 0
+        return Observation(frame, True, True, self._detector.targets, self._detector.aversions, trace)
+
+    def _update_follow(self, frame):
+        """
+        Start or stop the box propagator as act() asked.  It's only ever used from
+        observe(), so it's never moved while it's being started.
+        """
+        request, self._follow_request = self._follow_request, None
+        if request is None or self._box_propagator is None:
+            return
+
+        target_frame, target = request
+        if target is None:
+            self._box_propagator.stop()
         else:
+            self._box_propagator.start(target_frame, target)
+
+    def _follow_target(self, frame):
+        """
+        Between detections, move the target's box with optical flow and aim at that instead.
+        Returns None when it's time for the detector - every detect_every frames, or when
+        the propagated box has lost too much confidence.
+        """
+        if self._box_propagator is None or not self._box_propagator.active:
+            return None
+
+        self._frames_since_detection += 1
+        if self._frames_since_detection >= self._detect_every:
+            return None
+
+        target = self._box_propagator.propagate(frame)
+        if target is None or target['confidence'] < self._min_propagated_confidence:
+            return None
+
+        return target
+
+    def _nothing_detected(self):
+        self._target_tracker.nothing_detected() # deactivates fire event
+        self._hardware_controller.patrol()
+        if self._box_propagator is not None:
+            self._follow_request = (None, None)
+
+    def _should_detect(self, frame, was_tracking):
+        """
+        Without a motion gate, always.  Otherwise only if something moved, we're
+        following a target, or it's been keep_alive seconds since we last looked.
+        """
+        if self._motion_gate is None:
             return True
 
+        motion = self._motion_gate.update(frame, camera_moved=self._hardware_controller.camera_moving())
+        return motion or was_tracking or self._clock.time() - self._last_detection >= self._keep_alive
+
+    def _regions_of_interest(self, was_tracking):
+        """
+        Regions for the detector to tile, or None to tile the whole frame.
+        Uses where the target was last frame, grown a little so it's still covered if it moved,
+        and anywhere the motion gate saw movement.
+        """
+        if not self._roi_tiling:
+            return None
 
-    def update_frame(self):
+        regions = []
+        t = self._target_tracker
+        if was_tracking and t.target is not None:
+            margin_x = t.width * self._roi_margin
+            margin_y = t.height * self._roi_margin
+            regions.append((t.x1 - margin_x, t.y1 - margin_y, t.x2 + margin_x, t.y2 + margin_y))
+        if self._motion_gate is not None:
+            regions += self._motion_gate.regions
+        return regions
+             
+    def _awake(self, frame):
         """
-        Draw bounding box, center point, and angle offsets on the frame.
+        Sleep while it's dark or the camera is covered.  Asleep, frames go straight through
+        untouched, apart from a quick look every sleep_interval to see if it's time to wake.
         """
-        t = self._target_tracker 
-        
-        # Draw bounding box and center point
-        cv2.rectangle(self.annotated_frame, (int(t.x1), int(t.y1)), (int(t.x2), int(t.y2)), (0, 255, 0), 2)
-        
-        # Set the circle color based on solenoid state
-        circle_color = (0, 0, 255) if t.fire else (0, 255, 0)  # Red if active, Green if not
-        cv2.circle(self.annotated_frame, (int(t.target_x), int(t.target_y)), 5, circle_color, -1)
+        if self.asleep and self._clock.time() < self._next_look:
+            return False
+
+        if self.is_interesting(frame):
+            if self.asleep:
+                print('waking...')
+                self.asleep = False
+            return True
+
+        if not self.asleep:
+            print('sleeping...')
+            self.asleep = True
+        self._next_look = self._clock.time() + self._sleep_interval
+        return False
 
-        # Display angle offsets on the frame
-        cv2.putText(self.annotated_frame, f'DX: {t.dx:.2f} deg, DY: {t.dy:.2f} deg', (10, 30),
-            cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 0, 0), 2)
+    def is_interesting(self, frame=None):
+        """False if the frame is too dark, or too uniform, e.g. the lens is covered. Judged from a thumbnail."""
+        frame = self._frame if frame is None else frame
+        step = max(1, frame.shape[1] // self._thumbnail_width)
+        thumbnail = np.ascontiguousarray(frame[::step, ::step])
+        gray = cv2.cvtColor(thumbnail, cv2.COLOR_BGR2GRAY)
+        mean, std_dev = cv2.meanStdDev(gray)
 
-        # Display angle offsets on the frame
-        cv2.putText(self.annotated_frame, f'Target: {t.target_name()}, Distance: {t.approx_distance():.2f}, Attack Angle: {t.attack_angle()}', (10, 90),
-            cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 0, 0), 2)
\ No newline at end of file
+        return mean[0, 0] >= self._brightness_threshold and std_dev[0, 0] >= self._uniformity_threshold
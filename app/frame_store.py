@@ -3,19 +3,40 @@
 import threading
 import time
 import cv2 
-from collections import deque
+from collections import deque, Counter
 import os
 
+from app.tracing import tracer
+from app.clock import wall_clock
+from app.streaming import TIERS, encode_jpeg
+from app.overlay import OverlayCompositor
+
 
 class FrameStore:
-    """Thread-safe store for the latest processed frame."""
+    """
+    Thread-safe store for the latest processed frame, and its telemetry - what's drawn
+    over it.  Frames are kept clean; overlays are drawn by the browser, and onto saved video.
+    """
     
-    def __init__(self, video_snapshot_seconds=10):
+    def __init__(self, video_snapshot_seconds=10, clock=None, compositor=None):
+        self._clock = clock or wall_clock
+        self._compositor = compositor or OverlayCompositor()
         self.lock = threading.Lock()
         self.latest_frame = None
+        self.telemetry = None
         self.timestamp = 0
         self.condition = threading.Condition(self.lock)
         self.is_running = True
+        self.consumers = 0
+        self.telemetry_clients = 0
+        self.bytes_written = 0
+        self._listeners = [] # called on every new frame, and on stopping, for those who can't wait on the condition
+
+        # The latest frame as a JPEG in each stream tier, encoded once for every client on it
+        self._jpegs = {} # tier name: (timestamp, bytes)
+        self._encode_locks = {name: threading.Lock() for name in TIERS}
+        self.jpeg_encodes = Counter() # by tier name
+        self.jpeg_bytes_served = Counter()
 
         # Video stuff - TBD, this class is doing two things, consider splitting
         self.video_snapshot_seconds = video_snapshot_seconds
@@ -27,43 +48,125 @@ class FrameStore:
         self.video_path = os.path.join(os.path.dirname(__file__), 'videos')
 
 
-    def update(self, frame):
-        """Update the latest frame and notify waiting threads."""
+    def update(self, frame, telemetry=None):
+        """Update the latest frame, and its telemetry, and notify waiting threads."""
         with self.condition:
             self.latest_frame = frame
-            self.timestamp = time.time()
+            self.telemetry = telemetry
+            self.timestamp = self._clock.time()
             
             with self.save_lock:
                 self.video.append({
                     'frame': frame, 
-                    'ts': self.timestamp
+                    'ts': self.timestamp,
+                    'telemetry': telemetry
                 })
                 if not self.saving:
                     # keep video while we're saving, so we always keep the buffer leading up to the save event
                     self._drop_old_video()
 
             self.condition.notify_all()
+        self._notify_listeners()
 
-    def get_latest(self, last_timestamp):
-        """Retrieve the latest frame newer than last_timestamp."""
+    def get_latest(self, last_timestamp, timeout=None):
+        """Retrieve the latest frame newer than last_timestamp, or the latest there is after timeout seconds."""
+        with self.condition:
+            self.condition.wait_for(lambda: self.timestamp > last_timestamp or not self.is_running, timeout)
+            return self.latest_frame, self.timestamp
+
+    def peek(self):
+        """The latest frame and its timestamp, without waiting for a new one."""
+        with self.condition:
+            return self.latest_frame, self.timestamp
+
+    def get_latest_telemetry(self, last_timestamp):
+        """The telemetry for the latest frame newer than last_timestamp, and the frame's timestamp."""
         with self.condition:
             while self.timestamp <= last_timestamp and self.is_running:
                 self.condition.wait()
 
-            return self.latest_frame, self.timestamp
+            return self.telemetry, self.timestamp
+
+    def peek_telemetry(self):
+        with self.condition:
+            return self.telemetry, self.timestamp
+
+    def get_latest_jpeg(self, last_timestamp, tier=TIERS['high']):
+        """
+        The latest frame newer than last_timestamp as JPEG bytes for a StreamTier, and its
+        timestamp.  Whoever asks first encodes it, everyone else after the same frame in the
+        same tier gets those bytes.  Bytes are None if there's no frame, or it wouldn't encode.
+        """
+        frame, timestamp = self.get_latest(last_timestamp)
+        return self.jpeg(frame, timestamp, tier), timestamp
+
+    def jpeg(self, frame, timestamp, tier=TIERS['high']):
+        """frame, stored at timestamp, as JPEG bytes for tier, encoded once however many ask."""
+        if frame is None:
+            return None
+
+        with self._encode_locks[tier.name]:
+            cached_timestamp, jpeg = self._jpegs.get(tier.name, (0, None))
+            if cached_timestamp != timestamp:
+                with tracer.span(f'encode_jpeg_{tier.name}', 'stream'):
+                    jpeg = encode_jpeg(frame, tier)
+                self.jpeg_encodes[tier.name] += 1
+                if timestamp > cached_timestamp: # a straggler on an older frame mustn't push out the newer one
+                    self._jpegs[tier.name] = (timestamp, jpeg)
+            if jpeg is not None:
+                self.jpeg_bytes_served[tier.name] += len(jpeg)
+
+        return jpeg
             
+    def add_consumer(self):
+        """Register someone watching the stream, e.g. a /video_feed client."""
+        with self.lock:
+            self.consumers += 1
+
+    def remove_consumer(self):
+        with self.lock:
+            self.consumers -= 1
+
+    def add_telemetry_client(self):
+        """Register a /telemetry client, counted apart from those watching the video."""
+        with self.lock:
+            self.telemetry_clients += 1
+
+    def remove_telemetry_client(self):
+        with self.lock:
+            self.telemetry_clients -= 1
+
+    def add_listener(self, listener):
+        """
+        Call listener() after every new frame and when stopping, e.g. to wake an event loop.
+        It's called on the frame processing thread, so it should only hand off, never wait.
+        """
+        with self.lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        with self.lock:
+            self._listeners.remove(listener)
+
     def stop(self):
         """Signal that frame processing has stopped."""
         self._stop_saving()
         self.is_running = False
         with self.condition: 
             self.condition.notify_all()
+        self._notify_listeners()
+
+    def _notify_listeners(self):
+        with self.lock:
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener()
 
     def save(self):
         """
         Starts a background thread to periodically clean up old frames.
         """
-        save_time = time.time() + (self.video_snapshot_seconds / 2)
+        save_time = self._clock.time() + (self.video_snapshot_seconds / 2)
 
         # if we have a thread waiting to save, restart it
         # so we only save one video when several events happen close together
@@ -80,7 +183,7 @@ class FrameStore:
         """
         Removes frames older than 'video_snapshot_seconds' from self.video using deque.
         """
-        current_time = time.time()
+        current_time = self._clock.time()
         cutoff = current_time - (self.video_snapshot_seconds / 2)
 
         while self.video and self.video[0]['ts'] < cutoff:
@@ -94,15 +197,14 @@ class FrameStore:
             self.saving = True
         
         while True:
-            if time.time() > save_time:
-                with self.save_lock:
+            if self._clock.time() > save_time:
+                with self.save_lock, tracer.span('save_video', 'video'):
                     self._save_video()
                     self.saving = False
                 break
-            if self.saving_stop_event.is_set():
-                break
-            else:
-                time.sleep(0.5)
+            with tracer.span('wait_to_save', 'video'):
+                if self._clock.wait(self.saving_stop_event, 0.5):
+                    break
 
     def _save_video(self):
         """Save the collected frames to a video file."""
@@ -113,15 +215,19 @@ class FrameStore:
         if not os.path.exists(self.video_path):
             os.makedirs(self.video_path)
         
-        timestamp = time.strftime("%Y%m%d-%H%M%S")
+        timestamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(self._clock.time()))
         filename = os.path.join(self.video_path, f"fire_event_{timestamp}.mp4")
         height, width, layers = self.video[0]['frame'].shape
         fourcc = cv2.VideoWriter_fourcc(*'mp4v')
         out = cv2.VideoWriter(filename, fourcc, self._frame_rate(), (width, height))
         
         for frame in self.video:
-            out.write(frame['frame'])
+            if frame['telemetry']:
+                out.write(self._compositor.compose_telemetry(frame['frame'], frame['telemetry']))
+            else:
+                out.write(frame['frame'])
         out.release()
+        self.bytes_written += os.path.getsize(filename)
         print(f"Saved video: {filename}")
 
     def _frame_rate(self): 
@@ -1,15 +1,30 @@
-
 import numpy as np
 import cv2
+import threading
 import queue
+from concurrent.futures import Future
 from functools import partial
 import os
 
+# One row per detection, boxes already scaled to the original frame
+DETECTION_DTYPE = np.dtype([
+    ('class', np.int32),
+    ('confidence', np.float32),
+    ('x1', np.int32),
+    ('y1', np.int32),
+    ('x2', np.int32),
+    ('y2', np.int32),
+])
+
 class HailoInference:
-    def __init__(self, hef_path, threshold=0.5, **kwargs):
-        #self.input_queue = queue.Queue()
-        self.output_queue = queue.Queue()
+    def __init__(self, hef_path, threshold=0.5, max_in_flight=4, classes=None, structured_output=False, **kwargs):
+        """
+        classes limits detections to those class names, e.g. target and avoid classes. None keeps everything.
+        structured_output returns detections as a DETECTION_DTYPE array rather than ultralytics style dicts.
+        """
         self._threshold = threshold
+        self._max_in_flight = max_in_flight
+        self._structured_output = structured_output
         os.environ['HAILORT_LOGGER_PATH'] = 'NONE'
         
         try:
@@ -30,38 +45,107 @@ class HailoInference:
         with open('coco.txt', 'r') as f:
             self.coco_labels = [line.strip() for line in f.readlines()]
 
-        
+        # Precomputed once, so decoding can mask out uninteresting classes in one go
+        self._class_mask = np.array([classes is None or label in classes for label in self.coco_labels])
+
+        # Pipelining - jobs run on the device while we get on with the next frame,
+        # but results are always handed back in the order the frames went in
+        self._sequence_lock = threading.Lock()
+        self._delivery_lock = threading.RLock()
+        self._next_sequence = 0
+        self._next_delivery = 0
+        self._completed = {}
+
+        # Configure once and keep it configured, rather than per frame
+        self._configured_context = None
+        self.configured_infer_model = None
+        self._binding_pool = None
+        self.configure()
 
+    def configure(self):
+        """Configure the model on the device, if it isn't already."""
+        if self.configured_infer_model is None:
+            self._configured_context = self.infer_model.configure()
+            self.configured_infer_model = self._configured_context.__enter__()
+            self._binding_pool = self._create_binding_pool(self.configured_infer_model)
+
+    def release(self):
+        """Wait for any jobs in flight, then release the configured model."""
+        if self.configured_infer_model is None:
+            return
+
+        # Every binding back in the pool means nothing is running on the device
+        for _ in range(self._max_in_flight):
+            try:
+                self._binding_pool.get(timeout=10)
+            except queue.Empty:
+                break
+
+        self._configured_context.__exit__(None, None, None)
+        self._configured_context = None
+        self.configured_infer_model = None
+        self._binding_pool = None
 
     def callback(
-        self, completion_info, bindings_list: list, input_batch: list,
+        self, completion_info, sequence, raw_frame, bindings_list: list, future,
     ) -> None:
-        
+        """Called by HailoRT when a job finishes. Post-processes and delivers the result."""
         if completion_info.exception:
-            logger.error(f'Inference error: {completion_info.exception}')
-        else:
-            for i, bindings in enumerate(bindings_list):
-                # If the model has a single output, return the output buffer. 
-                # Else, return a dictionary of output buffers, where the keys are the output names.
-                if len(bindings._output_names) == 1:
-                    result = bindings.output().get_buffer()
+            self._complete(sequence, future, bindings_list[0], exception=completion_info.exception)
+            return
+
+        try:
+            bindings = bindings_list[0]
+            # If the model has a single output, return the output buffer.
+            # Else, return a dictionary of output buffers, where the keys are the output names.
+            if len(bindings._output_names) == 1:
+                raw_detections = bindings.output().get_buffer()
+            else:
+                raw_detections = {
+                    name: np.expand_dims(
+                        bindings.output(name).get_buffer(), axis=0
+                    )
+                    for name in bindings._output_names
+                }
+
+            detections = self._decode_detections(raw_frame, raw_detections)
+            if not self._structured_output:
+                detections = self.detections_to_dicts(detections)
+            self._complete(sequence, future, bindings, result=(raw_frame, detections))
+        except Exception as e:
+            self._complete(sequence, future, bindings_list[0], exception=e)
+
+    def _complete(self, sequence, future, bindings, result=None, exception=None):
+        """
+        Record a finished job and deliver every result that is now in order.
+        Jobs can finish out of order, so later frames wait here for earlier ones.
+        Bindings go back in the pool as their result is delivered.
+        """
+        with self._delivery_lock:
+            self._completed[sequence] = (future, bindings, result, exception)
+
+            while self._next_delivery in self._completed:
+                future, bindings, result, exception = self._completed.pop(self._next_delivery)
+                self._next_delivery += 1
+                self._binding_pool.put(bindings)
+
+                if exception is not None:
+                    future.set_exception(exception)
                 else:
-                    result = {
-                        name: np.expand_dims(
-                            bindings.output(name).get_buffer(), axis=0
-                        )
-                        for name in bindings._output_names
-                    }
-                self.output_queue.put(result)
-
-    def _preprocess_frame(self, frame):
-        """Preprocess frame for Hailo input"""
+                    future.set_result(result)
+
+    def _preprocess_frame(self, frame, input_buffer):
+        """Preprocess frame for Hailo input, writing straight into the binding's input buffer"""
         # Resize frame to model input size (640x640)
-        frame_resized = cv2.resize(frame, (self.width, self.height))
         # Model expects UINT8 input in NHWC format, which is what we have
-        return frame_resized
+        if frame.shape == input_buffer.shape:
+            np.copyto(input_buffer, frame)
+        else:
+            cv2.resize(frame, (self.width, self.height), dst=input_buffer)
+        return input_buffer
 
     def _create_bindings(self, configured_infer_model) -> object:
+        """Create bindings with their own input and output buffers, allocated once and reused."""
         output_buffers = {
             output_info.name: np.empty(
                 self.infer_model.output(output_info.name).shape,
@@ -69,77 +153,96 @@ class HailoInference:
             )
         for output_info in self.hef.get_output_vstream_infos()
         }
-        return configured_infer_model.create_bindings(
+        bindings = configured_infer_model.create_bindings(
             output_buffers=output_buffers
         )
+        bindings.input().set_buffer(np.empty((self.height, self.width, 3), dtype=np.uint8))
+        return bindings
 
-    def infer(self, raw_frame):
-        with self.infer_model.configure() as configured_infer_model:
-            batch_data = [] # 
-            processed_frame = self._preprocess_frame(raw_frame)
-            batch_data.append(processed_frame.flatten())
-            
-            bindings_list = []
-            for frame in batch_data:
-                bindings = self._create_bindings(configured_infer_model)
-                bindings.input().set_buffer(np.array(frame))
-                bindings_list.append(bindings)
-
-            configured_infer_model.wait_for_async_ready(timeout_ms=10000)
-            job = configured_infer_model.run_async(
+    def _create_binding_pool(self, configured_infer_model):
+        """One set of bindings per job that can be in flight."""
+        pool = queue.Queue()
+        for _ in range(self._max_in_flight):
+            pool.put(self._create_bindings(configured_infer_model))
+        return pool
+
+    def infer_async(self, raw_frame, callback=None):
+        """
+        Start inference on a frame and return a Future of (frame, detections).
+        Blocks only while max_in_flight jobs are already running on the device.
+        Results, and callbacks, are delivered in the order frames were submitted.
+        """
+        future = Future()
+        if callback:
+            future.add_done_callback(callback)
+
+        # Waits here while every set of bindings is in flight
+        bindings = self._binding_pool.get()
+        with self._sequence_lock:
+            sequence = self._next_sequence
+            self._next_sequence += 1
+
+        try:
+            self._preprocess_frame(raw_frame, bindings.input().get_buffer())
+            bindings_list = [bindings]
+
+            self.configured_infer_model.wait_for_async_ready(timeout_ms=10000)
+            self.configured_infer_model.run_async(
                 bindings_list, partial(
                     self.callback,
-                    input_batch=batch_data,
-                    bindings_list=bindings_list
+                    sequence=sequence,
+                    raw_frame=raw_frame,
+                    bindings_list=bindings_list,
+                    future=future
                 )
             )
-            job.wait(10000)  # Wait for the last job
+        except Exception as e:
+            self._complete(sequence, future, bindings, exception=e)
 
-            raw_detections = self.output_queue.get() # One frame in, so there should be only one frame out
-            detections = self._extract_detections(raw_frame, raw_detections)
-            annotated_frame = self._visualise_detections(raw_frame, detections)
-            
-            return annotated_frame, detections
+        return future
+
+    def infer(self, raw_frame):
+        """Run inference on a single frame and wait for the result."""
+        return self.infer_async(raw_frame).result(timeout=10)
 
     def _extract_detections(self, original_frame, input_data):
-        
-        result = []
+        return self.detections_to_dicts(self._decode_detections(original_frame, input_data))
+
+    def _decode_detections(self, original_frame, input_data):
+        """
+        Decode NMS by class output - one (n, 5) array of [y1, x1, y2, x2, score] per class -
+        into a DETECTION_DTYPE array, thresholding, masking and scaling every box at once.
+        """
         height, width = original_frame.shape[:2]
-        
-        for i, detection in enumerate(input_data):
-            if len(detection) == 0 :
-                continue
-
-            for det in detection:
-                bbox, score = det[:4], det[4]
-
-                if score < self._threshold:
-                    continue
-
-                # append in ultralytics format
-                result.append({
-                    'name': self.coco_labels[i],
-                    'class': i,
-                    'box': {
-                        'x1': int(bbox[1] * width),
-                        'y1': int(bbox[0] * height),
-                        'x2': int(bbox[3] * width),
-                        'y2': int(bbox[2] * height),
-                    },
-                    'confidence': score,
-                    
-                })    
-                
+
+        counts = np.fromiter((len(detection) for detection in input_data), dtype=np.intp, count=len(input_data))
+        if counts.sum() == 0:
+            return np.empty(0, dtype=DETECTION_DTYPE)
+
+        raw = np.concatenate([np.asarray(detection, dtype=np.float32).reshape(-1, 5) for detection in input_data if len(detection)])
+        classes = np.repeat(np.arange(len(input_data)), counts)
+
+        keep = raw[:, 4] >= self._threshold
+        keep &= self._class_mask[classes]
+        raw = raw[keep]
+
+        # [y1, x1, y2, x2] normalised -> [x1, y1, x2, y2] pixels
+        boxes = (raw[:, [1, 0, 3, 2]] * np.array([width, height, width, height], dtype=np.float32)).astype(np.int32)
+
+        result = np.empty(len(raw), dtype=DETECTION_DTYPE)
+        result['class'] = classes[keep]
+        result['confidence'] = raw[:, 4]
+        result['x1'], result['y1'], result['x2'], result['y2'] = boxes.T
         return result
-        
-    def _visualise_detections(self, frame, detections):
-        
-        # Draw detections on frame
-        frame_with_boxes = frame.copy()
-        for det in detections:
-            y1, x1, y2, x2 = det['box']['y1'], det['box']['x1'], det['box']['y2'], det['box']['x2']
-            cv2.rectangle(frame_with_boxes, (x1, y1), (x2, y2), (0, 255, 0), 2)
-            cv2.putText(frame_with_boxes, f"{det['name']}: {det['confidence']:.2f}", 
-                       (x1, y1-10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
-        
-        return frame_with_boxes
+
+    def detections_to_dicts(self, detection_array):
+        """Convert a DETECTION_DTYPE array to ultralytics style detections."""
+        return [
+            {
+                'name': self.coco_labels[class_id],
+                'class': class_id,
+                'box': {'x1': x1, 'y1': y1, 'x2': x2, 'y2': y2},
+                'confidence': confidence,
+            }
+            for class_id, confidence, x1, y1, x2, y2 in detection_array.tolist()
+        ]
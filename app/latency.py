@@ -0,0 +1,101 @@
+# app/latency.py
+
+import threading
+import time
+from collections import deque
+import numpy as np
+
+from app.metrics import Histogram
+
+
+class FrameTrace:
+    """
+    Timestamps for one frame on its way from the camera sensor to the solenoid.
+
+    Each mark(stage) records how long since the last mark, so stages are measured back to back.
+    capture_time is when the sensor captured the frame, on the time.monotonic clock, if the
+    camera knows it.  Without a monitor the marks go nowhere, which keeps callers simple.
+    """
+    __slots__ = ('_monitor', '_start', '_last', '_durations')
+
+    def __init__(self, monitor=None, capture_time=None):
+        now = time.monotonic()
+        self._monitor = monitor
+        self._start = capture_time if capture_time is not None else now
+        self._last = now
+        self._durations = []
+        if capture_time is not None:
+            self._durations.append(('capture', now - capture_time))
+
+    @property
+    def recording(self):
+        return self._monitor is not None
+
+    def mark(self, stage):
+        """The stage just finished."""
+        now = time.monotonic()
+        self._durations.append((stage, now - self._last))
+        self._last = now
+
+    def since_capture(self, stage, timestamp):
+        """Record how long after capture something happened, e.g. the relay opening."""
+        self._durations.append((stage, timestamp - self._start))
+
+    def finish(self):
+        """Record the whole journey and hand the timings to the monitor."""
+        self._durations.append(('total', time.monotonic() - self._start))
+        if self._monitor is not None:
+            self._monitor.record(self._durations)
+            self._monitor = None
+
+
+class LatencyMonitor:
+    """
+    Rolling latency percentiles per stage, over the last window frames, plus a
+    cumulative histogram per stage for /metrics.
+    Recording is a lock and a few appends per frame, so it can stay on all the time.
+    """
+    STAGES = ['capture', 'queued', 'preprocess', 'inference', 'tracking', 'servo', 'relay', 'total']
+
+    def __init__(self, window=1000):
+        self._window = window
+        self._lock = threading.Lock()
+        self._samples = {}
+        self._histograms = {}
+
+    def trace(self, capture_time=None):
+        """Start tracing a frame."""
+        return FrameTrace(self, capture_time)
+
+    def record(self, durations):
+        with self._lock:
+            for stage, seconds in durations:
+                samples = self._samples.get(stage)
+                if samples is None:
+                    samples = self._samples[stage] = deque(maxlen=self._window)
+                    self._histograms[stage] = Histogram()
+                samples.append(seconds)
+                self._histograms[stage].observe(seconds)
+
+    def histograms(self):
+        """Histogram of every sample ever recorded, by stage."""
+        with self._lock:
+            return dict(self._histograms)
+
+    def summary(self):
+        """p50, p95 and p99 in milliseconds for each stage seen so far."""
+        with self._lock:
+            samples = {stage: np.array(values) for stage, values in self._samples.items()}
+
+        order = {stage: index for index, stage in enumerate(self.STAGES)}
+        summary = {}
+        for stage in sorted(samples, key=lambda stage: order.get(stage, len(order))):
+            p50, p95, p99 = np.percentile(samples[stage], [50, 95, 99]) * 1000
+            summary[stage] = {
+                'count': len(samples[stage]),
+                'p50_ms': round(float(p50), 2),
+                'p95_ms': round(float(p95), 2),
+                'p99_ms': round(float(p99), 2),
+                'max_ms': round(float(samples[stage].max()) * 1000, 2),
+            }
+        return summary
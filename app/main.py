@@ -1,30 +1,54 @@
 # app/main.py
 
-from flask import Flask, Response, render_template, send_from_directory
-import cv2
+from flask import Flask, Response, render_template, send_from_directory, jsonify, request
 import threading
+import asyncio
 import os
+import json
+import time
+from functools import partial
 
 from camera.fake_camera import FakeCamera
 from camera import get_camera
 from hardware import get_hardware_controller
 from app.detector import HailoDetector, CPUDetector
+from app.process_detector import ProcessDetector
 from app.frame_processor import FrameProcessor
+from app.pipeline import Pipeline
+from app.latency import LatencyMonitor
+from app.metrics import MetricsWriter, collect_metrics
+from app.tracing import tracer
+from app.profiler import StackSampler
+from app.streaming import TIERS, SNAPSHOT_TIER, SNAPSHOT_WAIT, TierNegotiator, snapshot_etag
+from app.async_server import AsyncStreamServer
+from app.telemetry import to_json
+from app.motion_gate import MotionGate
+from app.box_propagator import BoxPropagator
 from app.target_tracker import TargetTracker
 from app.frame_store import FrameStore
 from app.temperature_monitor import TemperatureMonitor
 
 class App:
-    def __init__(self, camera, hardware_controller, frame_processor, temp_monitor):
-        """Initialize the App with injected dependencies."""
+    def __init__(self, camera, hardware_controller, frame_processor, temp_monitor, pipelined=False, frame_store=None):
+        """
+        Initialize the App with injected dependencies.
+        pipelined runs capture, detection and aiming in threads of their own, each working on
+        the newest frame, rather than one after the other in a single thread.
+        """
         self.camera = camera
         self.hardware_controller = hardware_controller
         self.frame_processor = frame_processor
-        self.frame_store = FrameStore()
+        self.frame_store = frame_store or FrameStore()
         self.app = Flask(__name__)
         self.thread = None
+        self.pipeline = None
+        self.pipelined = pipelined
         self.is_running = False
         self.temp_monitor = temp_monitor  
+        self.latency = LatencyMonitor()
+        self.frames_captured = 0
+        self.frames_processed = 0
+        self.profiler = StackSampler()
 
         self._setup_routes()
 
@@ -32,13 +56,27 @@ class App:
         """Run the Flask app."""
         self.start_processing()
         self.app.run(host=host, port=port, debug=debug, threaded=True, use_reloader=False)
+
+    def run_async(self, host='0.0.0.0', port=3000):
+        """Run with the asyncio server instead, for lots of viewers.  Same routes, same frame processing."""
+        self.start_processing()
+        asyncio.run(AsyncStreamServer(self, host, port).serve())
     
     def start_processing(self):
         """Start the frame processing thread."""
         if not self.is_running:
             self.temp_monitor.start()
-            self.thread = threading.Thread(target=self._frame_processing, daemon=True)
-            self.thread.start()
+            if self.pipelined:
+                self.is_running = True
+                self.pipeline = Pipeline(
+                    self._traced_frames,
+                    [('detect', self._observe), ('act', self._act)],
+                    on_stop=self._pipeline_stopped
+                )
+                self.pipeline.start()
+            else:
+                self.thread = threading.Thread(target=self._frame_processing, daemon=True)
+                self.thread.start()
             
 
     def stop_processing(self):
@@ -46,15 +84,26 @@ class App:
         if self.is_running:
             self.is_running = False
             self.temp_monitor.stop()
-            self.thread.join()  # Wait for frame processing thread to finish
+            if self.pipeline is not None:
+                self.pipeline.stop()
+                self.pipeline.join()
+            else:
+                self.thread.join()  # Wait for frame processing thread to finish
             self._clean_up()
     
     def _setup_routes(self):
         """Set up Flask routes."""
         @self.app.route('/video_feed')
         def video_feed():
-            """Video streaming route. Put this in the src attribute of an img tag."""
-            return Response(self._generate_streaming_frames(),
+            """
+            Video streaming route. Put this in the src attribute of an img tag.
+            ?tier=low, medium or high for a fixed size, quality and frame rate, or auto
+            (the default) to start high and drop down if the client can't keep up.
+            """
+            tier = request.args.get('tier', 'auto')
+            if tier != 'auto' and tier not in TIERS:
+                return Response(f'Unknown tier {tier}, try auto, {", ".join(TIERS)}\n', status=400, mimetype='text/plain')
+            return Response(self._generate_streaming_frames(tier),
                             mimetype='multipart/x-mixed-replace; boundary=frame',
                             headers={
                                 'Cache-Control': 'no-cache, no-store, must-revalidate',
@@ -63,6 +112,40 @@ class App:
                                 'Connection': 'keep-alive'
                             })
         
+        @self.app.route('/snapshot.jpg')
+        def snapshot():
+            """
+            The latest frame as a JPEG, for things that poll for stills.  Send the last ETag as
+            If-None-Match for a 304 when it hasn't changed, and ?after=<ETag> to wait for a newer one.
+            """
+            after = request.args.get('after', type=float)
+            if after is None:
+                frame, ts = self.frame_store.peek()
+            else:
+                frame, ts = self.frame_store.get_latest(after, timeout=SNAPSHOT_WAIT)
+            if frame is None:
+                return Response('No frame yet\n', status=503, mimetype='text/plain', headers={'Retry-After': '1'})
+
+            etag = snapshot_etag(ts)
+            headers = {'ETag': f'"{etag}"', 'Cache-Control': 'no-cache'}
+            if etag in request.if_none_match:
+                return Response(status=304, headers=headers)
+
+            jpeg = self.frame_store.jpeg(frame, ts, SNAPSHOT_TIER)
+            if jpeg is None:
+                return Response('Frame would not encode\n', status=500, mimetype='text/plain')
+            return Response(jpeg, mimetype='image/jpeg', headers=headers)
+
+        @self.app.route('/telemetry')
+        def telemetry():
+            """
+            Server-sent events, one a frame, with what to draw over the stream as JSON:
+            detections, the tracker's aim, and temperature and throttling.
+            """
+            return Response(self._generate_telemetry(),
+                            mimetype='text/event-stream',
+                            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
         @self.app.route('/')
         def index():
             """Home page with the video stream and list of saved MP4 files."""
@@ -77,36 +160,110 @@ class App:
             """Serve saved MP4 files."""
             return send_from_directory('videos', filename)
 
-    def _generate_streaming_frames(self):
-        """Generator that yields the latest frame from the FrameStore to clients."""
+        @self.app.route('/latency')
+        def latency():
+            """Rolling p50/p95/p99 milliseconds for each stage from sensor to solenoid."""
+            return jsonify(self.latency.summary())
+
+        @self.app.route('/metrics')
+        def metrics():
+            """Prometheus metrics."""
+            return Response(collect_metrics(self), mimetype=MetricsWriter.CONTENT_TYPE)
+
+        @self.app.route('/admin/profile')
+        def profile():
+            """
+            Sample every thread's stack for ?seconds=N (default 10) and return collapsed stacks
+            for a flame graph.  Sampling runs on this request's thread, never the frame loop's.
+            """
+            stacks = self.profiler.profile(request.args.get('seconds', 10, type=float))
+            if stacks is None:
+                return Response('Already profiling, try again shortly\n', status=409, mimetype='text/plain')
+            return Response(stacks, mimetype='text/plain')
+
+        @self.app.route('/trace', methods=['GET', 'POST'])
+        def trace():
+            """
+            POST enabled=1 or 0 to turn tracing on or off.  GET downloads what's been recorded
+            as a Chrome trace, for the last ?seconds=N or between ?since= and ?until= (epoch seconds).
+            """
+            if request.method == 'POST':
+                tracer.enabled = request.values.get('enabled', '1') not in ('0', 'false', 'off')
+                return jsonify({'enabled': tracer.enabled})
+
+            times = {name: request.args.get(name, type=float) for name in ('seconds', 'since', 'until') if name in request.args}
+            if None in times.values():
+                return Response('seconds, since and until are numbers of seconds\n', status=400, mimetype='text/plain')
+            if 'seconds' in times:
+                since, until = time.time() - times['seconds'], None
+            else:
+                since, until = times.get('since'), times.get('until')
+            return Response(
+                json.dumps(tracer.chrome_trace(since, until)),
+                mimetype='application/json',
+                headers={'Content-Disposition': f'attachment; filename=watercannon-trace-{time.strftime("%Y%m%d-%H%M%S")}.json'}
+            )
+
+    def _generate_streaming_frames(self, tier='high'):
+        """
+        Generator that yields the latest frame from the FrameStore to clients.  The next frame
+        is only fetched once the last has been sent, so a client whose socket backs up skips
+        to the newest frame rather than falling further and further behind.
+        """
+        negotiator = TierNegotiator() if tier == 'auto' else None
         last_timestamp = 0
-        while True:
-            self.temp_monitor.throttle()
-
-            frame, ts = self.frame_store.get_latest(last_timestamp)
-            if frame is not None:
-                ret, buffer = cv2.imencode('.jpg', frame)
-                if ret:
-                    frame_bytes = buffer.tobytes()
+        last_sent = 0
+        self.frame_store.add_consumer()
+        try:
+            while True:
+                self.temp_monitor.throttle()
+
+                stream_tier = negotiator.tier if negotiator else TIERS[tier]
+                if stream_tier.max_fps:
+                    pause = last_sent + 1 / stream_tier.max_fps - time.monotonic()
+                    if pause > 0:
+                        time.sleep(pause)
+
+                frame_bytes, ts = self.frame_store.get_latest_jpeg(last_timestamp, stream_tier)
+                if frame_bytes is not None:
+                    last_sent = time.monotonic()
                     yield (b'--frame\r\n'
                            b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-                    last_timestamp = ts
+                    if negotiator:
+                        negotiator.delivered(time.monotonic() - last_sent)
+                last_timestamp = ts # skip frames that wouldn't encode, rather than trying them again
 
-            if not self.frame_store.is_running:
-                break
+                if not self.frame_store.is_running:
+                    break
+        finally:
+            self.frame_store.remove_consumer()
+
+    def _generate_telemetry(self):
+        """Generator that yields each frame's telemetry as a server-sent event, skipping any a slow client missed."""
+        last_timestamp = 0
+        self.frame_store.add_telemetry_client()
+        try:
+            while True:
+                telemetry, ts = self.frame_store.get_latest_telemetry(last_timestamp)
+                if telemetry is not None and ts > last_timestamp:
+                    yield f'data: {to_json(telemetry)}\n\n'
+                last_timestamp = ts
+
+                if not self.frame_store.is_running:
+                    break
+        finally:
+            self.frame_store.remove_telemetry_client()
 
     def _frame_processing(self):
         """Continuously process frames and update the FrameStore."""
         try:
             self.is_running = True
-            for frame in self.camera.frame_generator():
+            for frame, trace in self._traced_frames():
                 self.temp_monitor.throttle()
                 
-                self.frame_processor.process_frame(frame)
-                self.frame_store.update(self.frame_processor.annotated_frame)
-                
-                if self.frame_processor.fire():
-                    self.frame_store.save()
+                with tracer.span('process_frame'):
+                    self.frame_processor.process_frame(frame, trace)
+                self._publish(frame)
                 
                 if not self.is_running:
                     break
@@ -115,7 +272,55 @@ class App:
             """If the camera runs out of frames or dies, let the FrameStore know the stream has stopped."""
             self.is_running = False
             self._clean_up() 
+
+    def _traced_frames(self):
+        """Frames from the camera, each with a trace started from when it was captured."""
+        for frame in self.camera.frame_generator():
+            self.frames_captured += 1
+            yield frame, self.latency.trace(self.camera.sensor_timestamp)
+
+    def _observe(self, captured):
+        """Pipeline detection stage."""
+        frame, trace = captured
+        trace.mark('queued')
+        self.temp_monitor.throttle()
+        with tracer.span('observe'):
+            return self.frame_processor.observe(frame, trace)
+
+    def _act(self, observation):
+        """Pipeline aiming stage."""
+        with tracer.span('act'):
+            self.frame_processor.act(observation)
+        self._publish(observation.frame)
+
+    def _pipeline_stopped(self):
+        self.is_running = False
+        self._clean_up()
+
+    def _publish(self, frame):
+        """
+        Pass the frame on to anyone watching, and save video if we're firing.  The frame goes
+        out clean, with its telemetry for the browser, or the saved video, to draw overlays from.
+        """
+        self.frames_processed += 1
+
+        with tracer.span('publish'):
+            self.frame_store.update(frame, self.telemetry())
+        
+        if self.frame_processor.fire():
+            self.frame_store.save()
     
+    def telemetry(self):
+        """The last frame's telemetry from the frame processor, with the temperature."""
+        telemetry = dict(self.frame_processor.telemetry() or {})
+        temp_monitor = self.temp_monitor
+        telemetry['thermal'] = {
+            'temperature': temp_monitor.average_temperature,
+            'throttle': temp_monitor.throttle_time,
+            'overheated': temp_monitor.overheat_event.is_set(),
+        }
+        return telemetry
+
     def _clean_up(self):
         self.camera.release()
         self.frame_store.stop()
@@ -124,26 +329,52 @@ class App:
 
 def main():
     # Initialize dependencies
-    camera = get_camera()
+    camera_size = os.environ.get('CAMERA_SIZE') # e.g. 1280x960
+    camera = get_camera(
+        size=tuple(int(d) for d in camera_size.split('x')) if camera_size else None,
+        replay=os.environ.get('REPLAY'), # e.g. a recording of the deck, for benchmarking
+        realtime=not os.environ.get('REPLAY_FAST')
+    )
     hardware_controller = get_hardware_controller()
     target_classes = ['cow', 'bird', 'cat', 'dog']
     avoid_classes = ['person']
+    tile_size = int(os.environ['TILE_SIZE']) if os.environ.get('TILE_SIZE') else None
     if HailoDetector.is_ai_hat_installed() and not os.environ.get('USE_CPU'):
-        detector = HailoDetector(hef_path=os.environ.get('HEF_PATH', 'yolov8m.hef'), threshold=0.5, target_classes=target_classes, avoid_classes=avoid_classes)
+        detector = HailoDetector(hef_path=os.environ.get('HEF_PATH', 'yolov8m.hef'), threshold=0.5, target_classes=target_classes, avoid_classes=avoid_classes, tile_size=tile_size)
     else:
-        detector = CPUDetector(threshold=0.5, target_classes=target_classes, avoid_classes=avoid_classes)
+        cpu_detector = partial(
+            CPUDetector,
+            backend=os.environ.get('CPU_BACKEND', 'torch'),
+            int8=bool(os.environ.get('CPU_INT8')),
+            threshold=0.5, target_classes=target_classes, avoid_classes=avoid_classes, tile_size=tile_size
+        )
+        detector = ProcessDetector(cpu_detector) if os.environ.get('DETECTOR_PROCESS') else cpu_detector()
     target_tracker = TargetTracker(fov_horizontal=75, fov_vertical=66)
-    frame_processor = FrameProcessor(detector, target_tracker, hardware_controller)
+    motion_gate = MotionGate() if os.environ.get('MOTION_GATE') == '1' else None
+    detect_every = int(os.environ.get('DETECT_EVERY', '1'))
+    box_propagator = BoxPropagator() if detect_every > 1 else None
+    frame_processor = FrameProcessor(
+        detector, target_tracker, hardware_controller,
+        roi_tiling=bool(os.environ.get('ROI_TILING')),
+        motion_gate=motion_gate,
+        box_propagator=box_propagator, detect_every=detect_every
+    )
     temp_monitor = TemperatureMonitor()
+    tracer.enabled = bool(os.environ.get('TRACE'))
 
     # Instantiate the App
-    app_instance = App(camera, hardware_controller, frame_processor, temp_monitor)
+    app_instance = App(camera, hardware_controller, frame_processor, temp_monitor, pipelined=bool(os.environ.get('PIPELINE')))
 
     # Run the app
     try:
-        app_instance.run()
+        if os.environ.get('ASYNC_SERVER'):
+            app_instance.run_async()
+        else:
+            app_instance.run()
     except KeyboardInterrupt:
         app_instance.stop_processing()
+    finally:
+        detector.release()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,116 @@
+# app/metrics.py
+
+from bisect import bisect_left
+
+
+class Histogram:
+    """
+    A cumulative histogram in the Prometheus style.  observe() is a bisect and two adds,
+    and is meant to be called from one thread; readers just take a copy of the counts.
+    """
+    DEFAULT_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5]
+
+    def __init__(self, buckets=None):
+        self.buckets = list(buckets or self.DEFAULT_BUCKETS)
+        self._counts = [0] * (len(self.buckets) + 1) # the last is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self._counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative_counts(self):
+        """(upper bound, observations <= it) for each bucket, ending with +Inf."""
+        counts = list(self._counts)
+        total = 0
+        result = []
+        for bound, count in zip(self.buckets + [float('inf')], counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+class MetricsWriter:
+    """Builds a page of metrics in the Prometheus text exposition format."""
+    CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+    def __init__(self, prefix='watercannon_'):
+        self._prefix = prefix
+        self._lines = []
+
+    def counter(self, name, help, samples):
+        self._metric(name, 'counter', help, samples)
+
+    def gauge(self, name, help, samples):
+        self._metric(name, 'gauge', help, samples)
+
+    def histogram(self, name, help, histograms):
+        """histograms is a Histogram, or a dict of labels tuple -> Histogram."""
+        name = self._prefix + name
+        self._lines += [f"# HELP {name} {help}", f"# TYPE {name} histogram"]
+        for labels, histogram in self._labelled(histograms):
+            for bound, count in histogram.cumulative_counts():
+                le = '+Inf' if bound == float('inf') else repr(float(bound))
+                self._lines.append(f"{name}_bucket{self._labels(labels + (('le', le),))} {count}")
+            self._lines.append(f"{name}_sum{self._labels(labels)} {self._value(histogram.sum)}")
+            self._lines.append(f"{name}_count{self._labels(labels)} {histogram.count}")
+
+    def text(self):
+        return '\n'.join(self._lines) + '\n'
+
+    def _metric(self, name, type, help, samples):
+        """samples is a value, or a dict of labels tuple -> value.  None values are left out."""
+        name = self._prefix + name
+        self._lines += [f"# HELP {name} {help}", f"# TYPE {name} {type}"]
+        for labels, value in self._labelled(samples):
+            if value is not None:
+                self._lines.append(f"{name}{self._labels(labels)} {self._value(value)}")
+
+    def _labelled(self, samples):
+        return samples.items() if isinstance(samples, dict) else [((), samples)]
+
+    def _labels(self, labels):
+        if not labels:
+            return ''
+        return '{' + ','.join(f'{key}="{value}"' for key, value in labels) + '}'
+
+    def _value(self, value):
+        return repr(float(value)) if isinstance(value, float) else str(int(value))
+
+
+def collect_metrics(app):
+    """
+    Everything worth scraping from a running App.  Values are read as they are, without
+    taking the locks the frame loop uses, so a scrape never holds it up.
+    """
+    metrics = MetricsWriter()
+
+    metrics.counter('frames_captured_total', 'Frames read from the camera.', app.frames_captured)
+    metrics.counter('frames_processed_total', 'Frames that made it all the way through processing.', app.frames_processed)
+    dropped = app.pipeline.dropped if app.pipeline is not None else {}
+    metrics.counter('frames_dropped_total', 'Frames a pipeline stage skipped because a newer one arrived.',
+                    {(('stage', stage),): count for stage, count in dropped.items()})
+
+    metrics.histogram('stage_latency_seconds', 'Time spent in each stage, from sensor capture to the solenoid.',
+                      {(('stage', stage),): histogram for stage, histogram in app.latency.histograms().items()})
+
+    temp_monitor = app.temp_monitor
+    metrics.gauge('temperature_celsius', 'Moving average CPU temperature.', temp_monitor.average_temperature)
+    metrics.gauge('throttle_seconds', 'Delay added to each frame to cool down, 0 when not throttling.', temp_monitor.throttle_time or 0.0)
+    metrics.gauge('overheated', '1 while processing is halted to cool down.', int(temp_monitor.overheat_event.is_set()))
+
+    tracker = app.frame_processor.target_tracker
+    metrics.counter('fire_events_total', 'Times the cannon has fired.', tracker.fire_events)
+    metrics.counter('fire_seconds_total', 'Total time spent firing.', tracker.fire_seconds)
+
+    metrics.gauge('stream_clients', 'Clients watching the video feed.', app.frame_store.consumers)
+    metrics.gauge('telemetry_clients', 'Clients following the overlay telemetry.', app.frame_store.telemetry_clients)
+    metrics.counter('stream_jpeg_encodes_total', 'Frames encoded for the video feed, once a tier however many are watching.',
+                    {(('tier', tier),): count for tier, count in app.frame_store.jpeg_encodes.items()})
+    metrics.counter('stream_bytes_served_total', 'JPEG bytes sent to video feed clients.',
+                    {(('tier', tier),): count for tier, count in app.frame_store.jpeg_bytes_served.items()})
+    metrics.counter('video_bytes_written_total', 'Bytes of fire event video saved.', app.frame_store.bytes_written)
+
+    return metrics.text()
@@ -0,0 +1,90 @@
+# app/motion_gate.py
+
+import cv2
+import numpy as np
+
+class MotionGate:
+    """
+    Cheap motion check in front of the detector, so it only runs when something might be there.
+    Works on a small blurred grayscale copy of the frame against a running background.
+
+    Panning and tilting shifts the whole picture, which would look like motion everywhere.
+    When the camera has moved, the shift is measured with phase correlation and the background
+    is shifted to match before comparing, so only things moving in the scene count.
+    """
+
+    def __init__(self, width=160, learning_rate=0.05, pixel_threshold=25, min_motion=0.002):
+        self._width = width
+        self._learning_rate = learning_rate
+        self._pixel_threshold = pixel_threshold
+        self._min_motion = min_motion # fraction of the frame that has to change
+        self._background = None
+        self._last_gray = None
+        self._scale = 1.0
+
+        # public vars
+        self.motion = False
+        self.regions = [] # (x1, y1, x2, y2) in full frame pixels
+
+    def update(self, frame, camera_moved=False):
+        """
+        Compare the frame to the background, then learn it.  Returns True if there's motion.
+        """
+        gray = self._shrink(frame)
+
+        if self._background is None or self._background.shape != gray.shape:
+            self._reset(gray)
+            return self.motion
+
+        border = 0
+        if camera_moved:
+            border = self._follow_camera(gray)
+
+        diff = cv2.absdiff(gray, cv2.convertScaleAbs(self._background))
+        _, mask = cv2.threshold(diff, self._pixel_threshold, 255, cv2.THRESH_BINARY)
+        if border:
+            # edges revealed by the move have nothing to compare against
+            mask[:border, :] = mask[-border:, :] = 0
+            mask[:, :border] = mask[:, -border:] = 0
+        mask = cv2.dilate(mask, None, iterations=2)
+
+        cv2.accumulateWeighted(gray, self._background, self._learning_rate)
+        self._last_gray = gray
+
+        self.motion = cv2.countNonZero(mask) >= self._min_motion * mask.size
+        self.regions = self._regions(mask) if self.motion else []
+        return self.motion
+
+    def _shrink(self, frame):
+        height, width = frame.shape[:2]
+        self._scale = width / self._width
+        small = cv2.resize(frame, (self._width, int(height / self._scale)), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def _reset(self, gray):
+        self._background = gray.astype(np.float32)
+        self._last_gray = gray
+        self.motion = False
+        self.regions = []
+
+    def _follow_camera(self, gray):
+        """Shift the background by however far the picture moved since the last frame."""
+        (shift_x, shift_y), _ = cv2.phaseCorrelate(self._last_gray.astype(np.float32), gray.astype(np.float32))
+        height, width = gray.shape
+        shift = np.float32([[1, 0, shift_x], [0, 1, shift_y]])
+        self._background = cv2.warpAffine(self._background, shift, (width, height))
+
+        # whatever's come into view starts as its own background
+        valid = cv2.warpAffine(np.ones((height, width), dtype=np.float32), shift, (width, height))
+        revealed = valid < 0.999
+        self._background[revealed] = gray[revealed]
+        return min(int(np.ceil(max(abs(shift_x), abs(shift_y)))) + 1, min(width, height) // 2)
+
+    def _regions(self, mask):
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        regions = []
+        for contour in contours:
+            x, y, w, h = cv2.boundingRect(contour)
+            regions.append(tuple(int(v * self._scale) for v in (x, y, x + w, y + h)))
+        return regions
@@ -0,0 +1,62 @@
+# app/overlay.py
+
+import cv2
+
+from app.telemetry import detections_telemetry, tracker_telemetry
+
+class OverlayCompositor:
+    """
+    Draws detections and targeting info over a frame, for saved fire videos - drawn as
+    they're written, off the frame loop - and FrameProcessor.annotated_frame.  The live
+    stream goes out clean and the browser draws its own overlays.
+
+    Everything's drawn from telemetry - the same values the browser draws from - so saved
+    videos look like the live page.
+    """
+
+    def __init__(self, detection_colour=(0, 255, 0), text_colour=(255, 0, 0)):
+        self._detection_colour = detection_colour
+        self._text_colour = text_colour
+
+    def compose(self, frame, detections, tracker=None):
+        """
+        Returns an annotated copy of the frame.  Pass the tracker when it has a target
+        to draw the aim point, angle offsets and attack info.
+        """
+        target = tracker_telemetry(tracker) if tracker is not None else None
+        return self.compose_telemetry(frame, {'detections': detections_telemetry(detections), 'target': target})
+
+    def compose_telemetry(self, frame, telemetry):
+        """Returns an annotated copy of the frame, from a frame's telemetry."""
+        annotated_frame = frame.copy()
+        self._draw_detections(annotated_frame, telemetry.get('detections', []))
+        if telemetry.get('target') is not None:
+            self._draw_tracker(annotated_frame, telemetry['target'])
+        return annotated_frame
+
+    def _draw_detections(self, frame, detections):
+        for det in detections:
+            x1, y1, x2, y2 = (int(value) for value in det['box'])
+            cv2.rectangle(frame, (x1, y1), (x2, y2), self._detection_colour, 2)
+            cv2.putText(frame, f"{det['name']}: {det['confidence']:.2f}",
+                       (x1, y1-10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, self._detection_colour, 2)
+
+    def _draw_tracker(self, frame, t):
+        """
+        Draw bounding box, center point, and angle offsets on the frame.
+        """
+        # Draw bounding box and center point
+        x1, y1, x2, y2 = (int(value) for value in t['box'])
+        cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+
+        # Set the circle color based on solenoid state
+        circle_color = (0, 0, 255) if t['fire'] else (0, 255, 0)  # Red if active, Green if not
+        cv2.circle(frame, (int(t['point'][0]), int(t['point'][1])), 5, circle_color, -1)
+
+        # Display angle offsets on the frame
+        cv2.putText(frame, f"DX: {t['dx']:.2f} deg, DY: {t['dy']:.2f} deg", (10, 30),
+            cv2.FONT_HERSHEY_SIMPLEX, 0.7, self._text_colour, 2)
+
+        # Display angle offsets on the frame
+        cv2.putText(frame, f"Target: {t['name']}, Distance: {t['distance']:.2f}, Attack Angle: {t['attack_angle']}", (10, 90),
+            cv2.FONT_HERSHEY_SIMPLEX, 0.7, self._text_colour, 2)
@@ -0,0 +1,118 @@
+# app/pipeline.py
+
+import threading
+from collections import deque
+
+
+class LatestQueue:
+    """
+    A bounded queue that never blocks the producer.  When it's full the oldest item is
+    dropped to make room, so whoever reads it always gets the freshest data, not a backlog.
+    """
+
+    def __init__(self, maxsize=1):
+        self._items = deque()
+        self._maxsize = maxsize
+        self._condition = threading.Condition()
+        self._closed = False
+        self.dropped = 0
+
+    def put(self, item):
+        with self._condition:
+            if len(self._items) >= self._maxsize:
+                self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self._condition.notify()
+
+    def get(self, timeout=None):
+        """The oldest item still queued.  None once the queue is closed and empty, or on timeout."""
+        with self._condition:
+            self._condition.wait_for(lambda: self._items or self._closed, timeout=timeout)
+            return self._items.popleft() if self._items else None
+
+    def close(self):
+        """No more items are coming - wake anyone waiting."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def __len__(self):
+        with self._condition:
+            return len(self._items)
+
+
+class Pipeline:
+    """
+    Runs a source, e.g. camera.frame_generator, and a chain of stages each in a thread of
+    their own, joined by LatestQueues.  A slow stage only ever sees the newest item, while
+    the ones before it keep going, and frames it never got to are counted in dropped.
+
+    stages is a list of (name, function) pairs.  Each function takes what the previous stage
+    returned, and can return None to pass nothing on.  When the source runs dry or stop() is
+    called the stages wind down in order and on_stop is called.
+    """
+
+    def __init__(self, source, stages, on_stop=None, queue_size=1):
+        self._source = source
+        self._stages = stages
+        self._on_stop = on_stop
+        self._queues = [LatestQueue(queue_size) for _ in stages]
+        self._stopping = threading.Event()
+        self._threads = []
+
+    @property
+    def dropped(self):
+        """Items each stage never got to because something newer turned up first."""
+        return {name: queue.dropped for (name, _), queue in zip(self._stages, self._queues)}
+
+    @property
+    def is_running(self):
+        return any(thread.is_alive() for thread in self._threads)
+
+    def start(self):
+        self._threads = [threading.Thread(target=self._capture, name='capture', daemon=True)]
+        for index, (name, function) in enumerate(self._stages):
+            self._threads.append(threading.Thread(target=self._run_stage, args=(index, function), name=name, daemon=True))
+
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        """Ask every stage to finish what it's doing and stop."""
+        self._stopping.set()
+        for queue in self._queues:
+            queue.close()
+
+    def join(self, timeout=None):
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join(timeout)
+
+    def _capture(self):
+        try:
+            for item in self._source():
+                if self._stopping.is_set():
+                    break
+                self._queues[0].put(item)
+        finally:
+            self._queues[0].close()
+
+    def _run_stage(self, index, function):
+        last = index == len(self._stages) - 1
+        try:
+            while not self._stopping.is_set():
+                item = self._queues[index].get()
+                if item is None:
+                    break
+
+                result = function(item)
+                if result is not None and not last:
+                    self._queues[index + 1].put(result)
+        finally:
+            if last:
+                self._stopping.set()
+                if self._on_stop:
+                    self._on_stop()
+            else:
+                self._queues[index + 1].close()
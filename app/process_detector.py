@@ -0,0 +1,247 @@
+# app/process_detector.py
+
+import multiprocessing
+from multiprocessing import shared_memory
+import queue
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+import numpy as np
+
+from app.detector import BaseDetector
+
+
+def _detector_worker(detector_factory, shm_name, requests, results):
+    """
+    Runs in the detector process.  Builds the detector, then detects frames out of the
+    shared memory ring until it's sent None, sending back just the targets and aversions.
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        detector = detector_factory()
+        results.put(('ready', None, None))
+
+        while True:
+            request = requests.get()
+            if request is None:
+                break
+
+            sequence, offset, shape, dtype, regions = request
+            frame = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+            try:
+                detector.detect_objects(frame, regions=regions)
+                results.put((sequence, (detector.targets, detector.aversions), None))
+            except Exception as e:
+                results.put((sequence, None, repr(e)))
+            finally:
+                # views into the ring must be gone before it can be closed
+                detector.frame = None
+                del frame
+
+        detector.release()
+    finally:
+        shm.close()
+
+
+class ProcessDetector(BaseDetector):
+    """
+    Runs another detector in a process of its own, so inference isn't fighting the frame
+    loop, JPEG encoding and Flask for the GIL.
+
+    detector_factory builds the real detector in the worker, e.g. partial(CPUDetector, backend='onnx'),
+    so it has to be picklable.  Frames are copied into a ring of shared memory slots and only
+    the detections come back.  If the worker dies, or takes longer than timeout seconds, it's
+    restarted and the frames it had are returned with no detections.
+    """
+
+    def __init__(self, detector_factory, slots=2, timeout=10, start_timeout=300, **kwargs):
+        super().__init__(**kwargs)
+        self._detector_factory = detector_factory
+        self._slots = slots
+        self._timeout = timeout
+        self._start_timeout = start_timeout # seconds - the first run may be compiling a model
+        self._context = multiprocessing.get_context('spawn') # forking a process full of threads isn't safe
+        self._lock = threading.RLock()
+        self._free_slots = queue.Queue()
+        self._pending = {}
+        self._next_sequence = 0
+        self._generation = 0
+        self._slot_bytes = 0
+        self._shm = None
+        self._process = None
+        self._requests = None
+        self._ready = threading.Event()
+        self._error = None
+        self.restarts = 0
+
+    @property
+    def alive(self):
+        return self._process is not None and self._process.is_alive()
+
+    def detect_objects(self, frame, regions=None):
+        """Detect objects in the worker, waiting for the result."""
+        future = self.detect_objects_async(frame, regions=regions)
+        timeout = self._timeout if self._ready.is_set() else self._start_timeout
+        try:
+            future.result(timeout=timeout)
+        except FutureTimeoutError:
+            self._restart(f"no result after {timeout}s")
+        except RuntimeError as e:
+            if self._error is not None:
+                raise
+            self._log(f"Lost frame: {e}")
+
+        if not future.done() or future.exception() is not None:
+            self._update_detections(frame, [], [])
+        return frame
+
+    def detect_objects_async(self, frame, callback=None, regions=None):
+        """
+        Queue a frame for the worker.  Up to slots frames can be in flight; results land in
+        frame order, updating targets and aversions before callback(frame) is called.
+        Returns a Future of (frame, targets, aversions).
+        """
+        if self._error is not None:
+            raise RuntimeError(self._error)
+
+        if frame.nbytes > self._slot_bytes:
+            # first frame, or the camera got bigger - start over with a ring that fits
+            self._slot_bytes = frame.nbytes
+            self._restart(None if self._process is None else "frames outgrew the ring")
+
+        future = Future()
+        if callback:
+            def on_result(future):
+                if future.exception() is None:
+                    callback(frame)
+            future.add_done_callback(on_result)
+
+        while True:
+            with self._lock:
+                if self._error is not None:
+                    raise RuntimeError(self._error) # it died while we waited, and nothing will fill the new ring
+                generation, free_slots = self._generation, self._free_slots
+            slot = free_slots.get() # waits here while every slot is in flight
+            with self._lock:
+                if generation == self._generation:
+                    break
+                # the worker was restarted while we waited, so that slot belongs to the old ring
+
+        with self._lock:
+            offset = slot * self._slot_bytes
+            np.copyto(np.ndarray(frame.shape, dtype=frame.dtype, buffer=self._shm.buf, offset=offset), frame)
+
+            sequence = self._next_sequence
+            self._next_sequence += 1
+            self._pending[sequence] = (future, frame, slot)
+            self._requests.put((sequence, offset, frame.shape, frame.dtype.str, regions))
+
+        return future
+
+    def release(self):
+        """Ask the worker to finish up, then free the ring."""
+        with self._lock:
+            self._stop_worker(polite=True)
+            self._generation += 1
+            self._slot_bytes = 0 # so it starts again if used again
+
+    def _restart(self, reason):
+        with self._lock:
+            if reason is not None:
+                self._log(f"Restarting detector process: {reason}")
+                self.restarts += 1
+            self._stop_worker()
+            self._start_worker()
+
+    def _start_worker(self):
+        self._generation += 1
+        self._ready.clear()
+        self._shm = shared_memory.SharedMemory(create=True, size=self._slots * self._slot_bytes)
+        for slot in range(self._slots):
+            self._free_slots.put(slot)
+
+        self._requests = self._context.Queue()
+        results = self._context.Queue()
+        self._process = self._context.Process(
+            target=_detector_worker,
+            args=(self._detector_factory, self._shm.name, self._requests, results),
+            daemon=True
+        )
+        self._process.start()
+
+        threading.Thread(
+            target=self._read_results, args=(self._generation, self._process, results), daemon=True
+        ).start()
+
+    def _stop_worker(self, polite=False):
+        """Stop the worker, failing anything it still had, and free the ring."""
+        if self._process is not None:
+            if polite and self._process.is_alive():
+                self._requests.put(None)
+                self._process.join(timeout=self._timeout)
+            if self._process.is_alive():
+                self._process.terminate()
+                self._process.join()
+            self._requests.cancel_join_thread()
+            self._process = None
+
+        for future, _, _ in self._pending.values():
+            future.set_exception(RuntimeError("detector process stopped"))
+        self._pending = {}
+
+        # a fresh set of slots comes with the next ring, wake anyone waiting on the old one
+        for _ in range(self._slots):
+            self._free_slots.put(None)
+        self._free_slots = queue.Queue()
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def _read_results(self, generation, process, results):
+        """Hands results back in order, and keeps an eye on the worker."""
+        while self._generation == generation:
+            try:
+                sequence, payload, error = results.get(timeout=0.5)
+            except queue.Empty:
+                if not process.is_alive():
+                    self._worker_died(generation, process.exitcode)
+                continue
+
+            with self._lock:
+                if self._generation != generation:
+                    return
+                if sequence == 'ready':
+                    self._ready.set()
+                    continue
+                future, frame, slot = self._pending.pop(sequence)
+                self._free_slots.put(slot)
+
+            if error is not None:
+                future.set_exception(RuntimeError(error))
+            else:
+                targets, aversions = payload
+                self._update_detections(frame, targets, aversions)
+                future.set_result((frame, targets, aversions))
+
+    def _worker_died(self, generation, exitcode):
+        with self._lock:
+            if self._generation != generation:
+                return
+            if self._ready.is_set():
+                self._restart(f"worker exited with code {exitcode}")
+                return
+
+            # it never got going, so restarting won't help
+            self._error = f"Detector process failed to start, exit code {exitcode}"
+            self._log(self._error)
+            self._generation += 1
+            self._stop_worker()
+
+    def _update_detections(self, frame, targets, aversions):
+        self.frame = frame
+        self.targets = targets
+        self.aversions = aversions
+        self.detections = targets + aversions
+
+    def _log(self, message):
+        print(f"[ProcessDetector] {message}")
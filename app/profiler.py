@@ -0,0 +1,62 @@
+# app/profiler.py
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+
+class StackSampler:
+    """
+    A sampling profiler for every thread in the process.  Every interval seconds it looks at
+    what each thread is running, and counts each stack, so nothing being profiled is slowed
+    by more than the moment it takes to read the stacks.
+
+    Results are collapsed stacks - 'thread;outer;...;inner count' per line - ready for
+    flamegraph.pl, speedscope or inferno.
+    """
+
+    def __init__(self, interval=0.005, max_seconds=60):
+        self._interval = interval
+        self._max_seconds = max_seconds
+        self._lock = threading.Lock()
+
+    @property
+    def busy(self):
+        return self._lock.locked()
+
+    def profile(self, seconds):
+        """Sample for seconds, on the calling thread.  Returns collapsed stacks, or None if already profiling."""
+        if not self._lock.acquire(blocking=False):
+            return None
+
+        try:
+            return self._collapse(self._sample(min(seconds, self._max_seconds)))
+        finally:
+            self._lock.release()
+
+    def _sample(self, seconds):
+        me = threading.get_ident()
+        stacks = Counter()
+        end = time.monotonic() + seconds
+        while time.monotonic() < end:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident != me:
+                    stacks[(names.get(ident, str(ident)),) + self._stack(frame)] += 1
+            del frame
+            time.sleep(self._interval)
+        return stacks
+
+    def _stack(self, frame):
+        """Outermost call first."""
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        return tuple(reversed(stack))
+
+    def _collapse(self, stacks):
+        return ''.join(f"{';'.join(stack)} {count}\n" for stack, count in stacks.most_common())
@@ -0,0 +1,76 @@
+# app/streaming.py
+
+from collections import namedtuple
+
+import cv2
+
+# How a client gets the stream.  width None is full size, max_fps None as fast as frames come.
+StreamTier = namedtuple('StreamTier', ['name', 'width', 'quality', 'max_fps'])
+
+TIERS = {
+    'low': StreamTier('low', 320, 50, 5),
+    'medium': StreamTier('medium', 640, 70, 12),
+    'high': StreamTier('high', None, 95, None), # what every client used to get
+}
+TIER_ORDER = ['low', 'medium', 'high']
+
+SNAPSHOT_TIER = TIERS['high'] # so a snapshot shares its encode with the full quality stream
+SNAPSHOT_WAIT = 30 # longest a /snapshot.jpg?after= long-poll waits for a newer frame, in seconds
+
+
+def encode_jpeg(frame, tier):
+    """The frame as JPEG bytes for tier, shrunk to its width if it's any wider.  None if it won't encode."""
+    height, width = frame.shape[:2]
+    if tier.width and width > tier.width:
+        frame = cv2.resize(frame, (tier.width, round(height * tier.width / width)), interpolation=cv2.INTER_AREA)
+    ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, tier.quality])
+    return buffer.tobytes() if ret else None
+
+
+def snapshot_etag(timestamp):
+    """
+    The ETag for a snapshot of the frame stored at timestamp.  It's the timestamp, to pass
+    back as ?after=, so it's every digit of it - rounded, it could be older than the frame.
+    """
+    return repr(float(timestamp))
+
+
+class TierNegotiator:
+    """
+    Picks a tier for a client that didn't ask for one, from how long it takes to take each
+    frame.  The stream only asks for the next frame once the last one's been written to the
+    client's socket, so a slow network shows up as slow deliveries.  Deliveries averaging
+    over slow seconds drop a tier; under fast seconds, for long enough, go back up one.
+    """
+
+    def __init__(self, tier='high', slow=0.25, fast=0.05, smoothing=0.2, frames_to_drop=5, frames_to_raise=50):
+        self._index = TIER_ORDER.index(tier)
+        self._slow = slow
+        self._fast = fast
+        self._smoothing = smoothing
+        self._frames_to_drop = frames_to_drop # frames at a tier before judging it too slow
+        self._frames_to_raise = frames_to_raise # and before judging there's room for more
+        self._average = None
+        self._frames = 0
+
+    @property
+    def tier(self):
+        return TIERS[TIER_ORDER[self._index]]
+
+    def delivered(self, seconds):
+        """The last frame took seconds to go out."""
+        if self._average is None:
+            self._average = seconds
+        else:
+            self._average += self._smoothing * (seconds - self._average)
+        self._frames += 1
+
+        if self._average > self._slow and self._frames >= self._frames_to_drop and self._index > 0:
+            self._change(-1)
+        elif self._average < self._fast and self._frames >= self._frames_to_raise and self._index < len(TIER_ORDER) - 1:
+            self._change(1)
+
+    def _change(self, step):
+        self._index += step
+        self._average = None
+        self._frames = 0
@@ -1,14 +1,17 @@
 # target_tracker.py
 
 import numpy as np
-import time
+
+from app.clock import wall_clock
 
 class TargetTracker:
     """
     Processes detections to find the closest target and calculate angles.
     """
 
-    def __init__(self, fov_horizontal=60.0, fov_vertical=40.0):
+    def __init__(self, fov_horizontal=60.0, fov_vertical=40.0, clock=None):
+        self._clock = clock or wall_clock
+
         # Tracking configuration
         self._fov_horizontal = fov_horizontal
         self._fov_vertical = fov_vertical
@@ -17,7 +20,7 @@ class TargetTracker:
         self._detections = None
         self._aversions = []
         self._aversion_detected_timeout = 5 # seconds
-        self._aversion_detected_time = time.time() - self._aversion_detected_timeout # set elapsed
+        self._aversion_detected_time = self._clock.time() - self._aversion_detected_timeout # set elapsed
 
         # Firing configuration
         self._dead_zone_angle = 3
@@ -26,7 +29,9 @@ class TargetTracker:
         self._fire_start_time = None
         self._cool_down_time = 3
         self._max_fire_time = 1
-        self._cool_down_till = time.time()
+        self._cool_down_till = self._clock.time()
+        self.fire_events = 0 # since we started
+        self.fire_seconds = 0.0
         self._target_width = 350 #mm used to estimate distance
         self._target_height = 450 #mm
         # distances and angles
@@ -75,7 +80,7 @@ class TargetTracker:
 
         if aversions_names:
             self._aversions = aversions_names
-            self._aversion_detected_time = time.time()
+            self._aversion_detected_time = self._clock.time()
             
 
 
@@ -170,7 +175,8 @@ class TargetTracker:
     def _start_fire_event(self):
         if not self.fire:
             self.fire = True
-            self._fire_start_time = time.time()
+            self._fire_start_time = self._clock.time()
+            self.fire_events += 1
 
     def _end_fire_event(self):
         self.attack_message = ''
@@ -181,6 +187,7 @@ class TargetTracker:
                 'time': self._fire_start_time,
                 'duration': fire_time
             })
+            self.fire_seconds += fire_time
             self._fire_start_time = None
 
     def _close_enough(self):
@@ -190,7 +197,7 @@ class TargetTracker:
             return True
 
     def _fire_duration(self):
-        return time.time() - self._fire_start_time if self._fire_start_time else 0
+        return self._clock.time() - self._fire_start_time if self._fire_start_time else 0
 
     def _on_target(self):
         current_x = self._frame_width / 2
@@ -202,10 +209,10 @@ class TargetTracker:
 
     def _permitted_to_fire(self):
         if self._fire_duration() > self._max_fire_time:
-            self._cool_down_till = time.time() + self._cool_down_time
+            self._cool_down_till = self._clock.time() + self._cool_down_time
             return False
 
-        if time.time() < self._cool_down_till:
+        if self._clock.time() < self._cool_down_till:
             return False
 
         if self._aversion_detected():
@@ -214,7 +221,7 @@ class TargetTracker:
         return True
 
     def _aversion_detected(self):
-        if time.time() < self._aversion_detected_time + self._aversion_detected_timeout:
+        if self._clock.time() < self._aversion_detected_time + self._aversion_detected_timeout:
             return True
 
         return False
@@ -0,0 +1,40 @@
+# app/telemetry.py
+
+import json
+
+# What the overlays show, as plain values small enough to send every frame.  Boxes are
+# [x1, y1, x2, y2] in the frame's pixels, so a browser can scale them to however big it's
+# showing the stream.
+
+
+def detections_telemetry(detections):
+    return [
+        {
+            'name': det['name'],
+            'confidence': round(float(det['confidence']), 2),
+            'box': [round(float(det['box'][key]), 1) for key in ('x1', 'y1', 'x2', 'y2')],
+        }
+        for det in detections
+    ]
+
+
+def tracker_telemetry(tracker):
+    """The tracker's aim at its target, or None without one."""
+    if tracker.target is None:
+        return None
+
+    attack_angle = tracker.attack_angle()
+    return {
+        'name': tracker.target_name(),
+        'box': [round(float(value), 1) for value in (tracker.x1, tracker.y1, tracker.x2, tracker.y2)],
+        'point': [round(float(tracker.target_x), 1), round(float(tracker.target_y), 1)],
+        'fire': bool(tracker.fire),
+        'dx': round(float(tracker.dx), 2),
+        'dy': round(float(tracker.dy), 2),
+        'distance': round(float(tracker.approx_distance()), 1),
+        'attack_angle': None if attack_angle is None else round(float(attack_angle), 1),
+    }
+
+
+def to_json(telemetry):
+    return json.dumps(telemetry, separators=(',', ':'))
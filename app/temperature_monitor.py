@@ -1,23 +1,27 @@
 # temperature_monitor.py
 
 import os
-import time
 import threading
 from collections import deque
 
+from app.tracing import tracer
+from app.clock import wall_clock
+
 class TemperatureMonitor:
     """
     Monitors the Raspberry Pi CPU temperature and signals when it exceeds a threshold.
     """
     
-    def __init__(self,  max_temp=84, stable_temp=79.0, stable_temp_window=3.0, check_interval=1, moving_avg_readings=3, starting_throttle_time=0.1,  throttle_up_multiplier=1.3, throttle_down_divisor=1.1):
+    def __init__(self,  max_temp=84, stable_temp=79.0, stable_temp_window=3.0, check_interval=1, moving_avg_readings=3, starting_throttle_time=0.1,  throttle_up_multiplier=1.3, throttle_down_divisor=1.1, clock=None):
         """
         Initialize the TemperatureMonitor.
         """
+        self._clock = clock or wall_clock
         self.stable_temp = stable_temp
         self.max_temp = max_temp
         self.check_interval = check_interval
         self.throttle_time = None
+        self.average_temperature = None
         self.starting_throttle_time = starting_throttle_time
         self.stable_temp_window = stable_temp_window
         self.moving_avg_readings = moving_avg_readings
@@ -39,21 +43,23 @@ class TemperatureMonitor:
     
     def throttle(self):
         while self.overheat_event.is_set():
-            self._halt() # just stop everything until the temperature dips back down
+            with tracer.span('overheated', 'temperature'):
+                self._halt() # just stop everything until the temperature dips back down
 
         with self.throttle_lock:
             t = self.throttle_time
 
         if t is not None:
-            self._slowdown(t)
+            with tracer.span('throttle', 'temperature'):
+                self._slowdown(t)
 
     def _halt(self):
         """Defined just for testing"""
-        time.sleep(1)
+        self._clock.sleep(1)
 
     def _slowdown(self, t):
         """Defined just for testing"""
-        time.sleep(t)
+        self._clock.sleep(t)
 
     def _log(self, str):
         print(str)
@@ -63,9 +69,11 @@ class TemperatureMonitor:
         avg_temp=None
         while not self.stop_event.is_set():
             last_avg_temp = avg_temp
-            temp = self.get_cpu_temp()
+            with tracer.span('read_temperature', 'temperature'):
+                temp = self.get_cpu_temp()
             self.temp_readings.append(temp)
             avg_temp = sum(self.temp_readings) / len(self.temp_readings)
+            self.average_temperature = avg_temp
             
             if avg_temp is not None and avg_temp >= self.max_temp:
                 if not self.overheat_event.is_set():
@@ -76,7 +84,7 @@ class TemperatureMonitor:
                     self._log(f"[TemperatureMonitor] Overheating cleared! Average Temperature: {avg_temp:.1f}°C < {self.max_temp}°C")
                     self.overheat_event.clear() 
                     
-            with self.throttle_lock: 
+            with self.throttle_lock, tracer.span('adjust_throttle', 'temperature'): 
                 if last_avg_temp is not None:
                     # not cooling and over threshold window
                     if avg_temp >= last_avg_temp and avg_temp > self.stable_temp + self.stable_temp_window/2.0:  
@@ -94,7 +102,7 @@ class TemperatureMonitor:
                         
                         self._log(f"[TemperatureMonitor] Average Temperature: {avg_temp:.1f}°C - decreasing throttling {(self.throttle_time or 0):.2f}s")
                 
-            time.sleep(self.check_interval)
+            self._clock.wait(self.stop_event, self.check_interval)
             
     def start(self):
         """Starts the temperature monitoring thread."""
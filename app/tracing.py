@@ -0,0 +1,81 @@
+# app/tracing.py
+
+import os
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+
+
+class _Span:
+    __slots__ = ('_tracer', '_name', '_category', '_start', '_wall_start')
+
+    def __init__(self, tracer, name, category):
+        self._tracer = tracer
+        self._name = name
+        self._category = category
+
+    def __enter__(self):
+        self._wall_start = time.time_ns()
+        self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        duration = time.perf_counter_ns() - self._start
+        thread = threading.current_thread()
+        self._tracer._events.append((self._name, self._category, self._wall_start, duration, thread.ident, thread.name))
+        return False
+
+
+class Tracer:
+    """
+    Records spans of what each thread was doing into a bounded ring, to be dumped as a
+    Chrome trace and opened in Perfetto (ui.perfetto.dev) or chrome://tracing.
+
+    Off by default.  When off, span() hands back a shared do-nothing context, so leaving
+    the instrumentation in costs next to nothing.
+    """
+    _NOT_TRACING = nullcontext()
+
+    def __init__(self, capacity=100000, enabled=False):
+        self._events = deque(maxlen=capacity) # oldest spans fall off the end
+        self.enabled = enabled
+
+    def span(self, name, category='app'):
+        """with tracer.span('detect'): ... records how long the block took, on this thread."""
+        if not self.enabled:
+            return self._NOT_TRACING
+        return _Span(self, name, category)
+
+    def clear(self):
+        self._events.clear()
+
+    def chrome_trace(self, since=None, until=None):
+        """
+        Spans that started between since and until, in seconds since the epoch, as a
+        Chrome trace-event dict ready for json.dump.
+        """
+        since_ns = since * 1e9 if since is not None else float('-inf')
+        until_ns = until * 1e9 if until is not None else float('inf')
+        pid = os.getpid()
+
+        events = []
+        threads = {}
+        for name, category, start, duration, tid, thread_name in list(self._events):
+            if since_ns <= start <= until_ns:
+                threads[tid] = thread_name
+                events.append({
+                    'name': name, 'cat': category, 'ph': 'X',
+                    'ts': start / 1000, 'dur': duration / 1000, # microseconds
+                    'pid': pid, 'tid': tid,
+                })
+
+        names = [
+            {'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': thread_name}}
+            for tid, thread_name in threads.items()
+        ]
+        return {'traceEvents': names + events, 'displayTimeUnit': 'ms'}
+
+
+# One tracer for the whole process, so any thread can record spans without it being passed around
+tracer = Tracer()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# benchmarks/cpu_detector_benchmark.py
+#
+# Compares the old CPUDetector path (every class, to_json + json.loads) with the
+# direct tensor path (target/avoid classes only, boxes read as numpy arrays).
+#
+#   python -m benchmarks.cpu_detector_benchmark --iterations 20
+
+import argparse
+import glob
+import json
+import os
+import time
+
+import cv2
+import numpy as np
+
+from app.detector import CPUDetector
+
+
+def load_images():
+    tests_dir = os.path.join(os.path.dirname(__file__), '..', 'tests')
+    paths = sorted(glob.glob(os.path.join(tests_dir, '*.jp*g')))
+    return [(os.path.basename(path), cv2.imread(path)) for path in paths]
+
+
+def json_round_trip(detector, frame):
+    """The original detect_objects: all classes, then a json round trip to read the boxes."""
+    results = detector.model(frame, verbose=False)
+    detections = json.loads(results[0].to_json())
+    results[0].plot()
+    return [item for item in detections if item['name'] in detector._target_classes + detector._avoid_classes]
+
+
+def direct(detector, frame):
+    detector.detect_objects(frame)
+    return detector.targets + detector.aversions
+
+
+def time_path(path, detector, frame, iterations):
+    path(detector, frame) # warm up
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        detections = path(detector, frame)
+        timings.append(time.perf_counter() - start)
+    return np.array(timings) * 1000, len(detections)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--model', default='yolov10n.pt')
+    args = parser.parse_args()
+
+    detector = CPUDetector(model_name=args.model, threshold=0.5, target_classes=['cow', 'bird', 'cat', 'dog'], avoid_classes=['person'])
+
+    print(f"{'image':<22}{'path':<16}{'mean ms':>10}{'p95 ms':>10}{'detections':>12}")
+    for name, frame in load_images():
+        for label, path in [('json round trip', json_round_trip), ('direct', direct)]:
+            timings, count = time_path(path, detector, frame, args.iterations)
+            print(f"{name:<22}{label:<16}{timings.mean():>10.1f}{np.percentile(timings, 95):>10.1f}{count:>12}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# benchmarks/pipeline_benchmark.py
+#
+# Runs frames through the whole App - camera, detector, tracker, fake hardware and
+# frame store - and reports how it went as JSON.
+#
+#   python -m benchmarks.pipeline_benchmark --detector cpu --source deck.mp4 --output report.json
+#   python -m benchmarks.pipeline_benchmark --detector cpu --source deck.mp4 --baseline report.json
+#
+# Without --source it plays the test images. With --baseline it exits 1 if anything got
+# more than --tolerance worse, so it can gate a change before it goes to the Pi.
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from functools import partial
+
+import cv2
+
+from app.detector import BaseDetector, CPUDetector, HailoDetector
+from app.process_detector import ProcessDetector
+from app.frame_processor import FrameProcessor
+from app.motion_gate import MotionGate
+from app.box_propagator import BoxPropagator
+from app.target_tracker import TargetTracker
+from app.main import App
+from camera.fake_camera import FakeCamera
+from camera.replay_camera import ReplayCamera
+from hardware.fake_hardware import FakeHardwareController
+
+TARGET_CLASSES = ['cow', 'bird', 'cat', 'dog']
+AVOID_CLASSES = ['person']
+
+# metric path, and whether bigger is better.  Allocations are only there with --trace-allocations.
+COMPARED = [
+    (('fps',), True),
+    (('latency_ms', 'total', 'p95_ms'), False),
+    (('latency_ms', 'inference', 'p95_ms'), False),
+    (('peak_rss_mb',), False),
+    (('allocated_kb_per_frame',), False),
+]
+
+
+class NullDetector(BaseDetector):
+    """Never finds anything, for timing everything but the model."""
+
+    def _detect_batch(self, images):
+        return [[] for _ in images]
+
+
+class SteadyTemperature:
+    """Stands in for TemperatureMonitor, which needs a Pi to read the temperature."""
+
+    def __init__(self):
+        self.average_temperature = None
+        self.throttle_time = None
+        self.overheat_event = threading.Event()
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def throttle(self):
+        pass
+
+
+def build_detector(name, threshold=0.5):
+    kwargs = dict(threshold=threshold, target_classes=TARGET_CLASSES, avoid_classes=AVOID_CLASSES)
+    if name == 'null':
+        return NullDetector(**kwargs)
+    if name == 'hailo':
+        return HailoDetector(hef_path=os.environ.get('HEF_PATH', 'yolov8m.hef'), **kwargs)
+    if name == 'process':
+        return ProcessDetector(partial(CPUDetector, **kwargs))
+
+    # cpu, onnx, openvino, onnx_int8 or openvino_int8
+    backend, _, quantized = name.partition('_')
+    return CPUDetector(backend='torch' if backend == 'cpu' else backend, int8=quantized == 'int8', **kwargs)
+
+
+def build_camera(source, frames, realtime):
+    if source:
+        return ReplayCamera(source, realtime=realtime)
+
+    tests_dir = os.path.join(os.path.dirname(__file__), '..', 'tests')
+    images = [cv2.imread(os.path.join(tests_dir, name)) for name in sorted(os.listdir(tests_dir)) if name.endswith(('.jpg', '.jpeg'))]
+    images = [cv2.resize(image, (640, 480)) for image in images if image is not None]
+    return FakeCamera(frames=[images[index % len(images)] for index in range(frames)])
+
+
+def run(detector, camera, pipelined=False, motion_gate=False, detect_every=1, trace_allocations=False):
+    """Play every frame from camera through an App, returning the report."""
+    tracker = TargetTracker(fov_horizontal=75, fov_vertical=66)
+    tracker._log = lambda message: None # it's chatty
+    hardware_controller = FakeHardwareController()
+    frame_processor = FrameProcessor(
+        detector, tracker, hardware_controller,
+        motion_gate=MotionGate() if motion_gate else None,
+        box_propagator=BoxPropagator() if detect_every > 1 else None, detect_every=detect_every,
+        sleep_interval=0 # judge every frame, or one dark frame puts the rest of the run to sleep
+    )
+    app = App(camera, hardware_controller, frame_processor, SteadyTemperature(), pipelined=pipelined)
+
+    fire_frames = 0
+    allocated = 0
+    last_traced = 0
+    publish = app._publish
+    def count_fire_decisions(frame):
+        nonlocal fire_frames, allocated, last_traced
+        publish(frame)
+        fire_frames += bool(frame_processor.fire())
+        if trace_allocations:
+            # The most held at once above where the last frame left off - numpy buffers included,
+            # even ones freed again - is at least what this frame allocated.
+            traced, peak = tracemalloc.get_traced_memory()
+            allocated += peak - last_traced
+            last_traced = traced
+            tracemalloc.reset_peak()
+    app._publish = count_fire_decisions
+
+    if trace_allocations:
+        tracemalloc.start()
+        last_traced = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+
+    app.start_processing()
+    if pipelined:
+        app.pipeline.join()
+    else:
+        app.thread.join()
+
+    seconds = time.perf_counter() - start
+    heap_peak = None
+    if trace_allocations:
+        heap_peak = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+
+    frames = app.frames_processed
+    return {
+        'frames': frames,
+        'seconds': round(seconds, 3),
+        'fps': round(frames / seconds, 2) if seconds else None,
+        'frames_dropped': app.pipeline.dropped if pipelined else {},
+        'latency_ms': app.latency.summary(),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'python_heap_peak_mb': round(heap_peak, 1) if heap_peak is not None else None,
+        'allocated_kb_per_frame': round(allocated / 2**10 / frames, 1) if trace_allocations and frames else None,
+        'fire_events': tracker.fire_events,
+        'fire_seconds': round(tracker.fire_seconds, 3),
+        'fire_frames': fire_frames,
+    }
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10 # bytes on a Mac, KB on Linux
+
+
+def compare(report, baseline, tolerance=0.1):
+    """A description of every compared metric that's more than tolerance worse than baseline."""
+    regressions = []
+    for path, bigger_is_better in COMPARED:
+        now, then = lookup(report, path), lookup(baseline, path)
+        if now is None or not then:
+            continue
+
+        change = (now - then) / then
+        if (-change if bigger_is_better else change) > tolerance:
+            regressions.append(f"{'.'.join(path)}: {then} -> {now} ({change:+.0%})")
+    return regressions
+
+
+def lookup(report, path):
+    for key in path:
+        if not isinstance(report, dict) or key not in report:
+            return None
+        report = report[key]
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--detector', default='cpu', help="null, cpu, onnx, openvino, onnx_int8, openvino_int8, process or hailo")
+    parser.add_argument('--source', help="video file or image directory to replay, otherwise the test images")
+    parser.add_argument('--frames', type=int, default=200, help="frames of test images, without --source")
+    parser.add_argument('--realtime', action='store_true', help="replay at recorded speed rather than flat out")
+    parser.add_argument('--pipelined', action='store_true', help="best with --realtime, flat out the capture stage drops nearly everything")
+    parser.add_argument('--motion-gate', action='store_true')
+    parser.add_argument('--detect-every', type=int, default=1)
+    parser.add_argument('--trace-allocations', action='store_true', help="report peak Python heap and KB allocated a frame, slowing everything down")
+    parser.add_argument('--output', help="write the report here as well as stdout")
+    parser.add_argument('--baseline', help="a previous report to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.1, help="how much worse is a regression, 0.1 is 10%%")
+    args = parser.parse_args()
+
+    # everything the app prints goes to stderr, leaving stdout for the report
+    with contextlib.redirect_stdout(sys.stderr):
+        detector = build_detector(args.detector)
+        try:
+            report = run(
+                detector, build_camera(args.source, args.frames, args.realtime),
+                pipelined=args.pipelined, motion_gate=args.motion_gate, detect_every=args.detect_every,
+                trace_allocations=args.trace_allocations
+            )
+        finally:
+            detector.release()
+
+    report = dict({
+        'detector': args.detector,
+        'source': args.source or 'test images',
+        'pipelined': args.pipelined,
+        'motion_gate': args.motion_gate,
+        'detect_every': args.detect_every,
+        'machine': platform.machine(),
+        'python': platform.python_version(),
+    }, **report)
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
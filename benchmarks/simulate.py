@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# benchmarks/simulate.py
+#
+# Closed loop simulation: birds fly about a made up garden, the camera sees whatever the
+# simulated servos point it at, and the real tracker, frame processor and patrol decide
+# where to point next and when to fire.  All on a virtual clock, so an hour takes moments.
+#
+#   python -m benchmarks.simulate --minutes 60 --birds 20
+#   python -m benchmarks.simulate --detector cpu --sprite bird.png --minutes 5
+#
+# The oracle detector sees exactly what's there, to judge tracking and patrol on their own.
+# Prints a JSON report: time to first shot, hit ratio and loop FPS.
+
+import argparse
+import json
+import random
+import sys
+import time
+import contextlib
+
+import cv2
+
+from app.clock import VirtualClock
+from app.detector import BaseDetector
+from app.frame_processor import FrameProcessor
+from app.motion_gate import MotionGate
+from app.box_propagator import BoxPropagator
+from app.target_tracker import TargetTracker
+from camera.sim_camera import SimCamera, SimBird
+from hardware.sim_hardware import SimHardwareController
+
+
+class OracleDetector(BaseDetector):
+    """
+    Reports exactly the birds a SimCamera drew in the frame.  inference_seconds of
+    simulated time pass while it 'thinks', to see what a slower model would do to aim.
+    """
+
+    def __init__(self, camera, inference_seconds=0.0, clock=None, **kwargs):
+        super().__init__(**kwargs)
+        self._camera = camera
+        self._inference_seconds = inference_seconds
+        self._clock = clock
+
+    def detect_objects(self, frame, regions=None):
+        if self._inference_seconds and self._clock is not None:
+            self._clock.sleep(self._inference_seconds)
+        self._set_detections(frame, self._camera.detections())
+        return frame
+
+
+class Scorer:
+    """
+    Keeps score, frame by frame.  A frame with the solenoid open is a hit if the camera -
+    and so the nozzle - is pointing within a bird's width of it.  Only pan counts, as the
+    nozzle tilts up to lob water at distant birds.
+    """
+
+    def __init__(self, birds):
+        self.birds = birds
+        self.frames = 0
+        self.firing_frames = 0
+        self.hit_frames = 0
+        self.people_frames = 0 # firing at someone
+        self.first_shots = {} # bird: seconds from arriving to first being hit
+
+    def update(self, t, aim, firing, pan_range, tilt_range):
+        self.frames += 1
+        if not firing:
+            return
+
+        self.firing_frames += 1
+        pan = aim[0]
+        hit = [
+            bird for bird in self.birds
+            if bird.present(t) and abs(bird.position(t, pan_range, tilt_range)[0] - pan) <= bird.width / 2
+        ]
+        if any(bird.name == 'person' for bird in hit):
+            self.people_frames += 1
+        hit = [bird for bird in hit if bird.name != 'person']
+        if hit:
+            self.hit_frames += 1
+        for bird in hit:
+            self.first_shots.setdefault(bird, t - bird.arrives)
+
+    def report(self):
+        birds = [bird for bird in self.birds if bird.name != 'person']
+        times = sorted(self.first_shots.values())
+        return {
+            'birds': len(birds),
+            'birds_shot': len(times),
+            'time_to_first_shot': {
+                'mean_s': round(sum(times) / len(times), 2) if times else None,
+                'median_s': round(times[len(times) // 2], 2) if times else None,
+                'max_s': round(times[-1], 2) if times else None,
+            },
+            'firing_frames': self.firing_frames,
+            'hit_ratio': round(self.hit_frames / self.firing_frames, 3) if self.firing_frames else None,
+            'frames_firing_at_people': self.people_frames,
+        }
+
+
+def random_birds(count, seconds, people=0, seed=0, pan_range=(0, 180), tilt_range=(55, 95)):
+    """Birds turning up at random through the run, and staying a while, and perhaps some people."""
+    rng = random.Random(seed)
+
+    def visitor(name, width):
+        arrives = rng.uniform(0, seconds * 0.8)
+        return SimBird(
+            pan=rng.uniform(*pan_range), tilt=rng.uniform(*tilt_range),
+            pan_speed=rng.gauss(0, 4), tilt_speed=rng.gauss(0, 1),
+            width=width, height=width * 1.25,
+            arrives=arrives, leaves=arrives + rng.uniform(10, 60), name=name
+        )
+
+    return [visitor('bird', rng.uniform(8, 16)) for _ in range(count)] + [visitor('person', 20) for _ in range(people)]
+
+
+def simulate(birds, seconds, fps=10, slew_rate=300.0, latency=0.02, detector=None, inference_seconds=0.0,
+             motion_gate=False, detect_every=1, sprite=None, seed=0):
+    """Run the whole closed loop for seconds of simulated time, returning the report."""
+    clock = VirtualClock()
+    hardware_controller = SimHardwareController(slew_rate=slew_rate, latency=latency, clock=clock)
+    camera = SimCamera(hardware_controller, birds, fps=fps, seconds=seconds, sprite=sprite, clock=clock, seed=seed)
+    tracker = TargetTracker(fov_horizontal=camera.fov[0], fov_vertical=camera.fov[1], clock=clock)
+    tracker._log = lambda message: None # it's chatty
+    if detector is None:
+        detector = OracleDetector(camera, inference_seconds, clock, target_classes=['bird'], avoid_classes=['person'])
+    frame_processor = FrameProcessor(
+        detector, tracker, hardware_controller,
+        motion_gate=MotionGate() if motion_gate else None,
+        box_propagator=BoxPropagator() if detect_every > 1 else None, detect_every=detect_every,
+        clock=clock
+    )
+    scorer = Scorer(birds)
+
+    start = time.perf_counter()
+    try:
+        for frame in camera.frame_generator():
+            frame_processor.process_frame(frame)
+            scorer.update(camera.elapsed, hardware_controller.position(), hardware_controller.firing,
+                          camera.pan_range, camera.tilt_range)
+    finally:
+        hardware_controller.cleanup()
+    real_seconds = time.perf_counter() - start
+
+    return dict({
+        'simulated_seconds': round(camera.elapsed, 2),
+        'real_seconds': round(real_seconds, 2),
+        'frames': scorer.frames,
+        'loop_fps': round(scorer.frames / real_seconds, 1) if real_seconds else None,
+        'fire_events': tracker.fire_events,
+        'fire_seconds': round(tracker.fire_seconds, 2),
+    }, **scorer.report())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Closed loop pan/tilt simulation, reported as JSON")
+    parser.add_argument('--minutes', type=float, default=10)
+    parser.add_argument('--birds', type=int, default=10)
+    parser.add_argument('--people', type=int, default=0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--fps', type=float, default=10, help="camera frames per simulated second")
+    parser.add_argument('--slew-rate', type=float, default=300, help="servo degrees per second")
+    parser.add_argument('--latency', type=float, default=0.02, help="seconds for a servo command to take effect")
+    parser.add_argument('--inference-seconds', type=float, default=0, help="simulated time the oracle takes per frame")
+    parser.add_argument('--detector', default='oracle', help="oracle, or any benchmarks.pipeline_benchmark detector")
+    parser.add_argument('--sprite', help="image to draw the birds with, for real detectors")
+    parser.add_argument('--motion-gate', action='store_true')
+    parser.add_argument('--detect-every', type=int, default=1)
+    args = parser.parse_args()
+
+    seconds = args.minutes * 60
+    birds = random_birds(args.birds, seconds, people=args.people, seed=args.seed)
+    sprite = cv2.imread(args.sprite) if args.sprite else None
+
+    with contextlib.redirect_stdout(sys.stderr):
+        detector = None
+        if args.detector != 'oracle':
+            from benchmarks.pipeline_benchmark import build_detector
+            detector = build_detector(args.detector)
+        try:
+            report = simulate(
+                birds, seconds, fps=args.fps, slew_rate=args.slew_rate, latency=args.latency,
+                detector=detector, inference_seconds=args.inference_seconds,
+                motion_gate=args.motion_gate, detect_every=args.detect_every, sprite=sprite, seed=args.seed
+            )
+        finally:
+            if detector is not None:
+                detector.release()
+
+    print(json.dumps(dict({'detector': args.detector, 'seed': args.seed}, **report), indent=2))
+
+
+if __name__ == '__main__':
+    main()
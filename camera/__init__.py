@@ -4,18 +4,25 @@ import sys
 import os
 from .base_camera import BaseCamera
 
-def get_camera(fake=False, frames=None):
+def get_camera(fake=False, frames=None, size=None, replay=None, realtime=True):
     """
     Factory function to get the appropriate camera implementation based on the platform.
     If fake=True, returns a FakeCamera for testing.
+    size is the (width, height) to capture at, where the camera supports it.
+    replay is a video file or directory of images to play back instead of a camera, at the
+    pace it was recorded if realtime, otherwise as fast as it can be processed.
     """
     if fake:
         from .fake_camera import FakeCamera
         return FakeCamera(frames=frames)
+
+    if replay:
+        from .replay_camera import ReplayCamera
+        return ReplayCamera(replay, realtime=realtime)
     
     if sys.platform.startswith('linux') and os.uname().machine.startswith('aarch'):
         from .pi_camera import PiCamera
-        return PiCamera()
+        return PiCamera(size=size) if size else PiCamera()
     else:
         from .mac_camera import MacCamera
         return MacCamera()
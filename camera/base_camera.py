@@ -5,6 +5,9 @@ class BaseCamera:
     Abstract base class for camera implementations.
     """
 
+    # When the sensor captured the last frame, on the time.monotonic clock, for cameras that know
+    sensor_timestamp = None
+
     def frame_generator(self):
         raise NotImplementedError("Must be implemented by subclass.")
 
@@ -12,7 +12,7 @@ class PiCamera(BaseCamera):
     Camera implementation for Raspberry Pi using Picamera2.
     """
 
-    def __init__(self):
+    def __init__(self, size=(640, 480)):
         # Initialize Picamera2
         self.picam2 = Picamera2()
         
@@ -29,7 +29,7 @@ class PiCamera(BaseCamera):
             },
             main={
                 'format': 'RGB888',
-                'size': (640, 480)
+                'size': size # bigger for tiled detection of distant chickens
             },
             transform=Transform(hflip=True, vflip=True)
         )
@@ -57,8 +57,14 @@ class PiCamera(BaseCamera):
         frame_count = 0
         t = time.time()
         while True:
-            # Capture a frame as a NumPy array
-            frame = self.picam2.capture_array()
+            # Capture a frame as a NumPy array, and when the sensor started exposing it.
+            # SensorTimestamp is in ns on the same monotonic clock as time.monotonic()
+            request = self.picam2.capture_request()
+            try:
+                frame = request.make_array('main')
+                self.sensor_timestamp = request.get_metadata()['SensorTimestamp'] / 1e9
+            finally:
+                request.release()
 
             # Print frame rate on the same line
             if time.time() - t >= 5:
@@ -0,0 +1,114 @@
+# camera/replay_camera.py
+
+import os
+import queue
+import threading
+import time
+import cv2
+from .base_camera import BaseCamera
+
+
+class ReplayCamera(BaseCamera):
+    """
+    Plays back a recorded video file, or a directory of images in name order, as if it were
+    the camera.  Frames are decoded up to read_ahead frames ahead in a thread of their own.
+
+    realtime plays frames at the pace they were recorded, from the video's timestamps or fps
+    for images.  Otherwise frames are handed over as fast as they're asked for, and none are
+    ever skipped, so runs are repeatable.
+    """
+    IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+    def __init__(self, source, realtime=True, fps=30, loop=False, read_ahead=8):
+        if not os.path.exists(source):
+            raise IOError(f"Nothing to replay at {source}")
+
+        self.source = source
+        self.realtime = realtime
+        self.fps = fps # for images, or videos that don't say
+        self.loop = loop
+        self._read_ahead = read_ahead
+        self._stop_event = threading.Event()
+        self._reader = None
+
+    def frame_generator(self):
+        """
+        Generator that yields the recorded frames, paced if realtime.
+        """
+        frames = queue.Queue(maxsize=self._read_ahead)
+        self._stop_event.clear()
+        self._reader = threading.Thread(target=self._read_frames, args=(frames,), daemon=True)
+        self._reader.start()
+
+        start = None
+        while not self._stop_event.is_set():
+            try:
+                item = frames.get(timeout=0.1)
+            except queue.Empty:
+                continue # check we've not been released, the reader won't send None if we have
+            if item is None:
+                break
+
+            frame, timestamp = item
+            if start is None or timestamp == 0:
+                start = time.monotonic() - timestamp # every loop starts the clock again
+            if self.realtime:
+                delay = start + timestamp - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+
+            self.sensor_timestamp = time.monotonic()
+            yield frame
+
+    def release(self):
+        self._stop_event.set()
+        if self._reader is not None:
+            self._reader.join()
+
+    def _read_frames(self, frames):
+        """Decode frames into the queue, blocking while it's full.  None marks the end."""
+        try:
+            while not self._stop_event.is_set():
+                for frame, timestamp in self._decode():
+                    if not self._put(frames, (frame, timestamp)):
+                        return
+                if not self.loop:
+                    break
+        finally:
+            self._put(frames, None)
+
+    def _put(self, frames, item):
+        while not self._stop_event.is_set():
+            try:
+                frames.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _decode(self):
+        """(frame, seconds since the first frame) for every frame in the source."""
+        if os.path.isdir(self.source):
+            names = sorted(name for name in os.listdir(self.source) if name.lower().endswith(self.IMAGE_EXTENSIONS))
+            for index, name in enumerate(names):
+                frame = cv2.imread(os.path.join(self.source, name))
+                if frame is not None:
+                    yield frame, index / self.fps
+            return
+
+        video = cv2.VideoCapture(self.source)
+        try:
+            fps = video.get(cv2.CAP_PROP_FPS) or self.fps
+            first = None
+            index = 0
+            while True:
+                ret, frame = video.read()
+                if not ret:
+                    break
+                # the frame's own timestamp, unless the backend doesn't know it
+                position = video.get(cv2.CAP_PROP_POS_MSEC) / 1000
+                first = position if first is None else first
+                yield frame, position - first if position > first or index == 0 else index / fps
+                index += 1
+        finally:
+            video.release()
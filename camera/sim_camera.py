@@ -0,0 +1,181 @@
+# camera/sim_camera.py
+
+import numpy as np
+import cv2
+from .base_camera import BaseCamera
+from app.clock import wall_clock
+
+# COCO class ids, as the detectors report them
+CLASS_IDS = {'person': 0, 'bird': 14, 'cat': 15, 'dog': 16, 'cow': 19}
+
+
+class SimBird:
+    """
+    Something moving about in front of a SimCamera, at a position in pan/tilt degrees.
+    It turns up at arrives, flies at the given degrees a second, bouncing off the edges
+    of the scene, and goes at leaves.  width and height are in degrees too.
+    """
+
+    def __init__(self, pan, tilt, pan_speed=0.0, tilt_speed=0.0, width=12.0, height=15.0, arrives=0.0, leaves=None, name='bird'):
+        self.pan = pan
+        self.tilt = tilt
+        self.pan_speed = pan_speed
+        self.tilt_speed = tilt_speed
+        self.width = width
+        self.height = height
+        self.arrives = arrives
+        self.leaves = leaves
+        self.name = name
+
+    def present(self, t):
+        return t >= self.arrives and (self.leaves is None or t < self.leaves)
+
+    def position(self, t, pan_range, tilt_range):
+        """(pan, tilt) of the bird's centre, t seconds into the simulation."""
+        elapsed = t - self.arrives
+        return (
+            _bounce(self.pan + self.pan_speed * elapsed, *pan_range),
+            _bounce(self.tilt + self.tilt_speed * elapsed, *tilt_range),
+        )
+
+
+def _bounce(value, low, high):
+    """Fold value back into low..high, as if it had bounced off the ends."""
+    span = high - low
+    if span <= 0:
+        return low
+    value = (value - low) % (2 * span)
+    return low + (value if value <= span else 2 * span - value)
+
+
+class SimCamera(BaseCamera):
+    """
+    A camera on a SimHardwareController.  Each frame is the part of a panorama the
+    servos are pointing at, with the birds drawn in, so whatever the tracker and
+    patrol do changes what's seen next.
+
+    The panorama covers every angle the servos can reach.  Without one, a random
+    landscape is made up.  sprite is an image to draw for each bird, otherwise
+    they're brown blobs.  Frames come fps times a simulated second on clock, for
+    seconds in all, or forever.
+
+    visible is the truth about the last frame, (bird, box) for each bird in it, and
+    detections() is the same in the form a detector would give it.
+    """
+
+    def __init__(self, hardware_controller, birds=(), fov=(75.0, 66.0), size=(640, 480), fps=10, seconds=None,
+                 panorama=None, sprite=None, clock=None, seed=0):
+        self.hardware_controller = hardware_controller
+        self.birds = list(birds)
+        self.fov = fov
+        self.size = size
+        self.fps = fps
+        self.seconds = seconds
+        self.sprite = sprite
+        self._clock = clock or wall_clock
+        self._start = None
+        self.visible = []
+        self._stopped = False
+
+        hw = hardware_controller
+        self.pan_range = (hw._pan_angle_low_limit, hw._pan_angle_high_limit)
+        self.tilt_range = (hw._tilt_angle_low_limit, hw._tilt_angle_high_limit)
+        self._pixels_per_degree = (size[0] / fov[0], size[1] / fov[1])
+
+        width = int(np.ceil((self.pan_range[1] - self.pan_range[0] + fov[0]) * self._pixels_per_degree[0]))
+        height = int(np.ceil((self.tilt_range[1] - self.tilt_range[0] + fov[1]) * self._pixels_per_degree[1]))
+        if panorama is None:
+            self.panorama = self._landscape(width, height, seed)
+        else:
+            self.panorama = cv2.resize(panorama, (width, height))
+
+    @property
+    def elapsed(self):
+        """Simulated seconds since the first frame."""
+        return 0.0 if self._start is None else self._clock.time() - self._start
+
+    def frame_generator(self):
+        self._stopped = False
+        self._start = self._clock.time()
+        frames = None if self.seconds is None else round(self.seconds * self.fps)
+        index = 0
+        while not self._stopped and (frames is None or index < frames):
+            yield self.render()
+            self._clock.sleep(1 / self.fps)
+            index += 1
+
+    def release(self):
+        self._stopped = True
+
+    def detections(self):
+        """The birds in the last frame, as a detector would report them."""
+        return [
+            {'name': bird.name, 'class': CLASS_IDS.get(bird.name), 'confidence': 1.0, 'box': dict(box)}
+            for bird, box in self.visible
+        ]
+
+    def to_pixels(self, pan, tilt):
+        """Where pan, tilt is in the panorama.  Higher pan is further left, higher tilt further up."""
+        return (
+            (self.pan_range[1] + self.fov[0] / 2 - pan) * self._pixels_per_degree[0],
+            (self.tilt_range[1] + self.fov[1] / 2 - tilt) * self._pixels_per_degree[1],
+        )
+
+    def render(self):
+        """The view where the servos are pointing right now."""
+        width, height = self.size
+        centre_x, centre_y = self.to_pixels(*self.hardware_controller.position())
+        left = min(max(int(round(centre_x - width / 2)), 0), self.panorama.shape[1] - width)
+        top = min(max(int(round(centre_y - height / 2)), 0), self.panorama.shape[0] - height)
+        frame = self.panorama[top:top + height, left:left + width].copy()
+
+        visible = []
+        t = self.elapsed
+        for bird in self.birds:
+            if not bird.present(t):
+                continue
+            pan, tilt = bird.position(t, self.pan_range, self.tilt_range)
+            x, y = self.to_pixels(pan, tilt)
+            half_width = bird.width * self._pixels_per_degree[0] / 2
+            half_height = bird.height * self._pixels_per_degree[1] / 2
+            box = {
+                'x1': int(round(x - half_width)) - left, 'y1': int(round(y - half_height)) - top,
+                'x2': int(round(x + half_width)) - left, 'y2': int(round(y + half_height)) - top,
+            }
+            if box['x2'] <= 0 or box['y2'] <= 0 or box['x1'] >= width or box['y1'] >= height:
+                continue
+
+            self._draw(frame, box)
+            visible.append((bird, box))
+
+        self.visible = visible
+        return frame
+
+    def _draw(self, frame, box):
+        height, width = frame.shape[:2]
+        x1, y1, x2, y2 = box['x1'], box['y1'], box['x2'], box['y2']
+        if self.sprite is not None:
+            sprite = cv2.resize(self.sprite, (x2 - x1, y2 - y1))
+            cx1, cy1, cx2, cy2 = max(x1, 0), max(y1, 0), min(x2, width), min(y2, height)
+            frame[cy1:cy2, cx1:cx2] = sprite[cy1 - y1:cy2 - y1, cx1 - x1:cx2 - x1]
+            return
+
+        centre = ((x1 + x2) // 2, y1 + (y2 - y1) * 3 // 5)
+        cv2.ellipse(frame, centre, ((x2 - x1) // 2, (y2 - y1) * 2 // 5), 0, 0, 360, (40, 70, 120), -1)
+        cv2.circle(frame, ((x1 + x2) // 2, y1 + (y2 - y1) // 5), max(1, (x2 - x1) // 5), (30, 50, 90), -1)
+
+    def _landscape(self, width, height, seed):
+        """Sky over grass, with enough texture to look like somewhere and keep motion detection honest."""
+        rng = np.random.default_rng(seed)
+        def noise(scale):
+            return cv2.resize(rng.random((height // scale + 1, width // scale + 1)), (width, height))
+
+        clouds = np.clip(noise(16) * 2 - 1, 0, 1) # patchy
+        grass = noise(6)
+        rows = np.linspace(0, 1, height)[:, None]
+        sky = rows < 0.45
+        landscape = np.empty((height, width, 3), dtype=np.uint8)
+        landscape[..., 0] = np.where(sky, 210 - 80 * rows + 45 * clouds, 10 + 140 * grass)
+        landscape[..., 1] = np.where(sky, 160 - 40 * rows + 95 * clouds, 30 + 220 * grass)
+        landscape[..., 2] = np.where(sky, 90 - 30 * rows + 165 * clouds, 10 + 140 * grass)
+        return landscape
@@ -6,12 +6,17 @@ import time
 import random
 import threading
 
+from app.tracing import tracer
+from app.clock import wall_clock
+
 class BaseHardwareController(ABC):
     """
     Base class for hardware controllers.
     """
 
-    def __init__(self):
+    def __init__(self, clock=None):
+        self._clock = clock or wall_clock
+
         # Common configuration
         
         self._pan_angle_high_limit = 180
@@ -21,6 +26,7 @@ class BaseHardwareController(ABC):
         self._tilt_angle_low_limit = 50
         
         self._relay_on = False 
+        self.relay_opened_at = None # time.monotonic() the solenoid last opened, for latency tracing
         
          # Scanning pattern configuration
         self._scan_angles = [
@@ -48,8 +54,8 @@ class BaseHardwareController(ABC):
         self._scan_interval_variation = 0
         self._pan_variation = 5
         self._tilt_variation = 3
-        self._last_tracking = time.time() - self._tracking_pause
-        self._last_scan = time.time() - self._scan_interval
+        self._last_tracking = self._clock.time() - self._tracking_pause
+        self._last_scan = self._clock.time() - self._scan_interval
 
         self._pan_angle = self._scan_angles[self._scan_target]['pan']
         self._tilt_angle = self._scan_angles[self._scan_target]['tilt']
@@ -60,7 +66,10 @@ class BaseHardwareController(ABC):
         self._smooth_thread = None 
         self._smooth_stop_event = threading.Event()
 
-        self._frame_timestamp = time.time()
+        self._frame_timestamp = self._clock.time()
+
+        # When the servos last changed angle, so motion detection can tell the camera moved
+        self._last_servo_move = 0
         
         self._initialize_hardware()
 
@@ -68,11 +77,11 @@ class BaseHardwareController(ABC):
         """
         Activate hardware components based on signals.
         """
-        loop_time = time.time() - self._frame_timestamp
-        self._frame_timestamp = time.time()
+        loop_time = self._clock.time() - self._frame_timestamp
+        self._frame_timestamp = self._clock.time()
         
         if tracker.target != None: 
-            self._last_tracking = time.time()
+            self._last_tracking = self._clock.time()
             
             #self._smooth_pan(self._pan_angle + angle_x, self._tilt_angle + angle_y, loop_time)
             self._stop_smooth_pan()
@@ -102,9 +111,9 @@ class BaseHardwareController(ABC):
             self._update_servos()
             self._tilt_backup_angle = None
                 
-        if time.time() - self._last_tracking > self._tracking_pause: # wait 5 after being on target
-            if time.time() - self._last_scan > self._scan_interval: # wait x before moving to next scan position
-                self._last_scan = time.time()
+        if self._clock.time() - self._last_tracking > self._tracking_pause: # wait 5 after being on target
+            if self._clock.time() - self._last_scan > self._scan_interval: # wait x before moving to next scan position
+                self._last_scan = self._clock.time()
                 #scan_target = random.choice(self._scan_angles)
 
                 self._scan_target = (self._scan_target + 1) % len(self._scan_angles)
@@ -126,6 +135,7 @@ class BaseHardwareController(ABC):
         """
         if not self._relay_on:
             self._toggle_relay()
+            self.relay_opened_at = time.monotonic()
     
     def deactivate_solenoid(self):
         """
@@ -137,11 +147,23 @@ class BaseHardwareController(ABC):
     def _log(self,str):
         print(str)
 
+    def camera_moving(self, settle_time=0.5):
+        """
+        True if the servos have moved within settle_time seconds, allowing for them to finish the move.
+        """
+        return self._clock.time() - self._last_servo_move < settle_time
+
     def _set_pan_angle(self, angle):
-        self._pan_angle = np.clip(angle, self._pan_angle_low_limit, self._pan_angle_high_limit)
+        angle = np.clip(angle, self._pan_angle_low_limit, self._pan_angle_high_limit)
+        if angle != self._pan_angle:
+            self._last_servo_move = self._clock.time()
+        self._pan_angle = angle
             
     def _set_tilt_angle(self, angle):
-        self._tilt_angle = np.clip(angle, self._tilt_angle_low_limit, self._tilt_angle_high_limit)
+        angle = np.clip(angle, self._tilt_angle_low_limit, self._tilt_angle_high_limit)
+        if angle != self._tilt_angle:
+            self._last_servo_move = self._clock.time()
+        self._tilt_angle = angle
 
     def _stop_smooth_pan(self):
         if self._smooth_thread and self._smooth_thread.is_alive():
@@ -151,7 +173,8 @@ class BaseHardwareController(ABC):
     
     def _smooth_pan(self, target_pan_angle, target_tilt_angle, scan_time):
 
-        self._stop_smooth_pan()
+        with tracer.span('stop_smooth_pan', 'hardware'):
+            self._stop_smooth_pan()
         
         # Start a new thread for smooth panning
         self._smooth_thread = threading.Thread(
@@ -169,11 +192,12 @@ class BaseHardwareController(ABC):
         for step in range(0, self._smooth_steps):
             if self._smooth_stop_event.is_set():
                 break
-            self._set_pan_angle(self._pan_angle + step_pan_angle)
-            self._set_tilt_angle(self._tilt_angle + step_tilt_angle)
-            self._update_servos()
+            with tracer.span('smooth_pan_step', 'hardware'):
+                self._set_pan_angle(self._pan_angle + step_pan_angle)
+                self._set_tilt_angle(self._tilt_angle + step_tilt_angle)
+                self._update_servos()
             #print(self._pan_angle, self._tilt_angle)
-            time.sleep(step_delay)
+            self._clock.wait(self._smooth_stop_event, step_delay)
         
 
     @abstractmethod
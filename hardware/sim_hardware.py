@@ -0,0 +1,63 @@
+# hardware/sim_hardware.py
+
+import threading
+from collections import deque
+
+from .base_hardware import BaseHardwareController
+
+
+class SimHardwareController(BaseHardwareController):
+    """
+    Simulated pan/tilt and solenoid, for closed loop testing with a SimCamera.
+
+    Servo commands take latency seconds to arrive, and then the servos turn at no more
+    than slew_rate degrees a second, so position() - where the camera's really pointing -
+    lags where it was told to point, much like the real thing.
+    """
+
+    def __init__(self, slew_rate=300.0, latency=0.02, clock=None):
+        self.slew_rate = slew_rate # degrees/s
+        self.latency = latency # seconds
+        self._commands = deque() # (time, pan, tilt) sent, not yet arrived
+        self._position_lock = threading.Lock()
+        super().__init__(clock=clock)
+
+    def _initialize_hardware(self):
+        self._relay_on = False
+        self._goal = (float(self._pan_angle), float(self._tilt_angle))
+        self._position = self._goal
+        self._moved_at = self._clock.time()
+
+    @property
+    def firing(self):
+        return self._relay_on
+
+    def position(self):
+        """The (pan, tilt) the servos have actually reached by now."""
+        now = self._clock.time()
+        with self._position_lock:
+            while self._commands and self._commands[0][0] + self.latency <= now:
+                sent, pan, tilt = self._commands.popleft()
+                self._move_until(sent + self.latency)
+                self._goal = (pan, tilt)
+            self._move_until(now)
+            return self._position
+
+    def _move_until(self, until):
+        """Turn towards the goal, as far as the slew rate allows by until."""
+        step = self.slew_rate * max(0.0, until - self._moved_at)
+        self._moved_at = max(self._moved_at, until)
+        self._position = tuple(
+            current + max(-step, min(step, goal - current))
+            for current, goal in zip(self._position, self._goal)
+        )
+
+    def _update_servos(self):
+        with self._position_lock:
+            self._commands.append((self._clock.time(), float(self._pan_angle), float(self._tilt_angle)))
+
+    def _toggle_relay(self):
+        self._relay_on = not self._relay_on
+
+    def cleanup(self):
+        self._stop_smooth_pan()
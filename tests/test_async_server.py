@@ -0,0 +1,125 @@
+# tests/test_async_server.py
+
+import unittest
+import asyncio
+import json
+import http.client
+import threading
+from unittest.mock import MagicMock
+
+import cv2
+import numpy as np
+
+from app.async_server import AsyncStreamServer
+from app.main import App
+from camera.fake_camera import FakeCamera
+from hardware.fake_hardware import FakeHardwareController
+
+
+class AsyncStreamServerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        frame = cv2.resize(FakeCamera.fake_frame(), (640, 480))
+        frame_processor = MagicMock()
+        frame_processor.annotated_frame = frame
+        frame_processor.telemetry.return_value = {'width': 640, 'height': 480, 'detections': [], 'target': None}
+        temp_monitor = MagicMock(average_temperature=50.0, throttle_time=None)
+        temp_monitor.overheat_event.is_set.return_value = False
+        self.frames_wanted = threading.Event()
+
+        def frames():
+            self.frames_wanted.wait(5) # hold the frames back till a client is watching
+            for _ in range(20):
+                yield frame
+
+        camera = FakeCamera()
+        camera.frame_generator = frames
+        self.app = App(camera, FakeHardwareController(), frame_processor, temp_monitor)
+
+        self.loop = asyncio.new_event_loop()
+        self.server = AsyncStreamServer(self.app, host='127.0.0.1', port=0)
+        self.loop.run_until_complete(self.server.start())
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        self.app.start_processing()
+
+    def tearDown(self):
+        self.frames_wanted.set()
+        self.app.stop_processing()
+        asyncio.run_coroutine_threadsafe(self.server.close(), self.loop).result(5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(5)
+        self.loop.close()
+
+    def get(self, path):
+        connection = http.client.HTTPConnection('127.0.0.1', self.server.port, timeout=5)
+        connection.request('GET', path)
+        return connection.getresponse()
+
+    def test_stream(self):
+        response = self.get('/video_feed?tier=low')
+        self.frames_wanted.set()
+
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.getheader('Content-Type'), 'multipart/x-mixed-replace; boundary=frame')
+        body = response.read() # to the end of the camera's frames
+
+        parts = [part for part in body.split(b'--frame\r\n') if part]
+        self.assertGreater(len(parts), 0)
+        jpeg = parts[0].split(b'\r\n\r\n', 1)[1]
+        image = cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+        self.assertEqual(image.shape, (240, 320, 3))
+        self.assertEqual(self.app.frame_store.consumers, 0)
+
+    def test_many_viewers_one_encode_a_frame(self):
+        responses = [self.get('/video_feed?tier=medium') for _ in range(20)]
+        self.frames_wanted.set()
+
+        bodies = [response.read() for response in responses]
+
+        self.assertTrue(all(body.count(b'--frame\r\n') > 0 for body in bodies))
+        self.assertLessEqual(self.app.frame_store.jpeg_encodes['medium'], 20)
+
+    def test_telemetry(self):
+        response = self.get('/telemetry')
+        self.frames_wanted.set()
+
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.getheader('Content-Type'), 'text/event-stream')
+        events = [line for line in response.read().split(b'\n\n') if line.startswith(b'data: ')]
+
+        self.assertGreater(len(events), 0)
+        self.assertEqual(json.loads(events[0][len(b'data: '):])['width'], 640)
+        self.assertEqual(self.app.frame_store.telemetry_clients, 0)
+
+    def test_snapshot(self):
+        self.frames_wanted.set()
+        self.app.thread.join(5)
+
+        response = self.get('/snapshot.jpg')
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.getheader('Content-Type'), 'image/jpeg')
+        image = cv2.imdecode(np.frombuffer(response.read(), np.uint8), cv2.IMREAD_COLOR)
+        self.assertEqual(image.shape, (480, 640, 3))
+
+        connection = http.client.HTTPConnection('127.0.0.1', self.server.port, timeout=5)
+        connection.request('GET', '/snapshot.jpg?after=0', headers={'If-None-Match': response.getheader('ETag')})
+        response = connection.getresponse()
+        self.assertEqual(response.status, 304)
+        self.assertEqual(self.app.frame_store.jpeg_encodes['high'], 1)
+
+    def test_other_routes_go_to_flask(self):
+        response = self.get('/latency')
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.getheader('Content-Type'), 'application/json')
+        self.assertIsInstance(json.loads(response.read()), dict)
+
+        response = self.get('/videos/nothing-here.mp4')
+        self.assertEqual(response.status, 404)
+
+    def test_unknown_tier(self):
+        self.assertEqual(self.get('/video_feed?tier=ultra').status, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
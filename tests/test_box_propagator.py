@@ -0,0 +1,93 @@
+# tests/test_box_propagator.py
+
+import unittest
+import numpy as np
+from unittest.mock import MagicMock, patch
+
+from app.box_propagator import BoxPropagator
+from app.frame_processor import FrameProcessor
+from app.detector import BaseDetector
+from app.target_tracker import TargetTracker
+from hardware.fake_hardware import FakeHardwareController
+
+
+class MovingChicken:
+    """A textured patch moving across a plain background."""
+
+    def __init__(self):
+        rng = np.random.default_rng(1)
+        self.patch = rng.integers(0, 256, (60, 60, 3), dtype=np.uint8)
+        self.background = np.full((480, 640, 3), 90, dtype=np.uint8)
+
+    def frame(self, x, y):
+        frame = self.background.copy()
+        frame[y:y + 60, x:x + 60] = self.patch
+        return frame
+
+    def detection(self, x, y):
+        return {'name': 'bird', 'class': 14, 'confidence': 0.9, 'box': {'x1': x, 'y1': y, 'x2': x + 60, 'y2': y + 60}}
+
+
+class BoxPropagatorTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.chicken = MovingChicken()
+        self.propagator = BoxPropagator()
+
+    def test_box_follows_target(self):
+        self.assertTrue(self.propagator.start(self.chicken.frame(200, 200), self.chicken.detection(200, 200)))
+
+        for step in range(1, 6):
+            x, y = 200 + step * 6, 200 - step * 3
+            detection = self.propagator.propagate(self.chicken.frame(x, y))
+            self.assertIsNotNone(detection)
+            self.assertAlmostEqual(detection['box']['x1'], x, delta=2)
+            self.assertAlmostEqual(detection['box']['y1'], y, delta=2)
+            self.assertAlmostEqual(detection['box']['x2'] - detection['box']['x1'], 60, delta=3)
+
+    def test_confidence_decays(self):
+        self.propagator.start(self.chicken.frame(200, 200), self.chicken.detection(200, 200))
+        first = self.propagator.propagate(self.chicken.frame(202, 200))['confidence']
+        second = self.propagator.propagate(self.chicken.frame(204, 200))['confidence']
+        self.assertLess(first, 0.9)
+        self.assertLess(second, first)
+
+    def test_lost_target(self):
+        self.propagator.start(self.chicken.frame(200, 200), self.chicken.detection(200, 200))
+        self.assertIsNone(self.propagator.propagate(self.chicken.background.copy()))
+        self.assertFalse(self.propagator.active)
+
+    def test_nothing_to_follow(self):
+        self.assertFalse(self.propagator.start(self.chicken.background.copy(), self.chicken.detection(200, 200)))
+
+
+class DetectEveryTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.chicken = MovingChicken()
+        self.detector = MagicMock(spec=BaseDetector)
+        self.detector.aversions = []
+        self.hardware_controller = MagicMock(spec=FakeHardwareController)
+        self.tracker = TargetTracker()
+        self.frame_processor = FrameProcessor(
+            detector=self.detector,
+            target_tracker=self.tracker,
+            hardware_controller=self.hardware_controller,
+            box_propagator=BoxPropagator(),
+            detect_every=3
+        )
+
+    def test_detects_every_n_frames_while_following(self):
+        with patch.object(self.tracker, '_log'), patch.object(self.frame_processor, 'is_interesting', return_value=True):
+            for step in range(7):
+                x = 200 + step * 4
+                self.detector.targets = [self.chicken.detection(x, 200)]
+                self.frame_processor.process_frame(self.chicken.frame(x, 200))
+                self.assertAlmostEqual(self.tracker.target['box']['x1'], x, delta=2)
+
+        self.assertEqual(self.detector.detect_objects.call_count, 3) # frames 0, 3 and 6
+        self.assertEqual(self.hardware_controller.process_signals.call_count, 7)
+
+
+if __name__ == '__main__':
+    unittest.main()
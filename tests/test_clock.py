@@ -0,0 +1,116 @@
+# tests/test_clock.py
+
+import unittest
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+from app.clock import VirtualClock
+from app.target_tracker import TargetTracker
+from app.frame_store import FrameStore
+from hardware.fake_hardware import FakeHardwareController
+
+
+class VirtualClockTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = VirtualClock(start=1000)
+
+    def test_driver_sleeps_advance(self):
+        start = time.monotonic()
+        self.clock.sleep(3600)
+
+        self.assertEqual(self.clock.time(), 4600)
+        self.assertLess(time.monotonic() - start, 1)
+
+    def test_wakes_threads_in_order(self):
+        woken = []
+
+        def napper(name, seconds):
+            self.clock.sleep(seconds)
+            woken.append((name, self.clock.time()))
+
+        threads = [threading.Thread(target=napper, args=args) for args in [('long', 10), ('short', 2)]]
+        for thread in threads:
+            thread.start()
+        self.assertTrue(self.clock.wait_for_sleepers(2))
+
+        self.clock.advance(5)
+        self.assertEqual(woken, [('short', 1002)])
+        self.clock.advance(5)
+        self.assertEqual(woken, [('short', 1002), ('long', 1010)])
+        for thread in threads:
+            thread.join()
+
+    def test_wait_returns_early_when_set(self):
+        event = threading.Event()
+        results = []
+        thread = threading.Thread(target=lambda: results.append(self.clock.wait(event, 60)))
+        thread.start()
+        self.assertTrue(self.clock.wait_for_sleepers(1))
+
+        event.set()
+        thread.join(timeout=1)
+
+        self.assertEqual(results, [True])
+        self.assertEqual(self.clock.time(), 1000)
+
+
+class SimulatedTimeTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = VirtualClock()
+
+    def test_tracker_cools_down(self):
+        tracker = TargetTracker(clock=self.clock)
+        tracker._start_fire_event()
+        self.clock.advance(2) # longer than max_fire_time
+        self.assertFalse(tracker._permitted_to_fire())
+
+        tracker._end_fire_event()
+        self.clock.advance(2)
+        self.assertFalse(tracker._permitted_to_fire())
+        self.clock.advance(2)
+        self.assertTrue(tracker._permitted_to_fire())
+        self.assertEqual(tracker.fire_seconds, 2)
+
+    def test_patrol_waits_after_tracking(self):
+        controller = FakeHardwareController(clock=self.clock)
+        tracker = MagicMock(target={'name': 'bird'}, dx=0, dy=0, fire=False)
+        controller.process_signals(tracker)
+
+        with patch.object(controller, '_smooth_pan') as smooth_pan:
+            self.clock.advance(4)
+            controller.patrol()
+            smooth_pan.assert_not_called()
+
+            self.clock.advance(2) # past the tracking pause
+            controller.patrol()
+            smooth_pan.assert_called_once()
+
+    def test_smooth_pan_follows_the_clock(self):
+        controller = FakeHardwareController(clock=self.clock)
+        controller._smooth_pan(120, 100, 1.5)
+        self.assertTrue(self.clock.wait_for_sleepers(1))
+
+        self.clock.advance(3)
+        controller._smooth_thread.join(timeout=1)
+
+        self.assertAlmostEqual(controller._pan_angle, 120)
+        self.assertAlmostEqual(controller._tilt_angle, 100)
+
+    def test_video_saved_after_the_delay(self):
+        store = FrameStore(video_snapshot_seconds=10, clock=self.clock)
+        with patch.object(store, '_save_video') as save_video:
+            store.save()
+            self.assertTrue(self.clock.wait_for_sleepers(1))
+            self.clock.advance(4)
+            save_video.assert_not_called()
+
+            self.clock.advance(2)
+            store.save_thread.join(timeout=1)
+            save_video.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
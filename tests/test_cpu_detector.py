@@ -0,0 +1,155 @@
+# tests/test_cpu_detector.py
+
+import unittest
+import os
+import sys
+import tempfile
+import types
+import numpy as np
+from unittest.mock import patch
+
+from camera.fake_camera import FakeCamera
+
+
+class FakeBoxes:
+    def __init__(self, xyxy, cls, conf):
+        self.xyxy = np.array(xyxy, dtype=np.float32).reshape(-1, 4)
+        self.cls = np.array(cls, dtype=np.float32)
+        self.conf = np.array(conf, dtype=np.float32)
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self
+
+
+class FakeResult:
+    def __init__(self, names, boxes):
+        self.names = names
+        self.boxes = boxes
+
+    def plot(self):
+        return FakeCamera.fake_frame()
+
+    def to_json(self):
+        raise AssertionError("detect_objects shouldn't need a json round trip")
+
+
+class FakeYOLO:
+    names = {0: 'person', 1: 'bicycle', 14: 'bird', 15: 'cat', 16: 'dog'}
+
+    exports = []
+
+    def __init__(self, model_name, task=None):
+        self.model_name = model_name
+        self.calls = []
+
+    def export(self, format, imgsz, int8=False, dynamic=False):
+        """Pretend to export, writing the file or directory next to the model like ultralytics does."""
+        FakeYOLO.exports.append({'format': format, 'imgsz': imgsz, 'int8': int8, 'dynamic': dynamic})
+        directory = os.path.dirname(self.model_name)
+        stem = os.path.splitext(os.path.basename(self.model_name))[0]
+        if format == 'onnx':
+            path = os.path.join(directory, f"{stem}.onnx")
+            open(path, 'w').close()
+        else:
+            path = os.path.join(directory, f"{stem}{'_int8' if int8 else ''}_openvino_model")
+            os.makedirs(path)
+        return path
+
+    def __call__(self, frames, **kwargs):
+        self.calls.append(dict(kwargs, images=len(frames)))
+        boxes = FakeBoxes(
+            xyxy=[[10.5, 20, 110, 220], [300, 40, 340, 90]],
+            cls=[14, 0],
+            conf=[0.9, 0.6],
+        )
+        return [FakeResult(self.names, boxes) for _ in frames]
+
+
+class CPUDetectorTestCase(unittest.TestCase):
+
+    def setUp(self):
+        with patch.dict(sys.modules, {'ultralytics': types.SimpleNamespace(YOLO=FakeYOLO)}):
+            from app.detector import CPUDetector
+            self.detector = CPUDetector(threshold=0.4, target_classes=['bird', 'cat'], avoid_classes=['person'])
+
+    def test_model_filters_classes(self):
+        self.detector.detect_objects(FakeCamera.fake_frame())
+        call = self.detector.model.calls[0]
+        self.assertEqual(sorted(call['classes']), [0, 14, 15])
+        self.assertNotIn('conf', call) # ultralytics' own confidence cutoff, as ever
+
+    def test_detections_read_from_tensors(self):
+        self.detector.detect_objects(FakeCamera.fake_frame())
+
+        self.assertEqual(len(self.detector.targets), 1)
+        bird = self.detector.targets[0]
+        self.assertEqual(bird['name'], 'bird')
+        self.assertEqual(bird['class'], 14)
+        self.assertAlmostEqual(bird['confidence'], 0.9, places=5)
+        self.assertEqual(bird['box'], {'x1': 10.5, 'y1': 20.0, 'x2': 110.0, 'y2': 220.0})
+
+        self.assertEqual([item['name'] for item in self.detector.aversions], ['person'])
+
+
+class CPUDetectorBackendTestCase(unittest.TestCase):
+
+    def setUp(self):
+        FakeYOLO.exports = []
+        self.tmp = tempfile.TemporaryDirectory()
+        self.model_name = os.path.join(self.tmp.name, 'yolov10n.pt')
+        self.cache_dir = os.path.join(self.tmp.name, 'compiled_models')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def create_detector(self, **kwargs):
+        with patch.dict(sys.modules, {'ultralytics': types.SimpleNamespace(YOLO=FakeYOLO)}):
+            from app.detector import CPUDetector
+            return CPUDetector(model_name=self.model_name, cache_dir=self.cache_dir, **kwargs)
+
+    def test_torch_backend_loads_model_directly(self):
+        detector = self.create_detector()
+        self.assertEqual(detector.model.model_name, self.model_name)
+        self.assertEqual(FakeYOLO.exports, [])
+
+    def test_export_is_cached(self):
+        detector = self.create_detector(backend='openvino', int8=True, imgsz=320)
+        expected_path = os.path.join(self.cache_dir, 'yolov10n_320_int8_openvino_model')
+        self.assertEqual(detector.model.model_name, expected_path)
+        self.assertTrue(os.path.isdir(expected_path))
+        self.assertEqual(FakeYOLO.exports, [{'format': 'openvino', 'imgsz': 320, 'int8': True, 'dynamic': False}])
+
+        # second start skips the export
+        detector = self.create_detector(backend='openvino', int8=True, imgsz=320)
+        self.assertEqual(detector.model.model_name, expected_path)
+        self.assertEqual(len(FakeYOLO.exports), 1)
+
+    def test_cache_keyed_by_size_and_backend(self):
+        self.create_detector(backend='onnx', imgsz=640)
+        self.create_detector(backend='onnx', imgsz=320)
+        self.create_detector(backend='onnx', imgsz=320)
+
+        self.assertEqual(len(FakeYOLO.exports), 2)
+        self.assertTrue(os.path.exists(os.path.join(self.cache_dir, 'yolov10n_640.onnx')))
+        self.assertTrue(os.path.exists(os.path.join(self.cache_dir, 'yolov10n_320.onnx')))
+
+    def test_tiled_export_takes_a_batch(self):
+        detector = self.create_detector(backend='onnx', imgsz=320, tile_size=320)
+
+        self.assertEqual(FakeYOLO.exports, [{'format': 'onnx', 'imgsz': 320, 'int8': False, 'dynamic': True}])
+        self.assertEqual(detector.model.model_name, os.path.join(self.cache_dir, 'yolov10n_320_dynamic.onnx'))
+
+        detector.detect_objects(np.zeros((480, 640, 3), dtype=np.uint8))
+        [call] = detector.model.calls
+        self.assertGreater(call['images'], 1) # the whole frame and every tile, in one go
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            self.create_detector(backend='tensorflow')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+# tests/test_frame_store.py
+
+import unittest
+import threading
+from unittest.mock import patch
+
+import cv2
+import numpy as np
+
+from app.frame_store import FrameStore
+from app.streaming import TIERS
+from camera.fake_camera import FakeCamera
+
+
+class FrameStoreJpegTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.store = FrameStore()
+        self.frame = FakeCamera.fake_frame()
+
+    def test_encodes_once_for_every_client(self):
+        self.store.update(self.frame)
+
+        results = []
+        clients = [threading.Thread(target=lambda: results.append(self.store.get_latest_jpeg(0))) for _ in range(3)]
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+
+        self.assertEqual(self.store.jpeg_encodes['high'], 1)
+        self.assertEqual(len({id(jpeg) for jpeg, _ in results}), 1)
+        jpeg, timestamp = results[0]
+        self.assertEqual(timestamp, self.store.timestamp)
+        self.assertEqual(cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR).shape, self.frame.shape)
+        self.assertEqual(self.store.jpeg_bytes_served['high'], 3 * len(jpeg))
+
+    def test_new_frame_new_encode(self):
+        self.store.update(self.frame)
+        first, timestamp = self.store.get_latest_jpeg(0)
+        self.store.update(np.zeros_like(self.frame))
+        second, _ = self.store.get_latest_jpeg(timestamp)
+
+        self.assertEqual(self.store.jpeg_encodes['high'], 2)
+        self.assertNotEqual(first, second)
+
+    def test_no_clients_no_encoding(self):
+        with patch('app.streaming.cv2.imencode') as imencode:
+            for _ in range(5):
+                self.store.update(self.frame)
+
+        imencode.assert_not_called()
+        self.assertEqual(sum(self.store.jpeg_encodes.values()), 0)
+
+    def test_each_tier_encoded_once(self):
+        self.store.update(self.frame)
+        for _ in range(2):
+            low, _ = self.store.get_latest_jpeg(0, TIERS['low'])
+            high, _ = self.store.get_latest_jpeg(0, TIERS['high'])
+
+        self.assertEqual(self.store.jpeg_encodes, {'low': 1, 'high': 1})
+        self.assertLess(len(low), len(high))
+        self.assertEqual(cv2.imdecode(np.frombuffer(low, np.uint8), cv2.IMREAD_COLOR).shape[1], 320)
+
+    def test_older_frame_doesnt_replace_newer(self):
+        self.store.update(self.frame)
+        old_frame, old_timestamp = self.store.peek()
+        self.store.update(np.zeros_like(self.frame))
+        new_frame, new_timestamp = self.store.peek()
+
+        new = self.store.jpeg(new_frame, new_timestamp)
+        self.store.jpeg(old_frame, old_timestamp) # finishing late
+        self.assertIs(self.store.jpeg(new_frame, new_timestamp), new)
+        self.assertEqual(self.store.jpeg_encodes['high'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,286 @@
+# tests/test_hailo_inference.py
+
+import unittest
+import sys
+import threading
+import time
+import types
+import tracemalloc
+import numpy as np
+import cv2
+from unittest.mock import patch
+
+from camera.fake_camera import FakeCamera
+
+
+class FakeBuffer:
+    def __init__(self, buffer=None):
+        self.buffer = buffer
+
+    def set_buffer(self, buffer):
+        self.buffer = buffer
+
+    def get_buffer(self):
+        return self.buffer
+
+
+class FakeBindings:
+    def __init__(self, output_buffers):
+        self._output_names = list(output_buffers.keys())
+        self._input = FakeBuffer()
+        self._outputs = {name: FakeBuffer(buffer) for name, buffer in output_buffers.items()}
+
+    def input(self):
+        return self._input
+
+    def output(self, name=None):
+        return self._outputs[name or self._output_names[0]]
+
+
+class FakeJob:
+    def wait(self, timeout_ms):
+        pass
+
+
+class FakeConfiguredInferModel:
+    """
+    Stands in for the configured Hailo model. Jobs complete on their own thread
+    after delays[n] seconds, so later frames can finish before earlier ones.
+    """
+
+    def __init__(self, delays=None):
+        self.delays = delays or []
+        self.jobs_run = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def create_bindings(self, output_buffers):
+        self.bindings_created = getattr(self, 'bindings_created', 0) + 1
+        return FakeBindings(output_buffers)
+
+    def wait_for_async_ready(self, timeout_ms):
+        pass
+
+    def run_async(self, bindings_list, callback):
+        with self.lock:
+            delay = self.delays[self.jobs_run] if self.jobs_run < len(self.delays) else 0
+            frame_number = self.jobs_run
+            self.jobs_run += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+        def complete():
+            time.sleep(delay)
+            # one 'bird' (class 14) per frame, scored so we can tell frames apart
+            output = [np.zeros((0, 5), dtype=np.float32) for _ in range(80)]
+            output[14] = np.array([[0.1, 0.1, 0.5, 0.5, 0.5 + frame_number / 100]], dtype=np.float32)
+            bindings_list[0].output().set_buffer(output)
+            with self.lock:
+                self.in_flight -= 1
+            callback(types.SimpleNamespace(exception=None))
+
+        threading.Thread(target=complete, daemon=True).start()
+        return FakeJob()
+
+
+class FakeConfigureContext:
+    def __init__(self, model):
+        self.model = model
+        self.exited = False
+
+    def __enter__(self):
+        return self.model
+
+    def __exit__(self, *args):
+        self.exited = True
+
+
+class FakeInferModel:
+    def __init__(self, configured_model):
+        self.configured_model = configured_model
+        self.configure_calls = 0
+
+    def set_batch_size(self, size):
+        pass
+
+    def input(self):
+        return types.SimpleNamespace(set_format_type=lambda format_type: None)
+
+    def output(self, name=None):
+        return types.SimpleNamespace(shape=(1000,))
+
+    def configure(self):
+        self.configure_calls += 1
+        return FakeConfigureContext(self.configured_model)
+
+
+def fake_hailo_platform(infer_model):
+    """Build a stand-in hailo_platform module around the given infer model."""
+    output_info = types.SimpleNamespace(name='yolov8/nms', format=types.SimpleNamespace(type='FormatType.FLOAT32'))
+    hef = types.SimpleNamespace(
+        get_input_vstream_infos=lambda: [types.SimpleNamespace(shape=(640, 640, 3))],
+        get_output_vstream_infos=lambda: [output_info],
+    )
+    vdevice = types.SimpleNamespace(create_infer_model=lambda hef_path: infer_model)
+    VDevice = lambda params: vdevice
+    VDevice.create_params = lambda: types.SimpleNamespace()
+
+    return types.SimpleNamespace(
+        HEF=lambda hef_path: hef,
+        VDevice=VDevice,
+        FormatType=types.SimpleNamespace(UINT8='UINT8'),
+        HailoSchedulingAlgorithm=types.SimpleNamespace(ROUND_ROBIN='ROUND_ROBIN'),
+    )
+
+
+class HailoInferenceTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.configured_model = FakeConfiguredInferModel(delays=[0.2, 0.1, 0.0, 0.05, 0.0, 0.0])
+        self.infer_model = FakeInferModel(self.configured_model)
+        with patch.dict(sys.modules, {'hailo_platform': fake_hailo_platform(self.infer_model)}):
+            from app.hailo_inference import HailoInference
+            self.inference = HailoInference('fake.hef', threshold=0.5, max_in_flight=3)
+        self.frame = FakeCamera.fake_frame()
+
+    def tearDown(self):
+        self.inference.release()
+
+    def test_configures_once(self):
+        for _ in range(3):
+            self.inference.infer(self.frame)
+        self.assertEqual(self.infer_model.configure_calls, 1)
+        self.assertEqual(self.configured_model.jobs_run, 3)
+
+    def test_results_delivered_in_frame_order(self):
+        delivered = []
+        futures = [
+            self.inference.infer_async(self.frame, callback=lambda f: delivered.append(f.result()[1][0]['confidence']))
+            for _ in range(6)
+        ]
+        for future in futures:
+            future.result(timeout=5)
+
+        expected = [np.float32(0.5 + n / 100) for n in range(6)]
+        self.assertEqual(delivered, expected)
+
+    def test_in_flight_jobs_are_bounded(self):
+        futures = [self.inference.infer_async(self.frame) for _ in range(6)]
+        for future in futures:
+            future.result(timeout=5)
+
+        self.assertGreater(self.configured_model.max_in_flight, 1)
+        self.assertLessEqual(self.configured_model.max_in_flight, 3)
+
+    def test_release_exits_configured_model(self):
+        context = self.inference._configured_context
+        self.inference.release()
+        self.assertTrue(context.exited)
+        self.assertIsNone(self.inference.configured_infer_model)
+
+    def test_bindings_are_pooled(self):
+        input_buffers = set()
+        for _ in range(6):
+            future = self.inference.infer_async(self.frame)
+            future.result(timeout=5)
+        pooled = [self.inference._binding_pool.get() for _ in range(3)]
+        for bindings in pooled:
+            input_buffers.add(id(bindings.input().get_buffer()))
+            self.inference._binding_pool.put(bindings)
+
+        self.assertEqual(self.configured_model.bindings_created, 3)
+        self.assertEqual(len(input_buffers), 3)
+
+    def test_preprocess_writes_into_input_buffer(self):
+        bindings = self.inference._binding_pool.get()
+        input_buffer = bindings.input().get_buffer()
+        self.inference._preprocess_frame(self.frame, input_buffer)
+
+        self.assertIs(bindings.input().get_buffer(), input_buffer)
+        self.assertEqual(input_buffer.shape, (640, 640, 3))
+        self.assertTrue(np.array_equal(input_buffer, cv2.resize(self.frame, (640, 640))))
+        self.inference._binding_pool.put(bindings)
+
+    def test_steady_state_allocation_is_flat(self):
+        for _ in range(5):
+            self.inference.infer(self.frame)
+
+        tracemalloc.start()
+        try:
+            # Loading a frame into pooled bindings shouldn't allocate a frame's worth of memory
+            tracemalloc.reset_peak()
+            baseline, _ = tracemalloc.get_traced_memory()
+            for _ in range(20):
+                bindings = self.inference._binding_pool.get()
+                self.inference._preprocess_frame(self.frame, bindings.input().get_buffer())
+                self.inference._binding_pool.put(bindings)
+            _, peak = tracemalloc.get_traced_memory()
+            self.assertLess(peak - baseline, 64 * 1024)
+
+            # And memory doesn't creep up with the number of frames inferred
+            for _ in range(10):
+                self.inference.infer(self.frame)
+            after_ten, _ = tracemalloc.get_traced_memory()
+            for _ in range(30):
+                self.inference.infer(self.frame)
+            after_forty, _ = tracemalloc.get_traced_memory()
+            self.assertLess(after_forty - after_ten, 64 * 1024)
+        finally:
+            tracemalloc.stop()
+
+
+class HailoDecodeTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.infer_model = FakeInferModel(FakeConfiguredInferModel())
+        with patch.dict(sys.modules, {'hailo_platform': fake_hailo_platform(self.infer_model)}):
+            from app.hailo_inference import HailoInference, DETECTION_DTYPE
+            self.inference = HailoInference('fake.hef', threshold=0.5, classes=['bird', 'person'])
+        self.detection_dtype = DETECTION_DTYPE
+        self.frame = np.zeros((480, 640, 3), dtype=np.uint8)
+
+        # a flock of birds (14), a person (0) a dog (16) and some low scores
+        rng = np.random.default_rng(0)
+        self.output = [np.zeros((0, 5), dtype=np.float32) for _ in range(80)]
+        for class_id, count in [(0, 2), (14, 40), (16, 3)]:
+            boxes = np.sort(rng.random((count, 2, 2)), axis=1).reshape(count, 4)[:, [0, 2, 1, 3]]
+            scores = rng.random((count, 1))
+            self.output[class_id] = np.hstack([boxes, scores]).astype(np.float32)
+
+    def tearDown(self):
+        self.inference.release()
+
+    def test_decode_matches_per_detection_loop(self):
+        expected = []
+        for class_id, detections in enumerate(self.output):
+            if self.inference.coco_labels[class_id] not in ['bird', 'person']:
+                continue
+            for y1, x1, y2, x2, score in detections:
+                if score >= 0.5:
+                    expected.append((class_id, int(x1 * 640), int(y1 * 480), int(x2 * 640), int(y2 * 480), score))
+
+        detections = self.inference._extract_detections(self.frame, self.output)
+
+        self.assertEqual(len(detections), len(expected))
+        for detection, (class_id, x1, y1, x2, y2, score) in zip(detections, expected):
+            self.assertEqual(detection['class'], class_id)
+            self.assertEqual(detection['name'], self.inference.coco_labels[class_id])
+            self.assertEqual(detection['box'], {'x1': x1, 'y1': y1, 'x2': x2, 'y2': y2})
+            self.assertAlmostEqual(detection['confidence'], score, places=6)
+
+    def test_uninteresting_classes_are_masked(self):
+        detections = self.inference._decode_detections(self.frame, self.output)
+        self.assertEqual(detections.dtype, self.detection_dtype)
+        self.assertTrue(np.isin(detections['class'], [0, 14]).all())
+        self.assertTrue((detections['confidence'] >= 0.5).all())
+
+    def test_decode_nothing_detected(self):
+        empty = [np.zeros((0, 5), dtype=np.float32) for _ in range(80)]
+        detections = self.inference._decode_detections(self.frame, empty)
+        self.assertEqual(len(detections), 0)
+        self.assertEqual(self.inference._extract_detections(self.frame, empty), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
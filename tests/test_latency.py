@@ -0,0 +1,94 @@
+# tests/test_latency.py
+
+import unittest
+import time
+import numpy as np
+from unittest.mock import MagicMock
+
+from app.latency import FrameTrace, LatencyMonitor
+from app.frame_processor import FrameProcessor
+from app.detector import BaseDetector
+from app.main import App
+from camera.fake_camera import FakeCamera
+from hardware.fake_hardware import FakeHardwareController
+
+
+class LatencyMonitorTestCase(unittest.TestCase):
+
+    def test_percentiles(self):
+        monitor = LatencyMonitor(window=100)
+        monitor.record([('inference', ms / 1000) for ms in range(1, 201)])
+
+        summary = monitor.summary()['inference']
+        self.assertEqual(summary['count'], 100) # only the last 100
+        self.assertAlmostEqual(summary['p50_ms'], 150.5, places=1)
+        self.assertAlmostEqual(summary['p99_ms'], 199.01, places=1)
+        self.assertEqual(summary['max_ms'], 200)
+
+    def test_trace_measures_back_to_back(self):
+        monitor = LatencyMonitor()
+        trace = monitor.trace(capture_time=time.monotonic() - 0.05)
+        time.sleep(0.01)
+        trace.mark('inference')
+        trace.finish()
+
+        summary = monitor.summary()
+        self.assertEqual(list(summary), ['capture', 'inference', 'total'])
+        self.assertGreaterEqual(summary['capture']['p50_ms'], 50)
+        self.assertGreaterEqual(summary['inference']['p50_ms'], 10)
+        self.assertGreaterEqual(summary['total']['p50_ms'], 60)
+
+    def test_untraced_frames_record_nothing(self):
+        trace = FrameTrace()
+        trace.mark('inference')
+        trace.finish()
+        self.assertFalse(trace.recording)
+
+
+class TracedFrameTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.detector = MagicMock(spec=BaseDetector)
+        self.detector.targets = [{'name': 'bird', 'class': 14, 'confidence': 0.9, 'box': {'x1': 300, 'y1': 200, 'x2': 340, 'y2': 260}}]
+        self.detector.aversions = []
+        self.tracker = MagicMock()
+        self.tracker.target = self.detector.targets[0]
+        self.tracker.dx = self.tracker.dy = 0
+        self.tracker.fire = True
+        self.tracker.attack_angle.return_value = 0
+        self.frame_processor = FrameProcessor(self.detector, self.tracker, FakeHardwareController())
+        self.frame = np.random.default_rng(0).integers(0, 256, (480, 640, 3), dtype=np.uint8)
+
+    def test_every_stage_to_the_relay(self):
+        monitor = LatencyMonitor()
+        self.frame_processor.process_frame(self.frame, monitor.trace(capture_time=time.monotonic()))
+
+        self.assertEqual(
+            list(monitor.summary()),
+            ['capture', 'preprocess', 'inference', 'tracking', 'servo', 'relay', 'total']
+        )
+
+    def test_relay_only_when_it_opens(self):
+        monitor = LatencyMonitor()
+        for _ in range(3):
+            self.frame_processor.process_frame(self.frame, monitor.trace())
+
+        summary = monitor.summary()
+        self.assertEqual(summary['relay']['count'], 1)
+        self.assertEqual(summary['total']['count'], 3)
+
+
+class LatencyEndpointTestCase(unittest.TestCase):
+
+    def test_latency_json(self):
+        app = App(FakeCamera(), FakeHardwareController(), MagicMock(), MagicMock())
+        app.latency.record([('inference', 0.02)])
+
+        response = app.app.test_client().get('/latency')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['inference']['p50_ms'], 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
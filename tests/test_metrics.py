@@ -0,0 +1,96 @@
+# tests/test_metrics.py
+
+import unittest
+from unittest.mock import MagicMock
+
+from app.metrics import Histogram, MetricsWriter
+from app.main import App
+from app.frame_processor import FrameProcessor
+from app.target_tracker import TargetTracker
+from app.temperature_monitor import TemperatureMonitor
+from camera.fake_camera import FakeCamera
+from hardware.fake_hardware import FakeHardwareController
+
+
+class HistogramTestCase(unittest.TestCase):
+
+    def test_cumulative_buckets(self):
+        histogram = Histogram(buckets=[0.1, 1])
+        for value in [0.05, 0.1, 0.5, 3]:
+            histogram.observe(value)
+
+        self.assertEqual(histogram.cumulative_counts(), [(0.1, 2), (1, 3), (float('inf'), 4)])
+        self.assertEqual(histogram.count, 4)
+        self.assertAlmostEqual(histogram.sum, 3.65)
+
+
+class MetricsWriterTestCase(unittest.TestCase):
+
+    def test_exposition_format(self):
+        metrics = MetricsWriter()
+        metrics.counter('frames_total', 'Frames.', 3)
+        metrics.gauge('temperature_celsius', 'Temperature.', {(('sensor', 'cpu'),): 61.5})
+        histogram = Histogram(buckets=[0.1])
+        histogram.observe(0.05)
+        metrics.histogram('latency_seconds', 'Latency.', {(('stage', 'inference'),): histogram})
+
+        self.assertEqual(metrics.text().splitlines(), [
+            '# HELP watercannon_frames_total Frames.',
+            '# TYPE watercannon_frames_total counter',
+            'watercannon_frames_total 3',
+            '# HELP watercannon_temperature_celsius Temperature.',
+            '# TYPE watercannon_temperature_celsius gauge',
+            'watercannon_temperature_celsius{sensor="cpu"} 61.5',
+            '# HELP watercannon_latency_seconds Latency.',
+            '# TYPE watercannon_latency_seconds histogram',
+            'watercannon_latency_seconds_bucket{stage="inference",le="0.1"} 1',
+            'watercannon_latency_seconds_bucket{stage="inference",le="+Inf"} 1',
+            'watercannon_latency_seconds_sum{stage="inference"} 0.05',
+            'watercannon_latency_seconds_count{stage="inference"} 1',
+        ])
+
+    def test_unknown_values_left_out(self):
+        metrics = MetricsWriter()
+        metrics.gauge('temperature_celsius', 'Temperature.', None)
+        self.assertEqual(metrics.text().splitlines(), [
+            '# HELP watercannon_temperature_celsius Temperature.',
+            '# TYPE watercannon_temperature_celsius gauge',
+        ])
+
+
+class MetricsEndpointTestCase(unittest.TestCase):
+
+    def test_metrics(self):
+        tracker = TargetTracker()
+        tracker.fire_events = 2
+        tracker.fire_seconds = 1.5
+        temp_monitor = TemperatureMonitor()
+        temp_monitor.average_temperature = 71.25
+        frame_processor = FrameProcessor(MagicMock(), tracker, FakeHardwareController())
+
+        app = App(FakeCamera(), FakeHardwareController(), frame_processor, temp_monitor)
+        app.frames_captured = 10
+        app.latency.record([('inference', 0.02)])
+
+        response = app.app.test_client().get('/metrics')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain; version=0.0.4'))
+        lines = response.get_data(as_text=True).splitlines()
+        for expected in [
+            'watercannon_frames_captured_total 10',
+            'watercannon_stage_latency_seconds_count{stage="inference"} 1',
+            'watercannon_temperature_celsius 71.25',
+            'watercannon_throttle_seconds 0.0',
+            'watercannon_overheated 0',
+            'watercannon_fire_events_total 2',
+            'watercannon_fire_seconds_total 1.5',
+            'watercannon_stream_clients 0',
+            'watercannon_telemetry_clients 0',
+            'watercannon_video_bytes_written_total 0',
+        ]:
+            self.assertIn(expected, lines)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+# tests/test_motion_gate.py
+
+import unittest
+import numpy as np
+import cv2
+from unittest.mock import MagicMock
+
+from app.motion_gate import MotionGate
+from app.frame_processor import FrameProcessor
+from app.detector import BaseDetector
+from app.target_tracker import TargetTracker
+from hardware.fake_hardware import FakeHardwareController
+from camera.fake_camera import FakeCamera
+
+
+class MotionGateTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.gate = MotionGate()
+        self.scene = FakeCamera.fake_frame()
+
+    def view(self, x=0, y=0):
+        """What the camera sees panned x, y pixels into the scene."""
+        return np.ascontiguousarray(self.scene[y:y + 400, x:x + 560])
+
+    def test_static_frames(self):
+        for _ in range(5):
+            self.assertFalse(self.gate.update(self.view()))
+
+    def test_something_moves(self):
+        self.gate.update(self.view())
+        frame = self.view()
+        cv2.rectangle(frame, (300, 200), (340, 240), (255, 255, 255), -1)
+
+        self.assertTrue(self.gate.update(frame))
+        self.assertEqual(len(self.gate.regions), 1)
+        x1, y1, x2, y2 = self.gate.regions[0]
+        self.assertTrue(x1 <= 300 and y1 <= 200 and x2 >= 340 and y2 >= 240)
+
+    def test_camera_pan_is_not_motion(self):
+        self.gate.update(self.view(x=0))
+        for x, y in [(24, 8), (48, 8), (64, 20), (40, 30)]:
+            self.assertFalse(self.gate.update(self.view(x=x, y=y), camera_moved=True))
+
+    def test_camera_pan_without_warning_is_motion(self):
+        self.gate.update(self.view(x=0))
+        self.assertTrue(self.gate.update(self.view(x=24, y=8)))
+
+
+class MotionGatedProcessingTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.detector = MagicMock(spec=BaseDetector)
+        self.detector.targets = []
+        self.detector.aversions = []
+        self.hardware_controller = MagicMock(spec=FakeHardwareController)
+        self.hardware_controller.camera_moving.return_value = False
+        self.frame_processor = FrameProcessor(
+            detector=self.detector,
+            target_tracker=TargetTracker(),
+            hardware_controller=self.hardware_controller,
+            motion_gate=MotionGate(),
+            keep_alive=30
+        )
+        self.frame = FakeCamera.fake_frame()
+
+    def test_static_frames_skip_detection(self):
+        for _ in range(5):
+            self.frame_processor.process_frame(self.frame.copy())
+
+        # the first frame is the keep alive
+        self.assertEqual(self.detector.detect_objects.call_count, 1)
+        self.assertEqual(self.hardware_controller.patrol.call_count, 5)
+
+    def test_motion_triggers_detection(self):
+        self.frame_processor.process_frame(self.frame.copy())
+        self.frame_processor.process_frame(self.frame.copy())
+        moved = self.frame.copy()
+        cv2.rectangle(moved, (300, 200), (360, 260), (255, 255, 255), -1)
+        self.frame_processor.process_frame(moved)
+
+        self.assertEqual(self.detector.detect_objects.call_count, 2)
+
+    def test_keep_alive(self):
+        self.frame_processor.process_frame(self.frame.copy())
+        self.frame_processor._last_detection -= 31
+        self.frame_processor.process_frame(self.frame.copy())
+
+        self.assertEqual(self.detector.detect_objects.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
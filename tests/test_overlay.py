@@ -0,0 +1,70 @@
+# tests/test_overlay.py
+
+import unittest
+import numpy as np
+from unittest.mock import MagicMock, patch
+
+from app.overlay import OverlayCompositor
+from app.frame_processor import FrameProcessor
+from app.detector import BaseDetector
+from app.target_tracker import TargetTracker
+from hardware.fake_hardware import FakeHardwareController
+from camera.fake_camera import FakeCamera
+
+
+class OverlayCompositorTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.compositor = OverlayCompositor()
+        self.frame = FakeCamera.fake_frame()
+        self.detections = [{'name': 'bird', 'class': 14, 'confidence': 0.9, 'box': {'x1': 100, 'y1': 100, 'x2': 200, 'y2': 220}}]
+
+    def test_compose_leaves_frame_untouched(self):
+        original = self.frame.copy()
+        annotated = self.compositor.compose(self.frame, self.detections)
+        self.assertTrue(np.array_equal(self.frame, original))
+        self.assertFalse(np.array_equal(annotated, original))
+
+    def test_compose_draws_tracker(self):
+        tracker = TargetTracker()
+        with patch.object(tracker, '_log'):
+            tracker.process_detections(self.detections, self.frame.shape[1], self.frame.shape[0])
+
+        without_tracker = self.compositor.compose(self.frame, self.detections)
+        with_tracker = self.compositor.compose(self.frame, self.detections, tracker)
+        self.assertFalse(np.array_equal(without_tracker, with_tracker))
+
+
+class LazyAnnotationTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.detector = MagicMock(spec=BaseDetector)
+        self.detector.targets = []
+        self.detector.aversions = []
+        self.compositor = MagicMock(spec=OverlayCompositor)
+        self.frame_processor = FrameProcessor(
+            detector=self.detector,
+            target_tracker=TargetTracker(),
+            hardware_controller=FakeHardwareController(),
+            compositor=self.compositor
+        )
+
+    def test_frames_not_annotated_unless_asked(self):
+        frame = FakeCamera.fake_frame()
+        self.frame_processor.process_frame(frame)
+        self.compositor.compose.assert_not_called()
+        self.assertIs(self.frame_processor.frame, frame)
+
+    def test_frames_annotated_once(self):
+        self.frame_processor.process_frame(FakeCamera.fake_frame())
+        self.frame_processor.annotated_frame
+        self.frame_processor.annotated_frame
+        self.compositor.compose.assert_called_once()
+
+        self.frame_processor.process_frame(FakeCamera.fake_frame())
+        self.frame_processor.annotated_frame
+        self.assertEqual(self.compositor.compose.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
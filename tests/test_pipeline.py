@@ -0,0 +1,107 @@
+# tests/test_pipeline.py
+
+import unittest
+import threading
+import time
+from unittest.mock import MagicMock
+
+from app.pipeline import LatestQueue, Pipeline
+from app.main import App
+from app.frame_processor import Observation
+from camera.fake_camera import FakeCamera
+from hardware.fake_hardware import FakeHardwareController
+
+
+class LatestQueueTestCase(unittest.TestCase):
+
+    def test_drops_oldest(self):
+        queue = LatestQueue(maxsize=2)
+        for item in range(5):
+            queue.put(item)
+
+        self.assertEqual(queue.dropped, 3)
+        self.assertEqual(queue.get(), 3)
+        self.assertEqual(queue.get(), 4)
+
+    def test_get_times_out(self):
+        self.assertIsNone(LatestQueue().get(timeout=0.01))
+
+    def test_close_wakes_reader(self):
+        queue = LatestQueue()
+        results = []
+        reader = threading.Thread(target=lambda: results.append(queue.get()))
+        reader.start()
+
+        queue.close()
+        reader.join(timeout=1)
+
+        self.assertFalse(reader.is_alive())
+        self.assertEqual(results, [None])
+
+
+class PipelineTestCase(unittest.TestCase):
+
+    def test_slow_stage_gets_newest_frame(self):
+        produced = threading.Event()
+        seen = []
+
+        def source():
+            for frame in range(20):
+                yield frame
+            produced.set()
+
+        def slow(frame):
+            produced.wait(timeout=1) # everything is captured while we're busy with the first frame
+            seen.append(frame)
+            return frame
+
+        stopped = threading.Event()
+        pipeline = Pipeline(source, [('detect', slow), ('act', lambda frame: None)], on_stop=stopped.set)
+        pipeline.start()
+
+        self.assertTrue(stopped.wait(timeout=2))
+        pipeline.join(timeout=1)
+
+        self.assertEqual(seen[-1], 19)
+        self.assertLess(len(seen), 20)
+        self.assertEqual(pipeline.dropped['detect'], 20 - len(seen))
+        self.assertFalse(pipeline.is_running)
+
+    def test_stop(self):
+        def endless():
+            while True:
+                yield 1
+                time.sleep(0.001)
+
+        stopped = threading.Event()
+        pipeline = Pipeline(endless, [('detect', lambda frame: frame)], on_stop=stopped.set)
+        pipeline.start()
+
+        pipeline.stop()
+        pipeline.join(timeout=1)
+
+        self.assertTrue(stopped.is_set())
+        self.assertFalse(pipeline.is_running)
+
+
+class PipelinedAppTestCase(unittest.TestCase):
+
+    def test_frames_flow_through_stages(self):
+        frames = [FakeCamera.fake_frame() for _ in range(3)]
+        frame_processor = MagicMock()
+        frame_processor.observe.side_effect = lambda frame, trace: Observation(frame, True, True, [], [], trace)
+        frame_processor.fire.return_value = False
+
+        app = App(FakeCamera(frames=frames), FakeHardwareController(), frame_processor, MagicMock(), pipelined=True)
+        app.start_processing()
+        app.pipeline.join(timeout=2)
+
+        self.assertFalse(app.is_running)
+        self.assertFalse(app.frame_store.is_running)
+        acted_on = [call.args[0].frame for call in frame_processor.act.call_args_list]
+        self.assertIs(acted_on[-1], frames[-1])
+        self.assertEqual(frame_processor.observe.call_count + app.pipeline.dropped['detect'], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
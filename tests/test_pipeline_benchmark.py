@@ -0,0 +1,46 @@
+# tests/test_pipeline_benchmark.py
+
+import unittest
+
+from benchmarks.pipeline_benchmark import NullDetector, build_camera, run, compare
+
+
+class PipelineBenchmarkTestCase(unittest.TestCase):
+
+    def test_report(self):
+        report = run(NullDetector(), build_camera(None, 20, realtime=False))
+
+        self.assertEqual(report['frames'], 20)
+        self.assertGreater(report['fps'], 0)
+        self.assertEqual(report['latency_ms']['total']['count'], 20)
+        self.assertGreater(report['peak_rss_mb'], 0)
+        self.assertEqual(report['fire_events'], 0)
+        self.assertIsNone(report['allocated_kb_per_frame'])
+
+    def test_allocations_per_frame(self):
+        camera = build_camera(None, 20, realtime=False)
+        frame_bytes = camera.frames[0].nbytes
+        report = run(NullDetector(), camera, trace_allocations=True)
+        self.assertGreater(report['allocated_kb_per_frame'], 0)
+
+        # a frame sized copy every frame should show
+        copying = build_camera(None, 20, realtime=False)
+        frames = copying.frame_generator
+        copying.frame_generator = lambda: (frame.copy() for frame in frames())
+        copied = run(NullDetector(), copying, trace_allocations=True)
+
+        self.assertGreater(copied['allocated_kb_per_frame'] - report['allocated_kb_per_frame'], 0.9 * frame_bytes / 2**10)
+        self.assertTrue(compare(copied, report))
+
+    def test_compare(self):
+        baseline = {'fps': 10, 'latency_ms': {'total': {'p95_ms': 100}}, 'peak_rss_mb': 300}
+        report = {'fps': 8, 'latency_ms': {'total': {'p95_ms': 105}}, 'peak_rss_mb': 200}
+
+        regressions = compare(report, baseline, tolerance=0.1)
+
+        self.assertEqual(regressions, ['fps: 10 -> 8 (-20%)'])
+        self.assertEqual(compare(report, baseline, tolerance=0.25), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
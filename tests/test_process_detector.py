@@ -0,0 +1,130 @@
+# tests/test_process_detector.py
+
+import unittest
+import os
+import threading
+import numpy as np
+from functools import partial
+
+from app.process_detector import ProcessDetector
+from tests.test_tiled_detector import BlobDetector
+
+
+class CrashingDetector(BlobDetector):
+    """Dies, like a worker running out of memory, when it sees a frame starting with 7."""
+
+    def _detect_batch(self, images):
+        if images[0][0, 0, 0] == 7:
+            os._exit(1)
+        return super()._detect_batch(images)
+
+
+class BrokenDetector(BlobDetector):
+    def __init__(self, **kwargs):
+        raise RuntimeError("no model")
+
+
+class ExitingDetector(BlobDetector):
+    """Dies before it's ready, like a worker that can't load its model."""
+
+    def __init__(self, **kwargs):
+        os._exit(1)
+
+
+class ProcessDetectorTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.frame = np.zeros((480, 640, 3), dtype=np.uint8)
+        self.frame[100:160, 200:260] = 255
+        self.frame[300:360, 400:460] = 255
+        self.detector = None
+
+    def tearDown(self):
+        if self.detector is not None:
+            self.detector.release()
+
+    def boxes(self, detections):
+        return sorted((d['box']['x1'], d['box']['y1'], d['box']['x2'], d['box']['y2']) for d in detections)
+
+    def test_detects_in_worker(self):
+        self.detector = ProcessDetector(partial(BlobDetector, target_classes=['bird']))
+
+        frame = self.detector.detect_objects(self.frame)
+
+        self.assertIs(frame, self.frame)
+        self.assertIs(self.detector.frame, self.frame)
+        self.assertEqual(self.boxes(self.detector.targets), [(200, 100, 260, 160), (400, 300, 460, 360)])
+        self.assertEqual(self.detector.aversions, [])
+        self.assertNotEqual(os.getpid(), self.detector._process.pid)
+
+    def test_results_in_order(self):
+        self.detector = ProcessDetector(BlobDetector, slots=3)
+        frames = []
+        for x in range(0, 300, 50):
+            frame = np.zeros((240, 320, 3), dtype=np.uint8)
+            frame[10:40, x:x + 20] = 255
+            frames.append(frame)
+
+        delivered = []
+        futures = [self.detector.detect_objects_async(frame, callback=delivered.append) for frame in frames]
+        results = [future.result(timeout=60) for future in futures]
+
+        self.assertEqual([id(frame) for frame in delivered], [id(frame) for frame in frames])
+        self.assertEqual([targets[0]['box']['x1'] for _, targets, _ in results], list(range(0, 300, 50)))
+
+    def test_restarts_dead_worker(self):
+        self.detector = ProcessDetector(CrashingDetector)
+        self.detector.detect_objects(self.frame)
+        first_pid = self.detector._process.pid
+
+        poison = self.frame.copy()
+        poison[0, 0] = 7
+        self.detector.detect_objects(poison)
+        self.assertEqual(self.detector.targets, [])
+        self.assertEqual(self.detector.restarts, 1)
+
+        self.detector.detect_objects(self.frame)
+        self.assertNotEqual(self.detector._process.pid, first_pid)
+        self.assertEqual(len(self.detector.targets), 2)
+
+    def test_worker_that_never_starts(self):
+        self.detector = ProcessDetector(BrokenDetector)
+        with self.assertRaises(RuntimeError):
+            self.detector.detect_objects(self.frame)
+        self.assertFalse(self.detector.alive)
+
+    def test_waiting_for_a_slot_when_worker_never_starts(self):
+        self.detector = ProcessDetector(ExitingDetector, slots=2)
+        errors = []
+
+        def detect():
+            for _ in range(5): # more than there are slots
+                try:
+                    self.detector.detect_objects_async(self.frame)
+                except RuntimeError as e:
+                    errors.append(e)
+                    return
+
+        thread = threading.Thread(target=detect, daemon=True)
+        thread.start()
+        thread.join(30)
+
+        self.assertFalse(thread.is_alive(), "still waiting for a slot")
+        self.assertEqual(len(errors), 1)
+        with self.assertRaises(RuntimeError):
+            self.detector.detect_objects(self.frame)
+
+    def test_release_stops_worker(self):
+        self.detector = ProcessDetector(BlobDetector)
+        self.detector.detect_objects(self.frame)
+        process = self.detector._process
+
+        self.detector.release()
+
+        self.assertFalse(process.is_alive())
+        self.assertEqual(process.exitcode, 0)
+        self.assertIsNone(self.detector._shm)
+
+
+if __name__ == '__main__':
+    unittest.main()
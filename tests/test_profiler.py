@@ -0,0 +1,62 @@
+# tests/test_profiler.py
+
+import unittest
+import threading
+import time
+from unittest.mock import MagicMock
+
+from app.profiler import StackSampler
+from app.main import App
+from camera.fake_camera import FakeCamera
+from hardware.fake_hardware import FakeHardwareController
+
+
+def burn_cpu(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+class StackSamplerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.stop = threading.Event()
+        self.worker = threading.Thread(target=burn_cpu, args=(self.stop,), name='burner', daemon=True)
+        self.worker.start()
+
+    def tearDown(self):
+        self.stop.set()
+        self.worker.join()
+
+    def test_collapsed_stacks(self):
+        stacks = StackSampler(interval=0.001).profile(0.2)
+
+        lines = stacks.splitlines()
+        burner = [line for line in lines if line.startswith('burner;')]
+        self.assertTrue(burner)
+        stack, count = burner[0].rsplit(' ', 1)
+        self.assertIn('burn_cpu (test_profiler.py:', stack)
+        self.assertGreater(int(count), 0)
+        self.assertFalse(any('_sample (profiler.py' in line for line in lines)) # not itself
+
+    def test_one_profile_at_a_time(self):
+        sampler = StackSampler()
+        results = []
+        first = threading.Thread(target=lambda: results.append(sampler.profile(0.2)))
+        first.start()
+        time.sleep(0.05)
+
+        self.assertIsNone(sampler.profile(0.1))
+        first.join()
+        self.assertIsNotNone(results[0])
+
+    def test_endpoint(self):
+        app = App(FakeCamera(), FakeHardwareController(), MagicMock(), MagicMock())
+
+        response = app.app.test_client().get('/admin/profile?seconds=0.1')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('burner;', response.get_data(as_text=True))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+# tests/test_replay_camera.py
+
+import unittest
+import os
+import shutil
+import tempfile
+import threading
+import time
+import numpy as np
+import cv2
+
+from camera import get_camera
+from camera.replay_camera import ReplayCamera
+
+
+class ReplayCameraTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.frames = [np.full((48, 64, 3), shade, dtype=np.uint8) for shade in (0, 60, 120, 180, 240)]
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write_images(self):
+        for index, frame in enumerate(self.frames):
+            cv2.imwrite(os.path.join(self.directory, f'frame_{index:03}.png'), frame)
+        open(os.path.join(self.directory, 'notes.txt'), 'w').close()
+        return self.directory
+
+    def write_video(self, fps=20):
+        path = os.path.join(self.directory, 'deck.mp4')
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (64, 48))
+        for frame in self.frames:
+            writer.write(frame)
+        writer.release()
+        return path
+
+    def test_images_in_order(self):
+        camera = ReplayCamera(self.write_images(), realtime=False)
+        frames = list(camera.frame_generator())
+        camera.release()
+
+        self.assertEqual(len(frames), 5)
+        for frame, expected in zip(frames, self.frames):
+            self.assertTrue(np.array_equal(frame, expected))
+
+    def test_video_fast(self):
+        camera = ReplayCamera(self.write_video(fps=2), realtime=False)
+
+        start = time.monotonic()
+        frames = list(camera.frame_generator())
+
+        self.assertLess(time.monotonic() - start, 1) # recorded over 2 seconds
+        self.assertEqual(len(frames), 5)
+        self.assertEqual([int(round(frame.mean() / 60)) for frame in frames], [0, 1, 2, 3, 4])
+
+    def test_video_realtime(self):
+        camera = ReplayCamera(self.write_video(fps=20))
+
+        start = time.monotonic()
+        for frame in camera.frame_generator():
+            self.assertLessEqual(camera.sensor_timestamp, time.monotonic())
+        elapsed = time.monotonic() - start
+
+        self.assertGreaterEqual(elapsed, 0.19) # 5 frames at 20fps, the first straight away
+        self.assertLess(elapsed, 1)
+
+    def test_loop(self):
+        camera = ReplayCamera(self.write_images(), realtime=False, loop=True, read_ahead=2)
+        frames = camera.frame_generator()
+        replayed = [next(frames) for _ in range(12)]
+        camera.release()
+
+        self.assertTrue(np.array_equal(replayed[5], self.frames[0]))
+        self.assertFalse(camera._reader.is_alive())
+
+    def test_release_wakes_a_waiting_consumer(self):
+        camera = ReplayCamera(self.write_images(), realtime=False)
+
+        def slow_decode():
+            yield self.frames[0], 0
+            camera._stop_event.wait(5) # the next frame's taking a while
+
+        camera._decode = slow_decode
+        replayed = []
+        consumer = threading.Thread(target=lambda: replayed.extend(camera.frame_generator()), daemon=True)
+        consumer.start()
+        time.sleep(0.2)
+
+        camera.release()
+        consumer.join(2)
+
+        self.assertFalse(consumer.is_alive())
+        self.assertEqual(len(replayed), 1)
+
+    def test_missing_source(self):
+        with self.assertRaises(IOError):
+            ReplayCamera(os.path.join(self.directory, 'nothing.mp4'))
+
+    def test_get_camera(self):
+        camera = get_camera(replay=self.write_images(), realtime=False)
+        self.assertIsInstance(camera, ReplayCamera)
+        self.assertFalse(camera.realtime)
+
+
+if __name__ == '__main__':
+    unittest.main()
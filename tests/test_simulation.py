@@ -0,0 +1,81 @@
+# tests/test_simulation.py
+
+import unittest
+
+from app.clock import VirtualClock
+from camera.sim_camera import SimCamera, SimBird
+from hardware.sim_hardware import SimHardwareController
+from benchmarks.simulate import simulate
+
+
+class SimHardwareTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = VirtualClock(start=0)
+        self.controller = SimHardwareController(slew_rate=100, latency=0.1, clock=self.clock)
+        self.start = self.controller.position()
+
+    def test_latency_then_slew(self):
+        self.controller._set_pan_angle(self.start[0] + 50)
+        self.controller._update_servos()
+
+        self.clock.advance(0.1)
+        self.assertEqual(self.controller.position(), self.start) # only just arrived
+        self.clock.advance(0.2)
+        self.assertAlmostEqual(self.controller.position()[0], self.start[0] + 20)
+        self.clock.advance(1)
+        self.assertAlmostEqual(self.controller.position()[0], self.start[0] + 50)
+        self.assertEqual(self.controller.position()[1], self.start[1])
+
+
+class SimCameraTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = VirtualClock(start=0)
+        self.controller = SimHardwareController(slew_rate=1000, latency=0, clock=self.clock)
+        self.bird = SimBird(pan=90, tilt=80)
+        self.camera = SimCamera(self.controller, [self.bird], clock=self.clock)
+
+    def point_at(self, pan, tilt):
+        self.controller._set_pan_angle(pan)
+        self.controller._set_tilt_angle(tilt)
+        self.controller._update_servos()
+        self.clock.advance(1)
+
+    def test_bird_straight_ahead(self):
+        self.point_at(90, 80)
+        frame = self.camera.render()
+
+        self.assertEqual(frame.shape, (480, 640, 3))
+        [detection] = self.camera.detections()
+        box = detection['box']
+        self.assertEqual(detection['name'], 'bird')
+        self.assertAlmostEqual((box['x1'] + box['x2']) / 2, 320, delta=1)
+        self.assertAlmostEqual((box['y1'] + box['y2']) / 2, 240, delta=1)
+
+    def test_panning_moves_the_view(self):
+        self.point_at(100, 80) # further left, so the bird's right of centre
+        self.camera.render()
+        box = self.camera.detections()[0]['box']
+        self.assertGreater((box['x1'] + box['x2']) / 2, 320)
+
+        self.point_at(20, 80)
+        self.camera.render()
+        self.assertEqual(self.camera.detections(), [])
+
+
+class SimulationTestCase(unittest.TestCase):
+
+    def test_finds_and_shoots_a_bird(self):
+        birds = [SimBird(pan=150, tilt=75, arrives=5)]
+
+        report = simulate(birds, seconds=60, fps=10)
+
+        self.assertEqual(report['frames'], 600)
+        self.assertEqual(report['birds_shot'], 1)
+        self.assertLess(report['time_to_first_shot']['max_s'], 30)
+        self.assertGreater(report['hit_ratio'], 0.8)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+# tests/test_sleep_mode.py
+
+import unittest
+import os
+import time
+import numpy as np
+import cv2
+from unittest.mock import MagicMock, patch
+
+from app.frame_processor import FrameProcessor
+from app.detector import BaseDetector
+from app.target_tracker import TargetTracker
+from hardware.fake_hardware import FakeHardwareController
+
+
+class SleepModeTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.chickens = cv2.imread(os.path.join(os.path.dirname(__file__), 'chickens.jpg'))
+        self.dark = (self.chickens // 30).astype(np.uint8)
+        self.covered = np.full_like(self.chickens, 120)
+
+        self.detector = MagicMock(spec=BaseDetector)
+        self.detector.targets = []
+        self.detector.aversions = []
+        self.tracker = TargetTracker()
+        self.hardware_controller = MagicMock(spec=FakeHardwareController)
+
+    def frame_processor(self, sleep_interval):
+        return FrameProcessor(
+            detector=self.detector,
+            target_tracker=self.tracker,
+            hardware_controller=self.hardware_controller,
+            sleep_interval=sleep_interval
+        )
+
+    def test_is_interesting(self):
+        frame_processor = self.frame_processor(0.5)
+        self.assertTrue(frame_processor.is_interesting(self.chickens))
+        self.assertFalse(frame_processor.is_interesting(self.dark))
+        self.assertFalse(frame_processor.is_interesting(self.covered))
+
+    def test_sleeping_doesnt_block(self):
+        frame_processor = self.frame_processor(60)
+
+        start = time.time()
+        for _ in range(10):
+            frame_processor.process_frame(self.dark)
+
+        self.assertLess(time.time() - start, 1)
+        self.assertTrue(frame_processor.asleep)
+        self.detector.detect_objects.assert_not_called()
+
+    def test_dozes_between_looks(self):
+        frame_processor = self.frame_processor(60)
+        frame_processor.process_frame(self.dark)
+
+        with patch.object(frame_processor, 'is_interesting', wraps=frame_processor.is_interesting) as is_interesting:
+            frame_processor.process_frame(self.chickens)
+            frame_processor.process_frame(self.chickens)
+
+        is_interesting.assert_not_called()
+        self.assertTrue(frame_processor.asleep)
+        self.assertIs(frame_processor.frame, self.chickens)
+
+    def test_wakes_and_detects_straight_away(self):
+        frame_processor = self.frame_processor(0)
+        frame_processor.process_frame(self.covered)
+        self.assertTrue(frame_processor.asleep)
+
+        frame_processor.process_frame(self.chickens)
+
+        self.assertFalse(frame_processor.asleep)
+        self.detector.detect_objects.assert_called_once()
+        self.assertIs(self.detector.detect_objects.call_args.args[0], self.chickens)
+
+    def test_stops_firing_when_asleep(self):
+        frame_processor = self.frame_processor(60)
+        self.tracker.fire = True
+        with patch.object(self.tracker, '_log'):
+            frame_processor.process_frame(self.dark)
+        self.assertFalse(self.tracker.fire)
+
+    def test_closes_valve_when_asleep(self):
+        self.hardware_controller = FakeHardwareController()
+        frame_processor = self.frame_processor(60)
+        self.hardware_controller.activate_solenoid()
+
+        with patch.object(self.tracker, '_log'):
+            frame_processor.process_frame(self.dark)
+
+        self.assertTrue(frame_processor.asleep)
+        self.assertFalse(self.hardware_controller._relay_on)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+# tests/test_snapshot.py
+
+import unittest
+import threading
+from unittest.mock import MagicMock, patch
+
+import cv2
+import numpy as np
+
+from app.main import App
+from camera.fake_camera import FakeCamera
+from hardware.fake_hardware import FakeHardwareController
+
+
+class SnapshotTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.frame = FakeCamera.fake_frame()
+        self.app = App(FakeCamera(), FakeHardwareController(), MagicMock(), MagicMock())
+        self.frame_store = self.app.frame_store
+        self.client = self.app.app.test_client()
+
+    def test_no_frame_yet(self):
+        response = self.client.get('/snapshot.jpg')
+        self.assertEqual(response.status_code, 503)
+
+    def test_latest_frame(self):
+        self.frame_store.update(self.frame)
+
+        response = self.client.get('/snapshot.jpg')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'image/jpeg')
+        image = cv2.imdecode(np.frombuffer(response.data, np.uint8), cv2.IMREAD_COLOR)
+        self.assertEqual(image.shape, self.frame.shape)
+        self.assertEqual(response.headers['ETag'], f'"{self.frame_store.timestamp!r}"')
+
+    def test_not_modified_costs_nothing(self):
+        self.frame_store.update(self.frame)
+        etag = self.client.get('/snapshot.jpg').headers['ETag']
+
+        for _ in range(5):
+            response = self.client.get('/snapshot.jpg', headers={'If-None-Match': etag})
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.data, b'')
+
+        self.assertEqual(self.frame_store.jpeg_encodes['high'], 1)
+
+        self.frame_store.update(self.frame)
+        response = self.client.get('/snapshot.jpg', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+        self.assertEqual(self.frame_store.jpeg_encodes['high'], 2)
+
+    def test_after_waits_for_a_newer_frame(self):
+        self.frame_store.update(self.frame)
+        etag = self.client.get('/snapshot.jpg').headers['ETag']
+
+        threading.Timer(0.1, self.frame_store.update, [np.zeros_like(self.frame)]).start()
+        response = self.client.get(f'/snapshot.jpg?after={etag.strip(chr(34))}')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+        image = cv2.imdecode(np.frombuffer(response.data, np.uint8), cv2.IMREAD_COLOR)
+        self.assertEqual(image.max(), 0)
+
+    def test_after_gives_up(self):
+        self.frame_store.update(self.frame)
+        etag = self.client.get('/snapshot.jpg').headers['ETag']
+
+        with patch('app.main.SNAPSHOT_WAIT', 0.05):
+            response = self.client.get(f'/snapshot.jpg?after={etag.strip(chr(34))}', headers={'If-None-Match': etag})
+
+        self.assertEqual(response.status_code, 304)
+
+
+if __name__ == '__main__':
+    unittest.main()
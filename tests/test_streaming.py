@@ -0,0 +1,87 @@
+# tests/test_streaming.py
+
+import unittest
+from unittest.mock import MagicMock
+
+import cv2
+import numpy as np
+
+from app.streaming import TIERS, TierNegotiator, encode_jpeg
+from app.main import App
+from camera.fake_camera import FakeCamera
+from hardware.fake_hardware import FakeHardwareController
+
+
+def decode(jpeg):
+    return cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+
+
+class EncodeJpegTestCase(unittest.TestCase):
+
+    def test_shrinks_to_tier(self):
+        frame = np.random.randint(0, 256, (480, 640, 3), dtype=np.uint8)
+
+        self.assertEqual(decode(encode_jpeg(frame, TIERS['low'])).shape, (240, 320, 3))
+        self.assertEqual(decode(encode_jpeg(frame, TIERS['medium'])).shape, (480, 640, 3))
+        self.assertEqual(decode(encode_jpeg(frame, TIERS['high'])).shape, (480, 640, 3))
+
+
+class TierNegotiatorTestCase(unittest.TestCase):
+
+    def test_slow_client_drops_a_tier_at_a_time(self):
+        negotiator = TierNegotiator()
+        self.assertEqual(negotiator.tier.name, 'high')
+
+        for _ in range(5):
+            negotiator.delivered(0.5)
+        self.assertEqual(negotiator.tier.name, 'medium')
+        for _ in range(4):
+            negotiator.delivered(0.5)
+        self.assertEqual(negotiator.tier.name, 'medium') # gives each tier a chance
+        for _ in range(10):
+            negotiator.delivered(0.5)
+        self.assertEqual(negotiator.tier.name, 'low')
+
+    def test_fast_client_goes_back_up_slowly(self):
+        negotiator = TierNegotiator(tier='low')
+        for _ in range(49):
+            negotiator.delivered(0.001)
+        self.assertEqual(negotiator.tier.name, 'low')
+        negotiator.delivered(0.001)
+        self.assertEqual(negotiator.tier.name, 'medium')
+
+    def test_steady_client_stays_put(self):
+        negotiator = TierNegotiator(tier='medium')
+        for _ in range(100):
+            negotiator.delivered(0.1)
+        self.assertEqual(negotiator.tier.name, 'medium')
+
+
+class VideoFeedTierTestCase(unittest.TestCase):
+
+    def setUp(self):
+        frame_processor = MagicMock()
+        frame_processor.annotated_frame = cv2.resize(FakeCamera.fake_frame(), (640, 480))
+        self.app = App(FakeCamera(frames=[frame_processor.annotated_frame]), FakeHardwareController(), frame_processor, MagicMock())
+        self.app.start_processing()
+        self.client = self.app.app.test_client()
+
+    def tearDown(self):
+        self.app.stop_processing()
+
+    def test_low_tier(self):
+        response = self.client.get('/video_feed?tier=low')
+
+        chunk = next(iter(response.response))
+        image = decode(chunk[chunk.find(b'\r\n\r\n') + 4:])
+        self.assertEqual(image.shape, (240, 320, 3))
+        self.assertEqual(self.app.frame_store.jpeg_encodes['low'], 1)
+        response.close()
+
+    def test_unknown_tier(self):
+        response = self.client.get('/video_feed?tier=ultra')
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,11 +3,13 @@
 import unittest
 from unittest.mock import patch
 from app.target_tracker import TargetTracker
-import time
+from app.clock import VirtualClock
 
 class TargetTrackerTestCase(unittest.TestCase):
 
     def setUp(self):
+        self.clock = VirtualClock()
+
         # Sample frame dimensions
         self.frame_width = 1000
         self.frame_height = 1000
@@ -85,24 +87,25 @@ class TargetTrackerTestCase(unittest.TestCase):
         self.assertTrue(tracker.fire)
 
     def test_permitted_to_fire(self):
-        tracker = TargetTracker()
-        tracker._fire_start_time = time.time() - 2  # Fire duration exceeds max_fire_time
+        tracker = TargetTracker(clock=self.clock)
+        tracker._fire_start_time = self.clock.time() - 2  # Fire duration exceeds max_fire_time
         self.assertFalse(tracker._permitted_to_fire())
 
         # cool down time should be set
         tracker._fire_start_time = None  # Fire duration exceeds max_fire_time
         self.assertFalse(tracker._permitted_to_fire())
         
-        tracker._cool_down_till = time.time() - 1
+        tracker._cool_down_till = self.clock.time() - 1
         r = tracker._permitted_to_fire()
         
         self.assertTrue(r)
 
     def test_fire_duration(self):
-        tracker = TargetTracker()
+        tracker = TargetTracker(clock=self.clock)
         self.assertEqual(tracker._fire_duration(), 0)
-        tracker._fire_start_time = time.time() - 1
-        self.assertAlmostEqual(tracker._fire_duration(), 1, delta=0.1)
+        tracker._fire_start_time = self.clock.time()
+        self.clock.advance(1)
+        self.assertEqual(tracker._fire_duration(), 1)
 
     def test_on_target(self):
         tracker = TargetTracker()
@@ -123,9 +126,9 @@ class TargetTrackerTestCase(unittest.TestCase):
         self.assertTrue(tracker._close_enough())
 
     def test_end_fire_event(self):
-        tracker = TargetTracker()
+        tracker = TargetTracker(clock=self.clock)
         tracker.fire = True
-        tracker._fire_start_time = time.time()
+        tracker._fire_start_time = self.clock.time()
         tracker._end_fire_event()
         self.assertFalse(tracker.fire)
         self.assertEqual(tracker.attack_message, '')
@@ -138,9 +141,11 @@ class TargetTrackerTestCase(unittest.TestCase):
             self.assertFalse(tracker._permitted_to_fire())
 
     def test_cooldown_period(self):
-        tracker = TargetTracker()
-        tracker._cool_down_till = time.time() + 1
+        tracker = TargetTracker(clock=self.clock)
+        tracker._cool_down_till = self.clock.time() + 1
         self.assertFalse(tracker._permitted_to_fire())
+        self.clock.advance(1.5)
+        self.assertTrue(tracker._permitted_to_fire())
 
     def test_start_fire_event(self):
         tracker = TargetTracker()
@@ -0,0 +1,111 @@
+# tests/test_telemetry.py
+
+import unittest
+import json
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+
+from app.frame_processor import FrameProcessor, Observation
+from app.main import App
+from app.overlay import OverlayCompositor
+from app.target_tracker import TargetTracker
+from camera.fake_camera import FakeCamera
+from hardware.fake_hardware import FakeHardwareController
+
+
+BIRD = {'name': 'bird', 'class': 14, 'confidence': 0.876, 'box': {'x1': 100, 'y1': 100, 'x2': 200, 'y2': 220}}
+
+
+class FrameProcessorTelemetryTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.frame_processor = FrameProcessor(
+            detector=MagicMock(),
+            target_tracker=TargetTracker(),
+            hardware_controller=FakeHardwareController()
+        )
+        self.frame = FakeCamera.fake_frame()
+
+    def test_nothing_before_first_frame(self):
+        self.assertIsNone(self.frame_processor.telemetry())
+
+    def test_detections_and_target(self):
+        with patch.object(TargetTracker, '_log'):
+            self.frame_processor.act(Observation(self.frame, True, True, [BIRD], []))
+
+        telemetry = self.frame_processor.telemetry()
+        json.dumps(telemetry) # plain values only
+
+        self.assertEqual((telemetry['height'], telemetry['width']), self.frame.shape[:2])
+        self.assertEqual(telemetry['detections'], [{'name': 'bird', 'confidence': 0.88, 'box': [100, 100, 200, 220]}])
+        target = telemetry['target']
+        self.assertEqual(target['name'], 'bird')
+        self.assertEqual(target['box'], [100, 100, 200, 220])
+        self.assertEqual(target['point'], [150, 160])
+
+    def test_no_target_when_nothing_seen(self):
+        self.frame_processor.act(Observation(self.frame, True, True, [], []))
+
+        telemetry = self.frame_processor.telemetry()
+        self.assertEqual(telemetry['detections'], [])
+        self.assertIsNone(telemetry['target'])
+
+
+class ComposeTelemetryTestCase(unittest.TestCase):
+
+    def test_same_as_composing_from_detections(self):
+        compositor = OverlayCompositor()
+        frame = FakeCamera.fake_frame()
+        tracker = TargetTracker()
+        with patch.object(tracker, '_log'):
+            tracker.process_detections([BIRD], frame.shape[1], frame.shape[0])
+
+        frame_processor = FrameProcessor(MagicMock(), tracker, FakeHardwareController())
+        frame_processor.act(Observation(frame, True, True, [BIRD], []))
+
+        self.assertTrue(np.array_equal(
+            compositor.compose(frame, [BIRD], tracker),
+            compositor.compose_telemetry(frame, frame_processor.telemetry())
+        ))
+
+
+class TelemetryRouteTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.frame = FakeCamera.fake_frame()
+        frame_processor = MagicMock()
+        frame_processor.fire.return_value = False
+        frame_processor.telemetry.return_value = {'width': 640, 'height': 480, 'asleep': False, 'detections': [], 'target': None}
+        temp_monitor = MagicMock(average_temperature=55.0, throttle_time=None)
+        temp_monitor.overheat_event.is_set.return_value = False
+
+        self.app = App(FakeCamera(frames=[self.frame] * 3), FakeHardwareController(), frame_processor, temp_monitor)
+        self.client = self.app.app.test_client()
+
+    def tearDown(self):
+        self.app.stop_processing()
+
+    def test_server_sent_events(self):
+        self.app.start_processing()
+        response = self.client.get('/telemetry')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        events = [chunk for chunk in response.response if chunk.startswith(b'data: ')]
+
+        self.assertGreater(len(events), 0)
+        telemetry = json.loads(events[-1][len(b'data: '):])
+        self.assertEqual(telemetry['width'], 640)
+        self.assertEqual(telemetry['thermal'], {'temperature': 55.0, 'throttle': None, 'overheated': False})
+
+    def test_stream_is_clean(self):
+        self.app.start_processing()
+        self.app.thread.join(5)
+
+        self.assertIs(self.app.frame_store.latest_frame, self.frame)
+        self.assertEqual(self.app.frame_store.telemetry['detections'], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
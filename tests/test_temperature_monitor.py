@@ -4,12 +4,13 @@ import unittest
 from unittest.mock import patch
     
 from app.temperature_monitor import TemperatureMonitor
+from app.clock import VirtualClock
 import threading
-import time
 
 class TestTemperatureMonitor(unittest.TestCase):
     def setUp(self):
         # Initialize the TemperatureMonitor with specific parameters if needed
+        self.clock = VirtualClock()
         self.temp_monitor = TemperatureMonitor(
             max_temp=80,
             stable_temp=70.0,
@@ -18,7 +19,8 @@ class TestTemperatureMonitor(unittest.TestCase):
             moving_avg_readings=3,
             starting_throttle_time=0.1,
             throttle_up_multiplier=1.3,
-            throttle_down_divisor=1.1
+            throttle_down_divisor=1.1,
+            clock=self.clock
         )
 
     def tearDown(self):
@@ -27,6 +29,12 @@ class TestTemperatureMonitor(unittest.TestCase):
         if self.temp_monitor.thread.is_alive():
             self.temp_monitor.stop()
 
+    def start_and_advance(self, seconds):
+        """Start the monitor and let it run for seconds on the virtual clock."""
+        self.temp_monitor.start()
+        self.assertTrue(self.clock.wait_for_sleepers(1))
+        self.clock.advance(seconds)
+
     @patch('app.temperature_monitor.os.popen')
     def test_throttle_time_increases_and_overheat_event_set(self, mock_popen):
         """
@@ -45,11 +53,9 @@ class TestTemperatureMonitor(unittest.TestCase):
 
         # Start the TemperatureMonitor
         with patch.object(self.temp_monitor, '_log', return_value=None) as mock_log:
-            self.temp_monitor.start()
-
-            # Allow some time for the monitor to process all temperatures
+            # Let the monitor process all temperatures
             # Number of temperatures * check_interval + buffer
-            time.sleep(0.04)  # 3 temps *0.01 + buffer
+            self.start_and_advance(0.035)  # 4 readings
 
             with self.temp_monitor.throttle_lock:
                 current_throttle = self.temp_monitor.throttle_time
@@ -75,11 +81,8 @@ class TestTemperatureMonitor(unittest.TestCase):
 
         mock_popen.return_value.readline.side_effect = mock_measure_temp
 
-        # Start the TemperatureMonitor
-        self.temp_monitor.start()
-
-        # Allow some time for the monitor to process temperatures
-        time.sleep(0.2)  # Enough time to process all temps
+        # Start the TemperatureMonitor, and let it process temperatures
+        self.start_and_advance(0.2)  # Enough time to process all temps
 
         # Assertions for throttle_time increases and decreases
         # Final throttle_time should have been set to None after sufficient decreases
@@ -110,15 +113,13 @@ class TestTemperatureMonitor(unittest.TestCase):
 
         # Start the TemperatureMonitor
         with patch.object(self.temp_monitor, '_log', return_value=None) as mock_log:
-            with patch.object(self.temp_monitor, '_halt', return_value=None) as mock_halt:
+            with patch.object(self.temp_monitor, '_halt', wraps=self.temp_monitor._halt) as mock_halt:
             
-                self.temp_monitor.start()
-
-                # Allow some time for the monitor to process temperatures and set throttle_time
-                time.sleep(0.03)
+                # Let the monitor process temperatures and set throttle_time
+                self.start_and_advance(0.025)
                 self.assertTrue(self.temp_monitor.overheat_event.is_set())
 
-                self.temp_monitor.throttle()
+                self.temp_monitor.throttle() # halting lets the clock run on till it cools
                 
                 # TODO make sure self.temp_monitor.halt() was called
                 mock_halt.assert_called()
@@ -146,11 +147,9 @@ class TestTemperatureMonitor(unittest.TestCase):
         with patch.object(self.temp_monitor, '_log', return_value=None) as mock_log:
             with patch.object(self.temp_monitor, '_slowdown', return_value=None) as mock_slow:
             
-                self.temp_monitor.start()
-
-                time.sleep(0.015)
+                self.start_and_advance(0.015)
                 self.temp_monitor.throttle()
-                time.sleep(0.015)
+                self.clock.advance(0.01)
                 self.temp_monitor.throttle()
 
                 # TODO make sure self.temp_monitor.halt() was called
@@ -176,11 +175,9 @@ class TestTemperatureMonitor(unittest.TestCase):
         with patch.object(self.temp_monitor, '_log', return_value=None) as mock_log:
             with patch.object(self.temp_monitor, '_slowdown', return_value=None) as mock_slow:
             
-                self.temp_monitor.start()
-
-                time.sleep(0.015)
+                self.start_and_advance(0.015)
                 self.temp_monitor.throttle()
-                time.sleep(0.015)
+                self.clock.advance(0.01)
                 self.temp_monitor.throttle()
 
                 # TODO make sure self.temp_monitor.halt() was called
@@ -205,25 +202,23 @@ class TestTemperatureMonitor(unittest.TestCase):
         with patch.object(self.temp_monitor, '_log', return_value=None) as mock_log:
             with patch.object(self.temp_monitor, '_slowdown', return_value=None) as mock_slow:
             
-                self.temp_monitor.start()
-
-                time.sleep(0.015)
+                self.start_and_advance(0.015)
                 with self.temp_monitor.throttle_lock:
                     self.assertAlmostEqual(self.temp_monitor.throttle_time, 0.1)
                 
-                time.sleep(0.01)
+                self.clock.advance(0.01)
                 with self.temp_monitor.throttle_lock:
                     self.assertAlmostEqual(self.temp_monitor.throttle_time, 0.1)
 
-                time.sleep(0.01)
+                self.clock.advance(0.01)
                 with self.temp_monitor.throttle_lock:
                     self.assertAlmostEqual(self.temp_monitor.throttle_time, 0.1)
 
-                time.sleep(0.01)
+                self.clock.advance(0.01)
                 with self.temp_monitor.throttle_lock:
                     self.assertAlmostEqual(self.temp_monitor.throttle_time, 0.1)
 
-                time.sleep(0.01)
+                self.clock.advance(0.01)
                 with self.temp_monitor.throttle_lock:
                     self.assertAlmostEqual(self.temp_monitor.throttle_time, None)
 
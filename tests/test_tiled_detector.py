@@ -0,0 +1,98 @@
+# tests/test_tiled_detector.py
+
+import unittest
+import numpy as np
+import cv2
+
+from app.detector import BaseDetector
+
+
+class BlobDetector(BaseDetector):
+    """
+    Finds white blobs as birds. Like a real model it misses anything that ends up
+    too small once the image is shrunk to its input size.
+    """
+
+    def __init__(self, input_size=320, min_size=8, **kwargs):
+        super().__init__(**kwargs)
+        self.input_size = input_size
+        self.min_size = min_size
+        self.batches = []
+
+    def _detect_batch(self, images):
+        self.batches.append(len(images))
+        return [self._detect(image) for image in images]
+
+    def _detect(self, image):
+        scale = self.input_size / max(image.shape[:2])
+        gray = cv2.cvtColor(np.ascontiguousarray(image), cv2.COLOR_BGR2GRAY)
+        contours, _ = cv2.findContours(gray, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        detections = []
+        for contour in contours:
+            x, y, w, h = cv2.boundingRect(contour)
+            if min(w, h) * scale < self.min_size:
+                continue
+            detections.append({'name': 'bird', 'class': 14, 'confidence': 0.9, 'box': {'x1': x, 'y1': y, 'x2': x + w, 'y2': y + h}})
+        return detections
+
+
+class TiledDetectorTestCase(unittest.TestCase):
+
+    def setUp(self):
+        # two distant chickens and one big one right across a tile seam
+        self.frame = np.zeros((960, 1280, 3), dtype=np.uint8)
+        self.small_birds = [(100, 100, 118, 118), (1000, 700, 1018, 718)]
+        self.big_bird = (560, 380, 760, 560)
+        for x1, y1, x2, y2 in self.small_birds + [self.big_bird]:
+            self.frame[y1:y2, x1:x2] = 255
+
+    def boxes(self, detector):
+        return sorted((d['box']['x1'], d['box']['y1'], d['box']['x2'], d['box']['y2']) for d in detector.targets)
+
+    def test_tiles_cover_frame_with_overlap(self):
+        detector = BlobDetector(tile_size=320, tile_overlap=0.25)
+        tiles = detector._tiles(640, 480)
+        self.assertEqual(len(tiles), 6)
+
+        covered = np.zeros((480, 640), dtype=bool)
+        for x1, y1, x2, y2 in tiles:
+            self.assertEqual((x2 - x1, y2 - y1), (320, 320))
+            covered[y1:y2, x1:x2] = True
+        self.assertTrue(covered.all())
+
+    def test_whole_frame_misses_small_birds(self):
+        detector = BlobDetector()
+        detector.detect_objects(self.frame)
+        self.assertEqual(self.boxes(detector), [(560, 380, 760, 560)])
+
+    def test_tiled_finds_small_birds_in_one_batch(self):
+        detector = BlobDetector(tile_size=480)
+        detector.detect_objects(self.frame)
+
+        boxes = self.boxes(detector)
+        self.assertEqual(boxes, sorted(self.small_birds + [self.big_bird]))
+        self.assertEqual(len(detector.batches), 1)
+        self.assertEqual(detector.batches[0], len(detector._tiles(1280, 960)) + 1)
+
+    def test_only_tiles_regions(self):
+        detector = BlobDetector(tile_size=480)
+        detector.detect_objects(self.frame, regions=[(90, 90, 130, 130)])
+
+        boxes = self.boxes(detector)
+        self.assertIn((100, 100, 118, 118), boxes)
+        self.assertNotIn((1000, 700, 1018, 718), boxes)
+        self.assertEqual(detector.batches[0], 2) # whole frame and one tile
+
+    def test_merge_keeps_best_of_overlapping_boxes(self):
+        detector = BlobDetector(tile_size=480)
+        detections = [
+            {'name': 'bird', 'class': 14, 'confidence': 0.6, 'box': {'x1': 10, 'y1': 10, 'x2': 50, 'y2': 50}},
+            {'name': 'bird', 'class': 14, 'confidence': 0.9, 'box': {'x1': 12, 'y1': 10, 'x2': 52, 'y2': 50}},
+            {'name': 'person', 'class': 0, 'confidence': 0.8, 'box': {'x1': 12, 'y1': 10, 'x2': 52, 'y2': 50}},
+        ]
+        merged = detector._merge_detections(detections)
+        self.assertEqual(sorted((d['name'], d['confidence']) for d in merged), [('bird', 0.9), ('person', 0.8)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+# tests/test_tracing.py
+
+import unittest
+import threading
+import time
+from unittest.mock import MagicMock
+
+from app.tracing import Tracer, tracer
+from app.main import App
+from camera.fake_camera import FakeCamera
+from hardware.fake_hardware import FakeHardwareController
+
+
+class TracerTestCase(unittest.TestCase):
+
+    def test_off_records_nothing(self):
+        tracer = Tracer()
+        with tracer.span('detect'):
+            pass
+        self.assertEqual(tracer.chrome_trace()['traceEvents'], [])
+
+    def test_spans_from_each_thread(self):
+        tracer = Tracer(enabled=True)
+
+        def work():
+            with tracer.span('smooth_pan', 'hardware'):
+                time.sleep(0.01)
+
+        thread = threading.Thread(target=work, name='panner')
+        thread.start()
+        thread.join()
+        with tracer.span('detect'):
+            pass
+
+        events = tracer.chrome_trace()['traceEvents']
+        names = {event['args']['name'] for event in events if event['ph'] == 'M'}
+        spans = {event['name']: event for event in events if event['ph'] == 'X'}
+
+        self.assertEqual(names, {'panner', threading.current_thread().name})
+        self.assertEqual(spans['smooth_pan']['cat'], 'hardware')
+        self.assertGreaterEqual(spans['smooth_pan']['dur'], 10000) # microseconds
+        self.assertNotEqual(spans['smooth_pan']['tid'], spans['detect']['tid'])
+
+    def test_window(self):
+        tracer = Tracer(enabled=True)
+        with tracer.span('old'):
+            pass
+        time.sleep(0.02)
+        since = time.time()
+        with tracer.span('new'):
+            pass
+
+        spans = [event['name'] for event in tracer.chrome_trace(since=since)['traceEvents'] if event['ph'] == 'X']
+        self.assertEqual(spans, ['new'])
+
+    def test_ring_is_bounded(self):
+        tracer = Tracer(capacity=10, enabled=True)
+        for index in range(25):
+            with tracer.span(f'span {index}'):
+                pass
+
+        spans = [event['name'] for event in tracer.chrome_trace()['traceEvents'] if event['ph'] == 'X']
+        self.assertEqual(spans, [f'span {index}' for index in range(15, 25)])
+
+
+class TraceEndpointTestCase(unittest.TestCase):
+
+    def setUp(self):
+        tracer.clear()
+        app = App(FakeCamera(), FakeHardwareController(), MagicMock(), MagicMock())
+        self.client = app.app.test_client()
+
+    def tearDown(self):
+        tracer.enabled = False
+        tracer.clear()
+
+    def test_toggle_and_dump(self):
+        self.assertEqual(self.client.post('/trace', data={'enabled': '1'}).get_json(), {'enabled': True})
+        with tracer.span('process_frame'):
+            pass
+        self.client.post('/trace', data={'enabled': '0'})
+        with tracer.span('not recorded'):
+            pass
+
+        response = self.client.get('/trace?seconds=60')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('attachment', response.headers['Content-Disposition'])
+        spans = [event['name'] for event in response.get_json()['traceEvents'] if event['ph'] == 'X']
+        self.assertEqual(spans, ['process_frame'])
+
+    def test_bad_window(self):
+        for query in ('seconds=abc', 'since=yesterday', 'since=0&until=now'):
+            self.assertEqual(self.client.get(f'/trace?{query}').status_code, 400, query)
+        self.assertEqual(self.client.get('/trace?since=0').status_code, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()